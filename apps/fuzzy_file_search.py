@@ -1,20 +1,51 @@
 # textual_file_search/apps/fuzzy_file_search.py
 
 from textual.app import App, ComposeResult
-from textual.containers import Container
+from textual.containers import Container, Horizontal
 from textual.widgets import Header, Footer, Input
 from textual.reactive import reactive
 from textual import log
 from textual.events import Key
+from textual.worker import get_current_worker
 
 # Relative imports from the textual_file_search package
-from widgets import SearchInput, SearchResultsList
-from search import get_home_directory_files, fuzzy_search
-from utils import open_file_or_directory
-from screens.chat_screen import ChatScreen # NEW: Import ChatScreen
-
+from widgets import PreviewPane, SearchInput, SearchResultsList, StatsPanel, VirtualSearchResultsList
+from search import DEFAULT_SCORER, fuzzy_search, get_scorer, WalkStats
+from frecency import FrecencyStore, rank_with_frecency
+from content_search import DEFAULT_CONTENT_WORKERS, ContentMatch, ContentSearcher
+from index_cache import default_index_path, iter_home_index
+from index_rules import IndexFilter, index_filters, load_roots
+from instrumentation import SlowQueryProfiler, metrics
+from path_store import PathStore
+from preview import DEFAULT_CACHE_SIZE, Preview, PreviewCache
+from search_daemon import DaemonClient, DaemonError, DaemonTimeout, connect_to_daemon
+from search_session import SearchSession
+from utils import LaunchError, launch_path_async
+from watcher import DELETED, RESCAN, BaseWatcher, IndexEvent, apply_index_events, create_watcher
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Callable, Deque, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from sharded_search import ShardedSearchEngine
+
+def _create_chat_screen():
+    """
+    Builds the chat screen on first use. Importing it pulls in the Gemini SDK,
+    which would otherwise delay the first frame of every launch.
+    """
+    from screens.chat_screen import ChatScreen
+    return ChatScreen()
+
+def _prewarm_chat() -> None:
+    """Imports the chat screen and the Gemini SDK ahead of the first use."""
+    import screens.chat_screen
+    from services.gemini_api import import_sdk
+    import_sdk()
 
 class FileSearchApp(App):
     """
@@ -25,39 +56,574 @@ class FileSearchApp(App):
         ("ctrl+c", "quit", "Quit"),
         ("ctrl+s", "focus_search", "Focus Search"),
         ("ctrl+g", "push_screen('chat_screen')", "Gemini Chat"), # NEW: Binding to directly open chat
+        ("ctrl+t", "toggle_stats", "Stats"),
+        ("ctrl+o", "export_stats", "Export Stats"),
+        ("ctrl+r", "profile_slow_query", "Profile Slow Query"),
     ]
 
-    SCREENS = {"chat_screen": ChatScreen} # Register the new screen
+    SCREENS = {"chat_screen": _create_chat_screen} # Created lazily on first use
+
+    all_home_paths: reactive[PathStore] = reactive(PathStore)
+    # Always updated: content results can repeat a path list with new previews.
+    current_search_results: reactive[List[Path]] = reactive(list, always_update=True)
+
+    # Filesystem watcher backend: "auto", "inotify", "watchdog" or "polling".
+    WATCHER_BACKEND = "auto"
+
+    # Search backend: "session" (incremental, in-process) or "sharded"
+    # (worker processes over a shared-memory copy of the index).
+    SEARCH_BACKEND = "session"
+
+    # How file names are scored and ranked: "greedy", "optimal" (fzf-style
+    # best alignment) or "levenshtein" (typo-tolerant); see search.py.
+    SCORER = DEFAULT_SCORER
+
+    # Number of results shown. VIRTUAL_RESULTS swaps the widget-per-row list
+    # for one that only renders the visible rows, so a long ranked list
+    # (VIRTUAL_RESULT_LIMIT entries) can be scrolled through.
+    RESULT_LIMIT = 10
+    VIRTUAL_RESULTS = False
+    VIRTUAL_RESULT_LIMIT = 2000
+
+    # Show a preview of the highlighted result next to the list. Previews
+    # are built in a worker thread and the last PREVIEW_CACHE_SIZE are kept.
+    PREVIEW = True
+    PREVIEW_CACHE_SIZE = DEFAULT_CACHE_SIZE
 
-    all_home_paths: reactive[List[Path]] = reactive(list)
-    current_search_results: reactive[List[Path]] = reactive(list)
+    # Remember which paths get opened (see frecency.py). Frequently and
+    # recently opened paths rank higher, and the HOT_SET_SIZE most frecent
+    # are searched on the keystroke itself, before the full search.
+    FRECENCY = True
+    HOT_SET_SIZE = 256
+
+    # Queries starting with this prefix search file contents instead of
+    # names. Matches stream in (up to CONTENT_RESULT_LIMIT) with a preview of
+    # the matching line. CONTENT_SEARCH_EXECUTOR is "thread" or "process".
+    CONTENT_SEARCH_PREFIX = ">"
+    CONTENT_RESULT_LIMIT = 200
+    CONTENT_SEARCH_EXECUTOR = "thread"
+    CONTENT_SEARCH_WORKERS = DEFAULT_CONTENT_WORKERS
+
+    # Seconds to wait after a keystroke before searching. Keystrokes typed
+    # within this window cancel the pending search instead of queueing one.
+    SEARCH_DEBOUNCE = 0.05
+
+    # Query a running search daemon (`python cli.py serve`) instead of
+    # building a private index, when one is listening on DAEMON_SOCKET
+    # (None for the default socket path). Its status is polled every
+    # DAEMON_STATUS_INTERVAL seconds to pick up index changes.
+    USE_DAEMON = True
+    DAEMON_SOCKET: Optional[str] = None
+    DAEMON_STATUS_INTERVAL = 0.5
+
+    # Per-stage latency instrumentation (see instrumentation.py). Exports
+    # and slow-query profiles are written to STATS_DIR (None: next to the
+    # index snapshot). ctrl+r profiles the next search slower than
+    # PROFILE_THRESHOLD_MS.
+    INSTRUMENTATION = True
+    STATS_DIR: Optional[str] = None
+    STATS_REFRESH_INTERVAL = 1.0
+    PROFILE_THRESHOLD_MS = 50.0
+
+    # Import the chat stack in the background once the index is ready, so the
+    # first ctrl+g / ':' does not wait for the Gemini SDK.
+    PREWARM_CHAT = False
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._watchers: List[BaseWatcher] = []
+        self._scorer = self.SCORER
+        try:
+            get_scorer(self._scorer)
+        except ValueError as error:
+            print(f"Warning: {error} Using the {DEFAULT_SCORER!r} scorer.")
+            self._scorer = DEFAULT_SCORER
+        # Compiled rules of the index roots, shared by the loader and the watchers.
+        self._index_filters: List[IndexFilter] = []
+        # Reuses the previous keystroke's candidates while the query grows.
+        self.search_session = SearchSession(self.all_home_paths)
+        self._sharded_engine: Optional["ShardedSearchEngine"] = None
+        # Searches run in worker threads while the index is updated on the
+        # event loop; this lock keeps the two (and the search session) apart.
+        # The event loop never waits for it: changes made while a search
+        # holds it are queued and applied once the search lets go.
+        self._index_lock = threading.Lock()
+        self._index_changes: Deque[Callable[[], None]] = deque()
+        # Bumped for every new query; results of older queries are dropped.
+        self._search_generation = 0
+        # Generation of the results currently shown.
+        self._displayed_generation = 0
+        self._daemon: Optional[DaemonClient] = None
+        self._daemon_status_timer = None
+        self._daemon_changes = -1 # Daemon index change count behind the current results
+        self._daemon_lost = False
+        # (search generation, perf_counter) of the keystroke being answered.
+        self._keystroke_start: Optional[Tuple[int, float]] = None
+        metrics.enabled = self.INSTRUMENTATION
+        self._stats_dir = Path(self.STATS_DIR) if self.STATS_DIR else default_index_path().parent / "stats"
+        self.slow_query_profiler = SlowQueryProfiler(
+            self._stats_dir, self.PROFILE_THRESHOLD_MS, report=self._report_profile
+        )
+        self._stats_timer = None
+        self._content_searcher: Optional[ContentSearcher] = None
+        self._content_matches: List[ContentMatch] = []
+        # Per-row details (line previews) for the result list they belong to.
+        self._result_details: Optional[Tuple[List[Path], List[str]]] = None
+        self._created_at = time.perf_counter()
+        self._chat_prewarmed = False
+        self._preview_cache = PreviewCache(self.PREVIEW_CACHE_SIZE)
+        self._preview_path: Optional[Path] = None # Result the preview pane is showing
+        self._frecency = FrecencyStore()
+        self._index_loaded = False # Whether the local index holds the whole tree
 
     def compose(self) -> ComposeResult:
         yield Header()
         with Container():
             yield SearchInput(placeholder="Type to search...", id="search-input")
-            yield SearchResultsList(id="results-list")
+            with Horizontal(id="results-row"):
+                if self.VIRTUAL_RESULTS:
+                    yield VirtualSearchResultsList(id="results-list")
+                else:
+                    yield SearchResultsList(id="results-list")
+                if self.PREVIEW:
+                    yield PreviewPane(id="preview-pane")
+            yield StatsPanel(id="stats-panel")
         yield Footer()
 
+    @property
+    def result_limit(self) -> int:
+        return self.VIRTUAL_RESULT_LIMIT if self.VIRTUAL_RESULTS else self.RESULT_LIMIT
+
+    @property
+    def content_result_limit(self) -> int:
+        return self.VIRTUAL_RESULT_LIMIT if self.VIRTUAL_RESULTS else self.CONTENT_RESULT_LIMIT
+
+    def _is_filename_query(self, query: str) -> bool:
+        return bool(query) and not query.startswith((":", self.CONTENT_SEARCH_PREFIX))
+
     def on_mount(self) -> None:
-        self.run_worker(self._load_files_worker(), name="file_loader")
+        self.call_after_refresh(
+            lambda: metrics.record("first_frame", time.perf_counter() - self._created_at, self._created_at)
+        )
+        if self.USE_DAEMON:
+            self._daemon = connect_to_daemon(self.DAEMON_SOCKET)
+        if self._daemon is not None:
+            self.log(f"Using the search daemon at {self._daemon.socket_path}.")
+            self._daemon_status_timer = self.set_interval(
+                self.DAEMON_STATUS_INTERVAL, self._poll_daemon_status
+            )
+            self._poll_daemon_status()
+        else:
+            self._start_file_loader()
+        if self.FRECENCY:
+            self.run_worker(self._frecency.load, name="frecency_load", group="frecency",
+                            thread=True, exit_on_error=False)
         self.query_one(SearchInput).focus()
 
-    async def _load_files_worker(self) -> None:
+    def _poll_daemon_status(self) -> None:
+        self.run_worker(self._daemon_status_worker, name="daemon_status", group="daemon_status",
+                        exclusive=True, thread=True)
+
+    def _daemon_status_worker(self) -> None:
+        """Runs in a thread. Mirrors the daemon's indexing progress in the placeholder."""
+        daemon = self._daemon
+        if daemon is None:
+            return
+        try:
+            status = daemon.status()
+        except (OSError, ValueError, DaemonError):
+            return # The next search notices and falls back to a local index
+        self.call_from_thread(self._show_daemon_status, status)
+
+    def _show_daemon_status(self, status: dict) -> None:
+        if status["indexing"]:
+            self._set_search_placeholder(f"Indexing files... {status['entries']:,} found")
+        else:
+            self._set_search_placeholder("Type to search...")
+            self._prewarm_chat()
+        if status["changes"] == self._daemon_changes:
+            return
+        # The daemon indexed or watched something new; refresh the results.
+        self._daemon_changes = status["changes"]
+        query = self.query_one(SearchInput).value
+        if self._is_filename_query(query):
+            self._start_search(query, debounce=0)
+
+    def _fall_back_to_local_index(self) -> None:
+        """The daemon went away; build a private index like a standalone app."""
+        if self._daemon_status_timer is not None:
+            self._daemon_status_timer.stop()
+            self._daemon_status_timer = None
+        self._start_file_loader()
+
+    def _start_file_loader(self) -> None:
+        self._index_loaded = False
+        self.run_worker(self._load_files_worker, name="file_loader", group="file_loader",
+                        exclusive=True, thread=True)
+
+    def _load_files_worker(self) -> None:
+        """
+        Runs in a thread. Streams batches of paths into `all_home_paths` as the
+        walk finds them, so searching works before indexing has finished.
+        """
         self.log("Starting to load home directory files...")
-        search_input = self.query_one(SearchInput)
-        search_input.placeholder = "Loading files... Please wait."
+        self.call_from_thread(self._set_search_placeholder, "Indexing files... 0 found")
         
         try:
-            self.all_home_paths = get_home_directory_files()
-            self.log(f"Loaded {len(self.all_home_paths)} files and directories.")
+            # Warm starts load the on-disk snapshot and only re-scan directories
+            # whose mtime changed; cold starts fall back to a full scan.
+            stats = WalkStats()
+            self._index_filters = index_filters(load_roots())
+            with metrics.stage("index_load"):
+                for batch in iter_home_index(stats=stats, filters=self._index_filters):
+                    self.call_from_thread(self._change_index, partial(self._add_indexed_batch, batch))
+            self.log(f"Loaded {len(self.all_home_paths)} files and directories. Walk: {stats}")
+            self.call_from_thread(self._change_index, partial(setattr, self, "_index_loaded", True))
+            self.call_from_thread(self._start_watchers)
+            self.call_from_thread(self._prewarm_chat)
+        finally:
+            self.call_from_thread(self._set_search_placeholder, "Type to search...")
+
+    def _prewarm_chat(self) -> None:
+        if self.PREWARM_CHAT and not self._chat_prewarmed:
+            self._chat_prewarmed = True
+            self.run_worker(_prewarm_chat, name="prewarm_chat", group="prewarm_chat",
+                            thread=True, exit_on_error=False)
+
+    def _start_watchers(self) -> None:
+        """Keeps `all_home_paths` in sync with the filesystem from now on (one watcher per root)."""
+        self._stop_watchers()
+        for index_filter in self._index_filters:
+            watcher = create_watcher(
+                index_filter.path,
+                lambda events: self.call_from_thread(self._apply_index_events, events),
+                backend=self.WATCHER_BACKEND,
+                index_filter=index_filter,
+            )
+            watcher.start()
+            self._watchers.append(watcher)
+            self.log(f"Watching {index_filter.path} with the {watcher.backend_name} backend.")
+
+    def _stop_watchers(self) -> None:
+        for watcher in self._watchers:
+            watcher.stop()
+        self._watchers = []
+
+    def _apply_index_events(self, events: List[IndexEvent]) -> None:
+        """Applies a batch of filesystem changes to the index and the visible results."""
+        if any(event.kind == RESCAN for event in events):
+            # The watcher lost events; rebuild from the snapshot (cheap on a warm cache).
+            self.log("Watcher queue overflowed, reloading the index.")
+            self._stop_watchers()
+            self._change_index(self.all_home_paths.clear)
+            self._start_file_loader()
+            return
+        self._change_index(partial(self._apply_events_to_index, events))
+
+    def _apply_events_to_index(self, events: List[IndexEvent]) -> None:
+        apply_index_events(self.all_home_paths, events)
+        if self.FRECENCY:
+            self._frecency.forget(Path(event.path) for event in events if event.kind == DELETED)
+        query = self.query_one(SearchInput).value
+        if self._is_filename_query(query):
+            self._start_search(query, debounce=0)
+
+    def _change_index(self, change: Callable[[], None]) -> None:
+        """
+        Runs `change` (which modifies the index) now, or after the search
+        holding the index finishes; changes always run in order.
+        """
+        self._index_changes.append(change)
+        self._apply_index_changes()
+
+    def _apply_index_changes(self) -> None:
+        if not self._index_lock.acquire(blocking=False):
+            return # `_reading_index` calls back once the search is done
+        try:
+            while self._index_changes:
+                self._index_changes.popleft()()
+        finally:
+            self._index_lock.release()
+
+    @contextmanager
+    def _reading_index(self) -> Iterator[None]:
+        """Holds the index in a worker thread; changes queued meanwhile are applied afterwards."""
+        try:
+            with self._index_lock:
+                yield
         finally:
-            search_input.placeholder = "Type to search..."
-            search_input.refresh()
+            if self._index_changes:
+                self.call_from_thread(self._apply_index_changes)
+
+    def _set_search_placeholder(self, text: str) -> None:
+        search_input = self.query_one(SearchInput)
+        search_input.placeholder = text
+        search_input.refresh()
+
+    def _add_indexed_batch(self, batch: List[str]) -> None:
+        """
+        Appends a freshly indexed batch and folds its best matches for the
+        current query into the visible results. Runs through `_change_index`.
+        """
+        new_ids = self.all_home_paths.extend(batch)
+        self._set_search_placeholder(f"Indexing files... {len(self.all_home_paths):,} found")
+
+        query = self.query_one(SearchInput).value
+        if self._is_filename_query(query) and self._displayed_generation == self._search_generation:
+            # Only merge into results of the current query; a pending search
+            # catches up with the batch when its results are applied.
+            self.current_search_results = self._merge_new_entries(
+                query, self.current_search_results, new_ids
+            )
+
+    def _merge_new_entries(self, query: str, results: List[Path], new_ids: range) -> List[Path]:
+        """
+        The top results over (old ∪ new) are among the old top results plus
+        the new entries' own top results, so there is no need to rescan.
+        """
+        if new_ids:
+            new_results = fuzzy_search(
+                query, self.all_home_paths.view(new_ids), limit=self.result_limit, scorer=self._scorer
+            )
+            if new_results:
+                results = fuzzy_search(query, results + new_results, limit=self.result_limit, scorer=self._scorer)
+        return self._rank_with_frecency(query, results)
+
+    def _hot_matches(self, query: str) -> List[Tuple[float, Path]]:
+        """(score, path) matches of `query` among the most frecent paths, best first."""
+        if not self.FRECENCY:
+            return []
+        hot = self._frecency.hot_paths(self.HOT_SET_SIZE)
+        if self._daemon is None and self._index_loaded:
+            # Skip paths the index excludes (or that were deleted); the index
+            # is only changed on the event loop, where this runs.
+            store = self.all_home_paths
+            hot = [path for path in hot if path in store]
+        return fuzzy_search(query, hot, limit=len(hot), with_scores=True, scorer=self._scorer)
+
+    def _rank_with_frecency(self, query: str, results: Sequence[Path]) -> List[Path]:
+        """
+        Re-ranks `results` of `query` with frecency boosts. Frecent matches
+        the search cut off (below the limit by raw score) can move in.
+        """
+        hot = self._hot_matches(query)
+        if not hot and not any(self._frecency.count(path) for path in results):
+            return list(results) # No boosts apply
+        scored = fuzzy_search(query, list(results), limit=len(results), with_scores=True, scorer=self._scorer)
+        return rank_with_frecency(scored + hot, self._frecency, self.result_limit)
+
+    def _show_hot_results(self, query: str) -> None:
+        """
+        Shows matches among the hot set and the results on screen right away;
+        the full search then replaces them.
+        """
+        with metrics.stage("hot_search", query=query):
+            hot = self._hot_matches(query)
+            if not hot:
+                return
+            shown = self.current_search_results
+            scored = fuzzy_search(query, shown, limit=len(shown), with_scores=True, scorer=self._scorer)
+            self.current_search_results = rank_with_frecency(hot + scored, self._frecency, self.result_limit)
+
+    def _start_search(self, query: str, debounce: Optional[float] = None) -> None:
+        """
+        Searches for `query` in a worker thread. Starting a new search cancels
+        the previous one (exclusive worker group).
+        """
+        self._search_generation += 1
+        if self._sharded_engine is not None:
+            self._sharded_engine.cancel() # Stop the workers scoring the stale query
+        if debounce is None:
+            debounce = self.SEARCH_DEBOUNCE
+        self.run_worker(
+            partial(self._search_worker, query, self._search_generation, debounce),
+            name="search", group="search", exclusive=True, thread=True,
+        )
+
+    def _search_worker(self, query: str, generation: int, debounce: float) -> None:
+        """Runs in a thread. Waits out the debounce window, then searches."""
+        worker = get_current_worker()
+        if debounce > 0:
+            time.sleep(debounce)
+        if worker.is_cancelled or generation != self._search_generation:
+            return
+        # The profile is written out after the index is released
+        with self.slow_query_profiler.profile(query), self._reading_index():
+            if worker.is_cancelled or generation != self._search_generation:
+                return
+            with metrics.stage("search", query=query):
+                results = self._run_search(query)
+            store = self.all_home_paths
+            searched = (store.generation, store.next_id)
+        if results is None:
+            return
+        if self._daemon_lost:
+            self._daemon_lost = False
+            self.call_from_thread(self._fall_back_to_local_index)
+        if not worker.is_cancelled:
+            self.call_from_thread(self._apply_search_results, query, generation, results, searched)
+
+    def _apply_search_results(
+        self, query: str, generation: int, results: List[Path], searched: Tuple[int, int]
+    ) -> None:
+        """Shows the results of a finished search unless a newer query superseded it."""
+        if generation != self._search_generation:
+            return # Late result of an obsolete query
+        store = self.all_home_paths
+        store_generation, next_id = searched
+        if store_generation != store.generation:
+            self._start_search(query, debounce=0) # The index was rebuilt meanwhile
+            return
+        # Fold in entries indexed while the search was running.
+        self.current_search_results = self._merge_new_entries(
+            query, results, range(next_id, store.next_id)
+        )
+        self._displayed_generation = generation
+
+        if self._keystroke_start is not None and self._keystroke_start[0] == generation:
+            # End-to-end latency: keystroke to the results being painted.
+            started = self._keystroke_start[1]
+            self._keystroke_start = None
+            self.call_after_refresh(
+                lambda: metrics.record("keystroke", time.perf_counter() - started, started)
+            )
+
+    def _run_search(self, query: str) -> Optional[List[Path]]:
+        """
+        Runs `query` on the configured search backend. Returns None if the
+        search was cancelled by a newer one, or the daemon answered too late.
+        """
+        if self._daemon is not None:
+            try:
+                return self._daemon.search(query, limit=self.result_limit, scorer=self._scorer)
+            except DaemonTimeout as error:
+                # Slow, not gone: keep the daemon and the results on screen.
+                self.log(f"Search for {query!r} timed out: {error}")
+                self.call_from_thread(
+                    self.notify, f"{error}; showing the previous results.", title="Slow search", severity="warning"
+                )
+                return None
+            except (OSError, ValueError, DaemonError) as error:
+                self.log(f"Search daemon failed ({error}), indexing in-process instead.")
+                self._daemon.close()
+                self._daemon = None
+                self._daemon_lost = True
+        if self.SEARCH_BACKEND == "sharded":
+            # Imported here: it loads NumPy, which most sessions never need.
+            from sharded_search import SearchCancelled, ShardedSearchEngine
+            if self._sharded_engine is None:
+                self._sharded_engine = ShardedSearchEngine(self.all_home_paths)
+            try:
+                return self._sharded_engine.search(query, limit=self.result_limit, scorer=self._scorer)
+            except SearchCancelled:
+                return None
+        return self.search_session.search(query, limit=self.result_limit, scorer=self._scorer)
+
+    def _start_content_search(self, needle: str, debounce: Optional[float] = None) -> None:
+        """Searches file contents for `needle` in a worker thread (same exclusive group)."""
+        self._search_generation += 1
+        self._content_matches = []
+        if debounce is None:
+            debounce = self.SEARCH_DEBOUNCE
+        self.run_worker(
+            partial(self._content_search_worker, needle, self._search_generation, debounce),
+            name="content_search", group="search", exclusive=True, thread=True,
+        )
+
+    def _content_search_worker(self, needle: str, generation: int, debounce: float) -> None:
+        """Runs in a thread. Streams matches to the UI until done or superseded."""
+        worker = get_current_worker()
+        if debounce > 0:
+            time.sleep(debounce)
+        cancelled = lambda: worker.is_cancelled or generation != self._search_generation
+        if cancelled():
+            return
+        self.call_from_thread(self._show_content_matches, generation)
+        add_matches = lambda matches: self.call_from_thread(self._add_content_matches, generation, matches)
+        limit = self.content_result_limit
+
+        with metrics.stage("content_search", query=needle):
+            if self._daemon is not None:
+                try:
+                    for matches in self._daemon.content_search(needle, limit):
+                        if cancelled():
+                            break # Closing the stream stops the daemon's search
+                        add_matches(matches)
+                except (OSError, ValueError, DaemonError) as error:
+                    self.log(f"Content search on the daemon failed: {error}")
+                return
+
+            with self._reading_index():
+                store = self.all_home_paths
+                paths = [store.path_str(entry_id) for entry_id in store.ids()]
+            if self._content_searcher is None:
+                self._content_searcher = ContentSearcher(self.CONTENT_SEARCH_WORKERS, self.CONTENT_SEARCH_EXECUTOR)
+            self._content_searcher.search(needle, paths, add_matches, cancelled, limit)
+
+    def _add_content_matches(self, generation: int, matches: List[ContentMatch]) -> None:
+        if generation != self._search_generation:
+            return # Late batch of an obsolete query
+        self._content_matches.extend(matches)
+        self._show_content_matches(generation)
+
+    def _show_content_matches(self, generation: int) -> None:
+        if generation != self._search_generation:
+            return
+        paths = [Path(match.path) for match in self._content_matches]
+        self._result_details = (paths, [f"{match.line_number}: {match.preview}" for match in self._content_matches])
+        self.current_search_results = paths
+        self._displayed_generation = generation
 
     async def watch_current_search_results(self, results: List[Path]) -> None:
-        results_list = self.query_one(SearchResultsList)
-        results_list.update_results(results)
+        results_list = self.query_one("#results-list")
+        details = None
+        if self._result_details is not None and self._result_details[0] is results:
+            details = self._result_details[1]
+        with metrics.stage("render"):
+            results_list.update_results(results, details)
+        # The highlighted row may show a new path without the cursor moving
+        self._show_preview(self._highlighted_result())
+
+    def _highlighted_result(self) -> Optional[Path]:
+        """The result under the cursor, else the first one (which enter opens from the input)."""
+        results = self.current_search_results
+        index = self.query_one("#results-list").index
+        if index is not None and 0 <= index < len(results):
+            return results[index]
+        return results[0] if results else None
+
+    def on_search_results_list_result_highlighted(self, event: SearchResultsList.ResultHighlighted) -> None:
+        self._show_preview(event.path if event.path is not None else self._highlighted_result())
+
+    def _show_preview(self, path: Optional[Path]) -> None:
+        """
+        Shows the preview of `path`: at once if it is cached (the cached copy is
+        then revalidated), otherwise once a worker thread has built it.
+        """
+        if not self.PREVIEW or path == self._preview_path:
+            return
+        self._preview_path = path
+        pane = self.query_one(PreviewPane)
+        if path is None:
+            pane.show_preview(None, None)
+            return
+        cached = self._preview_cache.peek(str(path))
+        if cached is not None:
+            pane.show_preview(path, cached)
+        self.run_worker(
+            partial(self._preview_worker, path, cached),
+            name="preview", group="preview", exclusive=True, thread=True, exit_on_error=False,
+        )
+
+    def _preview_worker(self, path: Path, shown: Optional[Preview]) -> None:
+        with metrics.stage("preview"):
+            preview = self._preview_cache.get(str(path))
+        if preview != shown and not get_current_worker().is_cancelled:
+            self.call_from_thread(self._apply_preview, path, preview)
+
+    def _apply_preview(self, path: Path, preview: Preview) -> None:
+        if path == self._preview_path: # Else the cursor has moved on
+            self.query_one(PreviewPane).show_preview(path, preview)
 
     async def on_input_changed(self, event: Input.Changed) -> None:
         """
@@ -69,12 +635,28 @@ class FileSearchApp(App):
         if query.startswith(":"):
             # User wants to chat. Switch to chat screen.
             # Clear input and current search results immediately
+            self._search_generation += 1 # Drop any search still in flight
             self.query_one(SearchInput).value = ""
             self.current_search_results = []
             self.push_screen("chat_screen") # Push the chat screen onto the stack
+        elif not query:
+            self._search_generation += 1
+            self._displayed_generation = self._search_generation
+            self.current_search_results = []
+        elif query.startswith(self.CONTENT_SEARCH_PREFIX):
+            needle = query[len(self.CONTENT_SEARCH_PREFIX):]
+            if needle:
+                self._start_content_search(needle)
+            else:
+                self._search_generation += 1
+                self._displayed_generation = self._search_generation
+                self.current_search_results = []
         else:
-            # Regular fuzzy search
-            self.current_search_results = fuzzy_search(query, self.all_home_paths, limit=10)
+            # Regular fuzzy search, off the event loop
+            started = time.perf_counter()
+            self._start_search(query)
+            self._keystroke_start = (self._search_generation, started)
+            self._show_hot_results(query)
 
     async def on_key(self, event: Key) -> None:
         """
@@ -82,7 +664,7 @@ class FileSearchApp(App):
         and for opening files.
         """
         search_input = self.query_one(SearchInput)
-        results_list = self.query_one(SearchResultsList)
+        results_list = self.query_one("#results-list")
 
         if event.key == "down":
             if self.focused == search_input:
@@ -108,14 +690,14 @@ class FileSearchApp(App):
             if self.focused == search_input:
                 if self.current_search_results:
                     selected_path = self.current_search_results[0]
-                    open_file_or_directory(selected_path)
+                    self._open_path(selected_path)
                     search_input.value = ""
                     self.current_search_results = []
                     event.prevent_default()
             elif self.focused == results_list:
                 if results_list.index is not None and 0 <= results_list.index < len(self.current_search_results):
                     selected_path = self.current_search_results[results_list.index]
-                    open_file_or_directory(selected_path)
+                    self._open_path(selected_path)
                     search_input.value = ""
                     self.current_search_results = []
                     search_input.focus()
@@ -125,15 +707,74 @@ class FileSearchApp(App):
         """
         Handles the custom `ResultSelected` message from `SearchResultsList`.
         """
-        open_file_or_directory(event.path)
+        self._open_path(event.path)
         self.query_one(SearchInput).value = ""
         self.current_search_results = []
         self.query_one(SearchInput).focus()
 
+    def _open_path(self, path: Path) -> None:
+        """Opens `path` with the default application in the background; failures are notified."""
+        if self.FRECENCY:
+            self._frecency.record(path) # Saved by a background thread
+        self.run_worker(partial(self._launch, path), name="launch", group="launch", exit_on_error=False)
+
+    async def _launch(self, path: Path) -> None:
+        try:
+            await launch_path_async(path)
+        except LaunchError as e:
+            self.notify(str(e), title="Could not open", severity="error", timeout=8)
+
     def action_quit(self) -> None:
         """Quit the application."""
+        self._stop_watchers()
+        if self._daemon is not None:
+            self._daemon.close()
+        if self._sharded_engine is not None:
+            self._sharded_engine.close()
+        if self._content_searcher is not None:
+            self._content_searcher.close()
+        self._frecency.flush()
         self.exit()
 
+    def action_toggle_stats(self) -> None:
+        """Shows or hides the latency stats panel."""
+        panel = self.query_one(StatsPanel)
+        panel.toggle_class("-visible")
+        if panel.has_class("-visible"):
+            self._refresh_stats()
+            self._stats_timer = self.set_interval(self.STATS_REFRESH_INTERVAL, self._refresh_stats)
+        elif self._stats_timer is not None:
+            self._stats_timer.stop()
+            self._stats_timer = None
+
+    def _refresh_stats(self) -> None:
+        self.query_one(StatsPanel).update_stats(metrics.summary())
+
+    def action_export_stats(self) -> None:
+        """Writes the stage summary (JSON) and the recorded spans (trace events)."""
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        summary_path = self._stats_dir / f"stats-{stamp}.json"
+        trace_path = self._stats_dir / f"trace-{stamp}.json"
+        try:
+            metrics.export_json(summary_path)
+            metrics.export_trace(trace_path)
+        except OSError as error:
+            self.notify(f"Could not export stats: {error}", severity="error")
+            return
+        self.notify(f"Stats written to {summary_path} and {trace_path}")
+
+    def action_profile_slow_query(self) -> None:
+        """Profiles searches until one is slower than PROFILE_THRESHOLD_MS."""
+        self.slow_query_profiler.arm()
+        self.notify(f"Profiling the next search slower than {self.slow_query_profiler.threshold_ms:.0f} ms")
+
+    def _report_profile(self, message: str, failed: bool) -> None:
+        """Runs in the search worker thread."""
+        self.log(message)
+        self.call_from_thread(
+            self.notify, message, title="Slow query profile", severity="error" if failed else "information"
+        )
+
     def action_focus_search(self) -> None:
         """Action to focus the search input."""
         self.query_one(SearchInput).focus()
@@ -0,0 +1,289 @@
+# textual_file_search/batch_scorer.py
+"""
+NumPy batch scorer for `PathStore` searches.
+
+The lowercase paths of a store are encoded once into flat code-point arrays
+(in chunks of `CHUNK_SIZE` entries) plus per-entry start offsets and lengths.
+A query is then scored against every entry of a chunk with a handful of array
+operations per query character, instead of one Python loop per path:
+
+- substring / exact matches start from the occurrences of the query's first
+  character, are narrowed down one character at a time and then mapped back
+  to their entries;
+- the greedy in-order match advances one query character at a time, finding
+  every entry's next occurrence with `searchsorted` over the positions of that
+  character, and adds the consecutive and path-component-start bonuses.
+
+The results are bit-for-bit the same as `search.fuzzy_match_score`, which
+stays the reference implementation. NumPy is optional; `available()` reports
+whether this module can be used.
+"""
+import heapq
+import threading
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional
+    np = None
+
+from path_store import PathStore, PathStoreView
+
+# Entries per encoded chunk. Appends only re-encode the trailing chunk.
+CHUNK_SIZE = 65536
+
+_SLASH = ord('/')
+_BACKSLASH = ord('\\')
+
+
+def available() -> bool:
+    return np is not None
+
+
+def encode_text(text: str):
+    """Encodes a string as a code-point array (uint8 when possible)."""
+    try:
+        return np.frombuffer(text.encode('latin-1'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+
+class EncodedChunk:
+    """
+    Encoded lowercase paths for the ids `first_id .. first_id + count - 1`:
+    a flat code-point buffer plus each entry's start offset and length.
+    """
+    __slots__ = ("first_id", "count", "buf", "starts", "lengths", "_positions")
+
+    # Per-character position arrays kept per chunk. Consecutive keystrokes
+    # mostly reuse the same characters ("r", "re", "rep", ...).
+    POSITION_CACHE_SIZE = 8
+
+    def __init__(self, first_id: int, buf, starts, lengths) -> None:
+        self.first_id = first_id
+        self.count = len(starts)
+        self.buf = buf
+        self.starts = starts
+        self.lengths = lengths
+        self._positions: Dict[int, "np.ndarray"] = {}
+
+    @classmethod
+    def from_store(cls, store: PathStore, first_id: int, stop_id: int) -> "EncodedChunk":
+        texts = [store.lower_str(entry_id) for entry_id in range(first_id, stop_id)]
+        count = stop_id - first_id
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=count)
+        starts = np.zeros(count, dtype=np.int64)
+        if count > 1:
+            np.cumsum(lengths[:-1], out=starts[1:])
+        return cls(first_id, encode_text("".join(texts)), starts, lengths)
+
+    def score(self, query: str):
+        """Scores every entry of the chunk; see `score_arrays`."""
+        return score_arrays(query, self.buf, self.starts, self.lengths, self.positions)
+
+    def positions(self, code: int):
+        """Sorted buffer offsets at which `code` occurs."""
+        found = self._positions.pop(code, None)
+        if found is None:
+            found = _positions_in(self.buf, code)
+            if len(self._positions) >= self.POSITION_CACHE_SIZE:
+                try:
+                    del self._positions[next(iter(self._positions))] # Least recently used
+                except (KeyError, RuntimeError, StopIteration):
+                    pass # Another search changed the cache meanwhile
+        self._positions[code] = found
+        return found
+
+
+def _positions_in(buf, code: int):
+    if code > np.iinfo(buf.dtype).max:
+        return np.empty(0, dtype=np.int64) # Cannot occur in this buffer
+    return np.flatnonzero(buf == code)
+
+
+class EncodedPathStore:
+    """
+    Lazily maintained array encoding of a `PathStore`. Call `refresh()` before
+    scoring; it re-encodes only what changed since the last call. `chunks` is
+    replaced, never changed in place, so a search can keep using the list it
+    read while another thread refreshes.
+    """
+    def __init__(self, store: PathStore) -> None:
+        self.store = store
+        self.chunks: List[EncodedChunk] = []
+        self._generation = store.generation
+        self._next_id = 0
+
+    def refresh(self) -> None:
+        store = self.store
+        if store.generation != self._generation:
+            self.chunks = []
+            self._generation = store.generation
+            self._next_id = 0
+        if self._next_id == store.next_id:
+            return
+
+        chunks = list(self.chunks)
+        first_id = self._next_id
+        if chunks and chunks[-1].count < CHUNK_SIZE:
+            first_id = chunks.pop().first_id # Re-encode the partial tail chunk
+        for start in range(first_id, store.next_id, CHUNK_SIZE):
+            chunks.append(EncodedChunk.from_store(store, start, min(start + CHUNK_SIZE, store.next_id)))
+        self.chunks = chunks
+        self._next_id = store.next_id
+
+
+_encoded_stores: "weakref.WeakKeyDictionary[PathStore, EncodedPathStore]" = weakref.WeakKeyDictionary()
+# Searches on the event loop and in worker threads may refresh the same encoding.
+_encoded_stores_lock = threading.Lock()
+
+
+def encoded(store: PathStore) -> List[EncodedChunk]:
+    """Returns the (refreshed) encoded chunks of `store`, creating its encoding on first use."""
+    with _encoded_stores_lock:
+        encoding = _encoded_stores.get(store)
+        if encoding is None:
+            encoding = _encoded_stores[store] = EncodedPathStore(store)
+        encoding.refresh()
+        return encoding.chunks
+
+
+def score_arrays(query: str, buf, starts, lengths, positions_of: Optional[Callable] = None):
+    """
+    Scores an already-lowercased query against every text in a flat buffer.
+    Returns a float64 array with the same values `fuzzy_match_score` gives.
+    `positions_of(code)` may supply cached character positions for `buf`.
+    """
+    count = len(starts)
+    query_length = len(query)
+    ends = starts + lengths
+    codes = [ord(char) for char in query]
+    if positions_of is None:
+        positions_of = lambda code: _positions_in(buf, code)
+
+    # Substring matches: take the occurrences of the query's first character,
+    # keep those followed by the rest of the query, and map them to entries.
+    substring = np.zeros(count, dtype=bool)
+    hit = positions_of(codes[0])
+    hit = hit[hit + query_length <= len(buf)]
+    for offset, code in enumerate(codes[1:], start=1):
+        if not len(hit):
+            break
+        hit = hit[buf[hit + offset] == code]
+    if len(hit):
+        owner = np.searchsorted(starts, hit, side="right") - 1
+        inside = hit + query_length <= ends[owner]
+        substring[owner[inside]] = True
+    exact = substring & (lengths == query_length)
+
+    # Greedy in-order matching, one query character at a time.
+    score = np.zeros(count, dtype=np.float64)
+    matched = np.zeros(count, dtype=np.int64)
+    next_pos = starts.copy()
+    last_pos = np.full(count, -2, dtype=np.int64)
+    active = np.arange(count)
+
+    for code in codes:
+        if not len(active):
+            break
+        positions = positions_of(code)
+        if not len(positions):
+            break # Nobody can match this character, so nobody matches further
+        k = np.searchsorted(positions, next_pos[active])
+        in_range = k < len(positions)
+        found_pos = positions[np.minimum(k, len(positions) - 1)]
+        found = in_range & (found_pos < ends[active])
+
+        rows = active[found]
+        pos = found_pos[found]
+        score[rows] += 1.0
+        score[rows] += np.where((matched[rows] > 0) & (pos == last_pos[rows] + 1), 0.5, 0.0)
+        previous = buf[np.maximum(pos - 1, 0)]
+        at_start = (pos == starts[rows]) | (previous == _SLASH) | (previous == _BACKSLASH)
+        score[rows] += np.where(at_start, 0.75, 0.0)
+        matched[rows] += 1
+        last_pos[rows] = pos
+        next_pos[rows] = pos + 1
+        active = rows # Entries that missed a character stop matching
+
+    score -= (query_length - matched) * 0.5
+    score = score / (query_length + lengths * 0.1 + 1e-6)
+    np.maximum(score, 0.0, out=score)
+    score[substring] = 1.5 + (query_length / lengths[substring])
+    score[exact] = 2.0
+    return score
+
+
+def _gather(chunk: EncodedChunk, local_ids):
+    """Builds a compact buffer holding only the rows `local_ids` of `chunk`."""
+    lengths = chunk.lengths[local_ids]
+    starts = np.zeros(len(local_ids), dtype=np.int64)
+    if len(local_ids) > 1:
+        np.cumsum(lengths[:-1], out=starts[1:])
+    gather = np.repeat(chunk.starts[local_ids] - starts, lengths) + np.arange(int(lengths.sum()))
+    return chunk.buf[gather], starts, lengths
+
+
+def top_results(scores, ids, limit: int) -> List[Tuple[float, int]]:
+    """Best `limit` (score, id) pairs, ranked by score then id."""
+    if len(scores) > limit:
+        # Keep everything tied with the limit-th score so id tie-breaks stay exact.
+        threshold = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+        keep = scores >= threshold
+        scores, ids = scores[keep], ids[keep]
+    order = np.lexsort((ids, -scores))[:limit]
+    return list(zip(scores[order].tolist(), ids[order].tolist()))
+
+
+def score_store(
+    query: str,
+    items: Union[PathStore, PathStoreView],
+    limit: Optional[int] = None,
+    survivors: Optional[List[int]] = None,
+) -> List[Tuple[float, int]]:
+    """
+    Drop-in replacement for `search.score_store` (same arguments, same
+    results). Every live entry is scored, so `survivors` receives exactly the
+    ids that scored above zero.
+    """
+    store = items.store if isinstance(items, PathStoreView) else items
+    chunks = encoded(store)
+
+    requested = None
+    chunk_firsts = None
+    if isinstance(items, PathStoreView):
+        requested = np.unique(np.fromiter(items.ids, dtype=np.int64))
+        chunk_firsts = np.array([chunk.first_id for chunk in chunks], dtype=np.int64)
+        chunk_of = np.searchsorted(chunk_firsts, requested, side="right") - 1
+
+    all_results: List[Tuple[float, int]] = []
+    for index, chunk in enumerate(chunks):
+        if requested is None:
+            scores = chunk.score(query)
+            ids = np.arange(chunk.first_id, chunk.first_id + chunk.count, dtype=np.int64)
+        else:
+            ids = requested[chunk_of == index]
+            if not len(ids):
+                continue
+            if len(ids) * 2 > chunk.count:
+                # Most of the chunk is requested: scoring it whole (with the
+                # cached character positions) beats gathering the rows.
+                scores = chunk.score(query)
+                scores = scores[ids - chunk.first_id]
+            else:
+                scores = score_arrays(query, *_gather(chunk, ids - chunk.first_id))
+
+        alive = np.frombuffer(store.alive_flags(chunk.first_id, chunk.first_id + chunk.count), dtype=np.uint8)
+        keep = (scores > 0) & (alive[ids - chunk.first_id] == 1)
+        scores, ids = scores[keep], ids[keep]
+        if survivors is not None:
+            survivors.extend(ids.tolist())
+        if limit is None:
+            all_results.extend(zip(scores.tolist(), ids.tolist()))
+        elif limit > 0 and len(ids):
+            all_results.extend(top_results(scores, ids, limit))
+
+    if limit is None:
+        return all_results
+    return heapq.nsmallest(limit, all_results, key=lambda result: (-result[0], result[1]))
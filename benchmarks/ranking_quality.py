@@ -0,0 +1,116 @@
+# textual_file_search/benchmarks/ranking_quality.py
+"""
+Ranking-quality comparison of the scorers in search.py.
+
+Queries are derived from randomly picked target files of the synthetic tree,
+imitating how people look for a file they know:
+
+- "name":   the file name without its extension          (main_utils)
+- "parent": the parent directory and the file name's stem (src/main_utils)
+- "abbrev": the first letters of each word of the name    (mautils -> maut)
+- "typo":   the file name with two adjacent letters swapped (mian_utils)
+
+Each query is searched over the whole tree and the rank of the first
+relevant result recorded. The synthetic tree repeats names a lot, and the
+query cannot tell apart files with the same name (and, for "parent", the
+same parent directory), so any of those counts as the target.
+"""
+import os
+import random
+import re
+from typing import Callable, Dict, List, NamedTuple, Sequence
+
+from benchmarks.tree_generator import _WORDS
+
+# Results looked at per query; a target ranked lower counts as a miss.
+DEPTH = 20
+
+QUERY_KINDS = ("name", "parent", "abbrev", "typo")
+
+
+class Case(NamedTuple):
+    kind: str
+    query: str
+    target: str
+    answer: str # Trailing path components a relevant result ends with
+
+
+def _tail(path: str, components: int) -> str:
+    return os.sep.join(path.split(os.sep)[-components:])
+
+
+def _stem(path: str) -> str:
+    name = os.path.basename(path)
+    stem, _ = os.path.splitext(name)
+    return stem or name
+
+
+def _words(stem: str) -> List[str]:
+    """Splits a generated name into its vocabulary words (they may be joined without separators)."""
+    words = []
+    for part in re.split(r"[_\-.\d]+", stem):
+        while part:
+            word = max((word for word in _WORDS if part.startswith(word)), key=len, default=part)
+            words.append(word)
+            part = part[len(word):]
+    return words
+
+
+def make_query(kind: str, path: str, rng: random.Random) -> str:
+    stem = _stem(path)
+    if kind == "name":
+        return stem
+    if kind == "parent":
+        return f"{os.path.basename(os.path.dirname(path))}/{stem}"
+    if kind == "abbrev":
+        return "".join(word[:2] for word in _words(stem)) or stem
+    if kind == "typo":
+        if len(stem) < 4:
+            return stem
+        position = rng.randrange(1, len(stem) - 2) # Keep the first letter
+        return stem[:position] + stem[position + 1] + stem[position] + stem[position + 2:]
+    raise ValueError(f"Unknown query kind {kind!r}")
+
+
+def make_cases(paths: Sequence[str], per_kind: int, seed: int = 1234) -> List[Case]:
+    """`per_kind` cases of each kind, for files (paths with an extension) of `paths`."""
+    rng = random.Random(seed)
+    files = [path for path in paths if os.path.splitext(path)[1]]
+    cases = []
+    for kind in QUERY_KINDS:
+        # Abbreviating a one-word name gives just its first letters
+        candidates = [path for path in files if len(_words(_stem(path))) > 1] if kind == "abbrev" else files
+        for target in rng.sample(candidates, min(per_kind, len(candidates))):
+            query = make_query(kind, target, rng).lower()
+            cases.append(Case(kind, query, target, _tail(target, 2 if kind == "parent" else 1)))
+    return cases
+
+
+def evaluate(search: Callable[[str], List[str]], cases: Sequence[Case]) -> Dict[str, float]:
+    """
+    Runs `search` (query -> ranked path strings) for every case. Returns the
+    mean reciprocal rank of the first relevant result, the share of queries
+    with one ranked first and in the top 10, overall and per query kind
+    (e.g. "mrr/typo").
+    """
+    ranks: Dict[str, List[int]] = {kind: [] for kind in QUERY_KINDS}
+    for case in cases:
+        suffix = os.sep + case.answer
+        results = search(case.query)[:DEPTH]
+        ranks[case.kind].append(next(
+            (rank for rank, path in enumerate(results, 1) if path.endswith(suffix)), 0
+        ))
+
+    def summary(found: List[int], suffix: str = "") -> Dict[str, float]:
+        if not found:
+            return {}
+        return {
+            f"mrr{suffix}": sum(1 / rank for rank in found if rank) / len(found),
+            f"top1{suffix}": sum(rank == 1 for rank in found) / len(found),
+            f"top10{suffix}": sum(0 < rank <= 10 for rank in found) / len(found),
+        }
+
+    metrics = summary([rank for found in ranks.values() for rank in found])
+    for kind, found in ranks.items():
+        metrics.update(summary(found, f"/{kind}"))
+    return metrics
@@ -0,0 +1,337 @@
+# textual_file_search/benchmarks/run_benchmarks.py
+"""
+Benchmarks for the indexing, scoring, search and rendering paths.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks                       # print results
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --save-baseline       # store benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json
+
+Every benchmark runs against a synthetic tree from `tree_generator`, so the
+workload is identical between runs. Results are JSON; with `--baseline` each
+benchmark's median is compared to the stored one and the exit status is 1 if
+any of them got slower than `--tolerance` allows.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.tree_generator import TreeSpec, generate_tree
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+# Queries for the single-query benchmarks: very common, typical and rare.
+QUERIES = ["a", "src", "main.py", "docs/report", "zzq"]
+
+# Typed one keystroke at a time for the prefix-sequence benchmarks.
+TYPED_QUERY = "project/src/utils.py"
+
+# Ranking-quality cases per query kind (see ranking_quality.py).
+QUALITY_CASES_PER_KIND = 25
+
+# Pointed into the temporary directory while benchmarking, so the developer's
+# home, index snapshot, roots config (roots.json) and frecency store never
+# leak into the numbers.
+ISOLATED_ENVIRONMENT = ("HOME", "XDG_CACHE_HOME", "XDG_CONFIG_HOME", "XDG_DATA_HOME")
+
+BenchmarkResults = Dict[str, Dict[str, float]]
+
+
+def _timings(function: Callable[[], object], repeat: int) -> List[float]:
+    function() # Warm-up (imports, caches, encodings)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _summary(timings: List[float], **extra: float) -> Dict[str, float]:
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "max_ms": max(timings) * 1000,
+        "runs": len(timings),
+        **extra,
+    }
+
+
+class BenchmarkRunner:
+    """Builds the synthetic tree once and runs the selected benchmarks on it."""
+
+    def __init__(self, spec: TreeSpec, repeat: int, workdir: str) -> None:
+        self.spec = spec
+        self.repeat = repeat
+        self.home = os.path.join(workdir, "home")
+        self.cache = os.path.join(workdir, "cache")
+        os.makedirs(self.home)
+        self.paths = [Path(path) for path in generate_tree(self.home, spec)]
+        self.results: BenchmarkResults = {}
+
+        # Everything below reads Path.home() and the XDG locations from the environment.
+        os.environ["HOME"] = self.home
+        os.environ["XDG_CACHE_HOME"] = self.cache
+        os.environ["XDG_CONFIG_HOME"] = os.path.join(workdir, "config")
+        os.environ["XDG_DATA_HOME"] = os.path.join(workdir, "data")
+
+    def record(self, name: str, timings: List[float], **extra: float) -> None:
+        self.results[name] = _summary(timings, **extra)
+        print(f"{name:<40} median {self.results[name]['median_ms']:10.3f} ms")
+
+    def bench_walk(self) -> None:
+        from search import DEFAULT_WALK_WORKERS, get_home_directory_files
+
+        for workers in sorted({1, DEFAULT_WALK_WORKERS}):
+            timings = _timings(lambda: get_home_directory_files(max_workers=workers), self.repeat)
+            self.record(f"walk/workers={workers}", timings)
+
+        from index_cache import default_index_path, iter_home_index
+
+        def cold() -> None:
+            default_index_path().unlink(missing_ok=True)
+            for _ in iter_home_index():
+                pass
+
+        def warm() -> None:
+            for _ in iter_home_index():
+                pass
+
+        self.record("walk/index_cold", _timings(cold, self.repeat))
+        self.record("walk/index_warm", _timings(warm, self.repeat))
+
+    def bench_score(self) -> None:
+        from search import fuzzy_match_score
+
+        texts = [str(path) for path in self.paths]
+        for query in ("src", "main.py"):
+            timings = _timings(lambda: [fuzzy_match_score(query, text) for text in texts], self.repeat)
+            self.record(f"score/{query}", timings, per_path_us=statistics.median(timings) / len(texts) * 1e6)
+
+    def bench_search(self) -> None:
+        import search
+        from path_store import PathStore
+
+        store = PathStore(self.paths)
+        for query in QUERIES:
+            self.record(f"search/list/{query}", _timings(lambda: search.fuzzy_search(query, self.paths), self.repeat))
+            self.record(f"search/store/{query}", _timings(lambda: search.fuzzy_search(query, store), self.repeat))
+
+        use_batch_scorer = search.USE_BATCH_SCORER
+        search.USE_BATCH_SCORER = False
+        try:
+            for query in QUERIES:
+                self.record(f"search/store_python/{query}",
+                            _timings(lambda: search.fuzzy_search(query, store), self.repeat))
+        finally:
+            search.USE_BATCH_SCORER = use_batch_scorer
+
+    def bench_typed(self) -> None:
+        """Per-keystroke latency while typing `TYPED_QUERY` letter by letter."""
+        from path_store import PathStore
+        from search import fuzzy_search
+        from search_session import SearchSession
+
+        store = PathStore(self.paths)
+        prefixes = [TYPED_QUERY[:length] for length in range(1, len(TYPED_QUERY) + 1)]
+
+        def keystrokes(search_one: Callable[[str], object]) -> List[float]:
+            timings = []
+            for prefix in prefixes:
+                start = time.perf_counter()
+                search_one(prefix)
+                timings.append(time.perf_counter() - start)
+            return timings
+
+        for name, make_search in (
+            ("list", lambda: lambda prefix: fuzzy_search(prefix, self.paths)),
+            ("store", lambda: lambda prefix: fuzzy_search(prefix, store)),
+            ("session", lambda: SearchSession(store).search),
+        ):
+            timings: List[float] = []
+            for _ in range(self.repeat):
+                timings.extend(keystrokes(make_search()))
+            self.record(f"typed/{name}", timings, p95_ms=statistics.quantiles(timings, n=20)[-1] * 1000)
+
+    def bench_topk(self) -> None:
+        from search import fuzzy_search
+
+        for limit in (10, 100, 1000):
+            self.record(f"topk/list/a/limit={limit}",
+                        _timings(lambda: fuzzy_search("a", self.paths, limit=limit), self.repeat))
+
+    def _available_scorers(self) -> List[str]:
+        from search import SCORERS
+
+        return [name for name, scorer in SCORERS.items() if scorer.available()]
+
+    def bench_scorers(self) -> None:
+        """Each scorer of search.py: one query over the store, and typing `TYPED_QUERY`."""
+        from path_store import PathStore
+        from search import fuzzy_search, get_scorer
+        from search_session import SearchSession
+
+        store = PathStore(self.paths)
+        texts = [str(path).lower() for path in self.paths]
+        prefixes = [TYPED_QUERY[:length] for length in range(1, len(TYPED_QUERY) + 1)]
+        for name in self._available_scorers():
+            score = get_scorer(name).score
+            timings = _timings(lambda: [score("main.py", text) for text in texts], self.repeat)
+            self.record(f"scorers/{name}/score", timings,
+                        per_path_us=statistics.median(timings) / len(texts) * 1e6)
+            for query in QUERIES:
+                self.record(f"scorers/{name}/{query}",
+                            _timings(lambda: fuzzy_search(query, store, scorer=name), self.repeat))
+            timings = []
+            for _ in range(self.repeat):
+                session = SearchSession(store)
+                for prefix in prefixes:
+                    start = time.perf_counter()
+                    session.search(prefix, scorer=name)
+                    timings.append(time.perf_counter() - start)
+            self.record(f"scorers/{name}/typed", timings, p95_ms=statistics.quantiles(timings, n=20)[-1] * 1000)
+
+    def bench_quality(self) -> None:
+        """Ranking quality of each scorer (see ranking_quality.py); timings cover every query."""
+        from benchmarks.ranking_quality import evaluate, make_cases
+        from path_store import PathStore
+        from search import score_store
+
+        store = PathStore(self.paths)
+        cases = make_cases([str(path) for path in self.paths], QUALITY_CASES_PER_KIND, self.spec.seed)
+        for name in self._available_scorers():
+            def search(query: str) -> List[str]:
+                return [store.path_str(entry_id) for _, entry_id in score_store(query, store, 20, scorer=name)]
+
+            start = time.perf_counter()
+            quality = evaluate(search, cases)
+            self.record(f"quality/{name}", [time.perf_counter() - start], **quality)
+            print(f"{'':<40} mrr {quality['mrr']:.3f}  top1 {quality['top1']:.1%}  top10 {quality['top10']:.1%}  "
+                  + "  ".join(f"{kind} {quality[f'mrr/{kind}']:.2f}" for kind in ("name", "parent", "abbrev", "typo")))
+
+    def bench_render(self) -> None:
+        """`update_results` through Textual's headless pilot."""
+        from textual.app import App, ComposeResult
+        from widgets import SearchResultsList, VirtualSearchResultsList
+
+        def result_sets(count: int) -> List[List[Path]]:
+            # Consecutive keystrokes: overlapping, shifting result lists.
+            return [self.paths[offset:offset + count] for offset in range(0, 50 * 7, 7)]
+
+        for name, widget_class, count in (
+            ("list/10", SearchResultsList, 10),
+            ("virtual/10", VirtualSearchResultsList, 10),
+            ("virtual/2000", VirtualSearchResultsList, 2000),
+        ):
+            class RenderApp(App):
+                def compose(self) -> ComposeResult:
+                    yield widget_class(id="results-list")
+
+            async def run() -> List[float]:
+                timings = []
+                app = RenderApp()
+                async with app.run_test(size=(120, 40)) as pilot:
+                    results_list = app.query_one("#results-list")
+                    for results in result_sets(count) * self.repeat:
+                        start = time.perf_counter()
+                        results_list.update_results(results)
+                        await pilot.pause() # Let layout and rendering run
+                        timings.append(time.perf_counter() - start)
+                return timings
+
+            self.record(f"render/{name}", asyncio.run(run()))
+
+    BENCHMARKS = ("walk", "score", "search", "typed", "topk", "render", "scorers", "quality")
+
+    def run(self, names: List[str]) -> BenchmarkResults:
+        for name in names:
+            getattr(self, f"bench_{name}")()
+        return self.results
+
+
+def compare(results: BenchmarkResults, baseline: BenchmarkResults, tolerance: float) -> bool:
+    """Prints each benchmark's change against `baseline`; False if any regressed."""
+    ok = True
+    print(f"\n{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<40} {'-':>12} {result['median_ms']:10.3f}ms {'new':>8}")
+            continue
+        before, now = baseline[name]["median_ms"], result["median_ms"]
+        change = (now - before) / before if before else 0.0
+        regressed = change > tolerance
+        ok = ok and not regressed
+        print(f"{name:<40} {before:10.3f}ms {now:10.3f}ms {change:+7.1%}{'  REGRESSED' if regressed else ''}")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help=f"Comma-separated benchmarks ({', '.join(BenchmarkRunner.BENCHMARKS)})")
+    parser.add_argument("--files", type=int, default=TreeSpec().files, help="Files in the synthetic tree")
+    parser.add_argument("--depth", type=int, default=TreeSpec().max_depth, help="Maximum directory depth")
+    parser.add_argument("--seed", type=int, default=TreeSpec().seed)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against this results file")
+    parser.add_argument("--save-baseline", nargs="?", const=str(DEFAULT_BASELINE),
+                        help=f"Store the results as the baseline (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed slowdown against the baseline (default: 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(BenchmarkRunner.BENCHMARKS)
+    unknown = [name for name in names if name not in BenchmarkRunner.BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    spec = TreeSpec(files=args.files, max_depth=args.depth, seed=args.seed)
+    environment = {key: os.environ.get(key) for key in ISOLATED_ENVIRONMENT}
+    try:
+        with tempfile.TemporaryDirectory(prefix="fuzzy_file_search_bench_") as workdir:
+            runner = BenchmarkRunner(spec, args.repeat, workdir)
+            print(f"Synthetic tree: {len(runner.paths):,} paths ({spec})")
+            results = runner.run(names)
+    finally:
+        for key, value in environment.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "spec": spec._asdict(),
+            "paths": len(runner.paths),
+        },
+        "results": results,
+    }
+    for destination in (args.output, args.save_baseline):
+        if destination:
+            Path(destination).write_text(json.dumps(report, indent=2))
+            print(f"Results written to {destination}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline["meta"].get("spec") != report["meta"]["spec"]:
+            print("Warning: the baseline was recorded on a different synthetic tree.")
+        return 0 if compare(results, baseline["results"], args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
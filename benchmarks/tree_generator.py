@@ -0,0 +1,113 @@
+# textual_file_search/benchmarks/tree_generator.py
+"""
+Deterministic synthetic home directory trees for the benchmarks.
+
+The same `TreeSpec` (including its seed) always produces the same paths, so
+timings from different runs and machines measure the same workload. Names are
+drawn from a small vocabulary with a Zipf-like distribution (a few names are
+very common, most are rare), which is roughly what real home directories look
+like and what makes short queries match many paths.
+"""
+import os
+import random
+from typing import List, NamedTuple
+
+_WORDS = [
+    "src", "lib", "test", "docs", "build", "main", "utils", "config", "data", "assets",
+    "project", "notes", "report", "backup", "images", "scripts", "app", "core", "api", "models",
+    "views", "server", "client", "common", "tools", "vendor", "legacy", "archive", "draft", "final",
+    "photos", "music", "invoice", "thesis", "resume", "budget", "plugin", "module", "widget", "schema",
+]
+_EXTENSIONS = [
+    ".py", ".txt", ".md", ".json", ".js", ".ts", ".rs", ".go", ".c", ".h",
+    ".png", ".jpg", ".pdf", ".csv", ".yaml", ".toml", ".html", ".css", ".sh", "",
+]
+# Names the walker prunes; a few of them keep the exclusion paths exercised.
+_EXCLUDED_DIRS = [".git", "node_modules", "__pycache__", ".cache", "venv"]
+
+
+class TreeSpec(NamedTuple):
+    """Shape of a synthetic tree."""
+    files: int = 20000             # Number of files (directories come on top)
+    max_depth: int = 8             # Deepest directory level below the root
+    dirs_per_level: int = 6        # Average subdirectories per directory
+    files_per_dir: int = 12        # Average files per directory
+    excluded_fraction: float = 0.02 # Share of directories with an excluded name
+    seed: int = 1234
+
+
+def _zipf_choice(rng: random.Random, items: List[str]) -> str:
+    # Rank r is picked with weight 1/r.
+    weights = [1.0 / rank for rank in range(1, len(items) + 1)]
+    return rng.choices(items, weights=weights)[0]
+
+
+def _name(rng: random.Random, is_dir: bool) -> str:
+    words = [_zipf_choice(rng, _WORDS) for _ in range(rng.randint(1, 3))]
+    name = rng.choice(("_", "-", "")).join(words)
+    if rng.random() < 0.3:
+        name += str(rng.randint(0, 99))
+    return name if is_dir else name + _zipf_choice(rng, _EXTENSIONS)
+
+
+def generate_paths(spec: TreeSpec) -> List[str]:
+    """
+    Returns the relative paths of the tree described by `spec`, directories
+    before their contents, without touching the filesystem.
+    """
+    rng = random.Random(spec.seed)
+    paths: List[str] = []
+    frontier: List[tuple] = [("", 0)] # (relative directory, depth)
+    seen = set() # Relative paths taken so far, files and directories alike
+    files = 0
+    while files < spec.files:
+        if not frontier:
+            frontier.append(("", 0)) # Every branch hit max_depth; widen the root
+        position = rng.randrange(len(frontier))
+        directory, depth = frontier[position]
+
+        for _ in range(max(1, int(rng.expovariate(1 / spec.files_per_dir)))):
+            path = os.path.join(directory, _name(rng, is_dir=False))
+            if path in seen:
+                continue
+            seen.add(path)
+            paths.append(path)
+            files += 1
+            if files >= spec.files:
+                break
+
+        if depth < spec.max_depth:
+            for _ in range(rng.randint(0, 2 * spec.dirs_per_level)):
+                if rng.random() < spec.excluded_fraction:
+                    name = rng.choice(_EXCLUDED_DIRS)
+                else:
+                    name = _name(rng, is_dir=True)
+                child = os.path.join(directory, name)
+                if child in seen:
+                    continue
+                seen.add(child)
+                paths.append(child + os.sep)
+                frontier.append((child, depth + 1))
+        # Each directory is filled once.
+        frontier[position] = frontier[-1]
+        frontier.pop()
+    return paths
+
+
+def materialize(root: str, relative_paths: List[str]) -> None:
+    """Creates the tree under `root`. Directory paths end with a separator."""
+    for relative in relative_paths:
+        path = os.path.join(root, relative)
+        if relative.endswith(os.sep):
+            os.makedirs(path, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb"):
+                pass
+
+
+def generate_tree(root: str, spec: TreeSpec) -> List[str]:
+    """Creates the tree for `spec` under `root` and returns its absolute paths."""
+    relative_paths = generate_paths(spec)
+    materialize(root, relative_paths)
+    return [os.path.join(root, relative.rstrip(os.sep)) for relative in relative_paths]
@@ -0,0 +1,106 @@
+# textual_file_search/cli.py
+"""
+Command-line entry point for scripts and the search daemon.
+
+    python cli.py serve              # run the daemon in the foreground
+    python cli.py query rep -n 5     # print the top 5 paths, one per line
+    python cli.py status
+    python cli.py stop
+
+`query` falls back to searching the on-disk snapshot in-process when no
+daemon is running (slower, since the snapshot has to be refreshed first).
+"""
+import argparse
+import json
+import sys
+
+from search import DEFAULT_SCORER, SCORERS
+from search_daemon import DaemonError, SearchDaemon, connect_to_daemon
+
+
+def _query(args: argparse.Namespace) -> int:
+    client = connect_to_daemon(args.socket)
+    if client is not None:
+        with client:
+            results = client.search_scored(args.query, args.limit, args.scorer)
+    else:
+        print("No search daemon running; searching in-process.", file=sys.stderr)
+        from index_cache import load_home_index
+        from search import fuzzy_search
+        results = [
+            (score, str(path))
+            for score, path in fuzzy_search(
+                args.query, load_home_index(), args.limit, with_scores=True, scorer=args.scorer
+            )
+        ]
+
+    for score, path in results:
+        print(f"{score:.4f}\t{path}" if args.scores else path)
+    return 0 if results else 1
+
+
+def _status(args: argparse.Namespace) -> int:
+    client = connect_to_daemon(args.socket)
+    if client is None:
+        print("No search daemon running.", file=sys.stderr)
+        return 1
+    with client:
+        status = client.status()
+    status.pop("ok", None)
+    print(json.dumps(status, indent=2))
+    return 0
+
+
+def _stop(args: argparse.Namespace) -> int:
+    client = connect_to_daemon(args.socket)
+    if client is None:
+        print("No search daemon running.", file=sys.stderr)
+        return 1
+    with client:
+        client.shutdown()
+    return 0
+
+
+def _serve(args: argparse.Namespace) -> int:
+    daemon = SearchDaemon(args.socket, watcher_backend=args.watcher)
+    try:
+        daemon.serve_forever()
+    except RuntimeError as error: # Another daemon already owns the socket
+        print(error, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fuzzy file search over the home directory.")
+    parser.add_argument("--socket", help="Daemon socket path (default: $XDG_RUNTIME_DIR/fuzzy_file_search.sock)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Run the search daemon in the foreground")
+    serve.add_argument("--watcher", default="auto", choices=["auto", "inotify", "watchdog", "polling"],
+                       help="Filesystem watcher backend")
+    serve.set_defaults(handler=_serve)
+
+    query = commands.add_parser("query", help="Print the best matches for a query")
+    query.add_argument("query")
+    query.add_argument("-n", "--limit", type=int, default=10, help="Number of results (default: 10)")
+    query.add_argument("--scores", action="store_true", help="Prefix each path with its score")
+    query.add_argument("--scorer", choices=sorted(SCORERS),
+                       help=f"How matches are scored and ranked (default: {DEFAULT_SCORER})")
+    query.set_defaults(handler=_query)
+
+    commands.add_parser("status", help="Show the daemon's index status").set_defaults(handler=_status)
+    commands.add_parser("stop", help="Stop the daemon").set_defaults(handler=_stop)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args)
+    except (OSError, DaemonError, ValueError) as error: # ValueError: scorer not installed
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# textual_file_search/content_search.py
+"""
+Content search over the files already in the index ("which file contains X").
+
+Each file is memory-mapped and searched in place, so large files are never
+copied into Python strings; only the lines that match are decoded for the
+preview. Files above a size limit, empty files and binary files (a NUL byte
+in the first few KiB, the same heuristic git and grep use) are skipped.
+
+Files are searched in chunks on a thread pool (or, for CPU-bound searches on
+a warm page cache, a process pool). Matches are streamed to a callback as each
+chunk finishes, and the search stops as soon as its `cancelled()` callback
+says the query changed.
+
+Matching is "smart case": case-insensitive unless the query has an uppercase
+letter.
+"""
+import mmap
+import os
+import re
+import stat
+import threading
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+from utils import real_stderr
+
+# Files larger than this are skipped.
+MAX_FILE_SIZE = 8 * 1024 * 1024
+
+# A NUL byte in this many leading bytes marks a file as binary.
+BINARY_SNIFF_BYTES = 8192
+
+# Matches reported per file; the first few lines are enough to pick a file.
+MAX_MATCHES_PER_FILE = 3
+
+# Characters of context kept around the match in a preview line.
+PREVIEW_WIDTH = 160
+
+# Files per work item. Small enough to cancel promptly and stream results
+# early, large enough to keep the pool overhead low.
+CHUNK_SIZE = 64
+
+DEFAULT_CONTENT_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+
+
+class ContentMatch(NamedTuple):
+    path: str
+    line_number: int # 1-based
+    preview: str     # The matching line, trimmed around the match
+
+
+def compile_query(query: str) -> "re.Pattern[bytes]":
+    """Literal, smart-case byte pattern for `query`."""
+    flags = 0 if any(char.isupper() for char in query) else re.IGNORECASE
+    return re.compile(re.escape(query.encode("utf-8")), flags)
+
+
+def _preview(line: bytes, match_start: int) -> str:
+    text = line.decode("utf-8", errors="replace").rstrip("\r")
+    if len(text) <= PREVIEW_WIDTH:
+        return text.strip()
+    # Keep the match visible in long lines (minified files, logs).
+    start = max(0, min(match_start - PREVIEW_WIDTH // 4, len(text) - PREVIEW_WIDTH))
+    return ("…" if start else "") + text[start:start + PREVIEW_WIDTH].strip() + "…"
+
+
+def search_file(
+    path: str,
+    pattern: "re.Pattern[bytes]",
+    max_matches: int = MAX_MATCHES_PER_FILE,
+    max_size: int = MAX_FILE_SIZE,
+) -> List[ContentMatch]:
+    """Returns the first `max_matches` matching lines of one file."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return []
+    try:
+        info = os.fstat(fd)
+        if not stat.S_ISREG(info.st_mode) or info.st_size == 0 or info.st_size > max_size:
+            return []
+        try:
+            mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return []
+    finally:
+        os.close(fd)
+
+    with mapped:
+        if mapped.find(b"\0", 0, BINARY_SNIFF_BYTES) != -1:
+            return [] # Binary file
+        matches: List[ContentMatch] = []
+        line_number, counted_up_to = 1, 0
+        position = 0
+        while len(matches) < max_matches:
+            found = pattern.search(mapped, position)
+            if found is None:
+                break
+            line_start = mapped.rfind(b"\n", 0, found.start()) + 1
+            line_end = mapped.find(b"\n", found.end())
+            if line_end == -1:
+                line_end = len(mapped)
+            line_number += mapped[counted_up_to:line_start].count(b"\n")
+            counted_up_to = line_start
+            matches.append(ContentMatch(
+                path, line_number, _preview(mapped[line_start:line_end], found.start() - line_start)
+            ))
+            position = line_end + 1 # One match per line
+        return matches
+
+
+def search_files(paths: List[str], query: str, max_matches: int = MAX_MATCHES_PER_FILE) -> List[ContentMatch]:
+    """Searches a chunk of files. Module-level so process pools can pickle it."""
+    pattern = compile_query(query)
+    matches: List[ContentMatch] = []
+    for path in paths:
+        matches.extend(search_file(path, pattern, max_matches))
+    return matches
+
+
+def _chunks(paths: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ContentSearcher:
+    """
+    Runs content searches on a persistent pool. `executor` is "thread"
+    (default; best when reads hit the disk) or "process" (parallel regex
+    matching when the files are in the page cache).
+    """
+
+    def __init__(self, workers: int = DEFAULT_CONTENT_WORKERS, executor: str = "thread") -> None:
+        self.workers = max(1, workers)
+        self.executor_kind = executor
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.executor_kind == "process":
+                    import multiprocessing
+                    with real_stderr(): # Workers start lazily, but the call context is set here
+                        self._executor = ProcessPoolExecutor(
+                            self.workers, mp_context=multiprocessing.get_context("spawn")
+                        )
+                else:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="content-search")
+            return self._executor
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def search(
+        self,
+        query: str,
+        paths: Iterable[str],
+        on_matches: Callable[[List[ContentMatch]], None],
+        cancelled: Callable[[], bool] = lambda: False,
+        limit: Optional[int] = None,
+    ) -> bool:
+        """
+        Searches `paths` for `query`, calling `on_matches` with each non-empty
+        batch in completion order. Stops once `limit` matches were reported.
+        Returns False if `cancelled()` stopped the search early.
+        """
+        if not query:
+            return True
+        executor = self._get_executor()
+        chunks = _chunks(paths, CHUNK_SIZE)
+        pending = set()
+        reported = 0
+        try:
+            while True:
+                # Keep a bounded number of chunks in flight so cancellation is prompt.
+                while len(pending) < self.workers * 2:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    if self.executor_kind == "process":
+                        with real_stderr():
+                            pending.add(executor.submit(search_files, chunk, query))
+                    else:
+                        pending.add(executor.submit(search_files, chunk, query))
+                if not pending:
+                    return True
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                if cancelled():
+                    return False
+                for future in done:
+                    matches = future.result()
+                    if limit is not None:
+                        matches = matches[:limit - reported]
+                    if matches:
+                        reported += len(matches)
+                        on_matches(matches)
+                    if limit is not None and reported >= limit:
+                        return True
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,236 @@
+# textual_file_search/frecency.py
+"""
+Frecency of opened paths: how often and how recently each was opened.
+
+Every open adds 1 to a path's score, and scores decay exponentially with a
+half-life of `half_life` seconds, so a file opened daily outranks one opened
+often last year. The open count is kept too. The most frecent paths form the
+"hot set", which the app scores before the full index on every keystroke,
+and frecency boosts a path's match score in the final ranking.
+
+The store is a compact JSON file, written atomically by a background thread
+shortly after the last change (see `save_delay`), so opening a file never
+waits on the disk. Only the `max_entries` most frecent paths are kept.
+"""
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_HALF_LIFE = 14 * 24 * 3600 # Seconds
+DEFAULT_MAX_ENTRIES = 2000
+
+# Multiplies log(1 + frecency) in `FrecencyStore.boost`.
+DEFAULT_BOOST_WEIGHT = 0.25
+
+FORMAT_VERSION = 1
+
+
+def default_frecency_path() -> Path:
+    """Returns the location of the store (under $XDG_DATA_HOME: it is history, not a cache)."""
+    data_home = os.environ.get("XDG_DATA_HOME") or str(Path.home() / ".local" / "share")
+    return Path(data_home) / "fuzzy_file_search" / "frecency.json"
+
+
+class FrecencyStore:
+    """Open counts and decayed scores per path. Thread-safe."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        half_life: float = DEFAULT_HALF_LIFE,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        boost_weight: float = DEFAULT_BOOST_WEIGHT,
+        save_delay: float = 1.0,
+    ) -> None:
+        self.path = path or default_frecency_path()
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self.boost_weight = boost_weight
+        self.save_delay = save_delay
+        # Path string -> (open count, score at `stamp`, stamp)
+        self._entries: Dict[str, Tuple[int, float, float]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._writer: Optional[threading.Thread] = None
+        self._hot: Optional[List[Path]] = None # Cached `hot_paths` order
+
+    def _decayed(self, score: float, stamp: float, now: float) -> float:
+        return score * 0.5 ** (max(0.0, now - stamp) / self.half_life)
+
+    def load(self, prune_missing: bool = True) -> None:
+        """
+        Reads the store from disk (blocking), merging in anything recorded
+        meanwhile. Paths that no longer exist are dropped if `prune_missing`.
+        """
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Warning: frecency store {self.path} is unreadable: {e}")
+            return
+        if not isinstance(data, dict) or data.get("version") != FORMAT_VERSION:
+            return
+        loaded = {}
+        for entry in data.get("entries", []):
+            try:
+                path, count, score, stamp = entry
+                loaded[str(path)] = (int(count), float(score), float(stamp))
+            except (TypeError, ValueError):
+                continue
+        if prune_missing:
+            loaded = {path: entry for path, entry in loaded.items() if os.path.lexists(path)}
+        with self._lock:
+            for path, (count, score, stamp) in self._entries.items():
+                if path in loaded: # Opened again before the load finished
+                    old_count, old_score, old_stamp = loaded[path]
+                    score += self._decayed(old_score, old_stamp, stamp)
+                    count += old_count
+                loaded[path] = (count, score, stamp)
+            self._entries = loaded
+            self._hot = None
+
+    def record(self, path: Path, now: Optional[float] = None) -> None:
+        """Counts an open of `path` and schedules a save."""
+        now = time.time() if now is None else now
+        key = str(path)
+        with self._lock:
+            count, score, stamp = self._entries.get(key, (0, 0.0, now))
+            self._entries[key] = (count + 1, self._decayed(score, stamp, now) + 1.0, now)
+            self._hot = None
+            self._dirty = True
+        self._schedule_save()
+
+    def forget(self, paths: Iterable[Path]) -> None:
+        """
+        Drops `paths` and everything below them, except paths that exist
+        (again): editors that save by replacing a file delete it only briefly.
+        """
+        keys = {str(path).rstrip(os.sep) for path in paths}
+        if not keys:
+            return
+        with self._lock:
+            gone = []
+            for key in self._entries:
+                # Look up the path and each of its ancestors
+                end = len(key)
+                while end > 0:
+                    if key[:end] in keys:
+                        if not os.path.lexists(key):
+                            gone.append(key)
+                        break
+                    end = key.rfind(os.sep, 0, end)
+            if not gone:
+                return
+            for key in gone:
+                del self._entries[key]
+            self._hot = None
+            self._dirty = True
+        self._schedule_save()
+
+    def frecency(self, path: Path, now: Optional[float] = None) -> float:
+        entry = self._entries.get(str(path))
+        if entry is None:
+            return 0.0
+        return self._decayed(entry[1], entry[2], time.time() if now is None else now)
+
+    def count(self, path: Path) -> int:
+        entry = self._entries.get(str(path))
+        return entry[0] if entry is not None else 0
+
+    def boost(self, path: Path, now: Optional[float] = None) -> float:
+        """Factor applied to the match score of `path`: 1 for never-opened paths."""
+        return 1.0 + self.boost_weight * math.log1p(self.frecency(path, now))
+
+    def hot_paths(self, limit: int) -> List[Path]:
+        """The `limit` most frecent paths, most frecent first."""
+        with self._lock:
+            if self._hot is None:
+                now = time.time()
+                ranked = sorted(
+                    self._entries.items(), key=lambda item: self._decayed(item[1][1], item[1][2], now), reverse=True
+                )
+                self._hot = [Path(path) for path, _ in ranked]
+            return self._hot[:limit]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _schedule_save(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                return # The pending write picks up this change
+            self._writer = threading.Thread(target=self._write_behind, name="frecency-writer", daemon=True)
+            self._writer.start()
+
+    def _write_behind(self) -> None:
+        while True:
+            time.sleep(self.save_delay) # Coalesce bursts of changes into one write
+            saved = self.save()
+            with self._lock:
+                # Write again if something changed during the write; after a
+                # failure, wait for the next change (or `flush`) to retry.
+                if not self._dirty or not saved:
+                    self._writer = None
+                    return
+
+    def save(self) -> bool:
+        """
+        Writes the store now (blocking), if it changed since the last write.
+        Returns False if the write failed; the changes are kept for the next one.
+        """
+        with self._lock:
+            if not self._dirty:
+                return True
+            self._dirty = False # Changes from here on need another write
+            now = time.time()
+            entries = sorted(
+                self._entries.items(), key=lambda item: self._decayed(item[1][1], item[1][2], now), reverse=True
+            )
+            if len(entries) > self.max_entries:
+                entries = entries[:self.max_entries]
+                self._entries = dict(entries)
+                self._hot = None
+        payload = {
+            "version": FORMAT_VERSION,
+            "entries": [[path, count, round(score, 4), round(stamp, 1)] for path, (count, score, stamp) in entries],
+        }
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+            os.replace(temporary, self.path)
+        except OSError as e:
+            print(f"Warning: could not write frecency store {self.path}: {e}")
+            with self._lock:
+                self._dirty = True
+            return False
+        return True
+
+    def flush(self) -> bool:
+        """Writes any pending change now, e.g. before exiting."""
+        return self.save()
+
+
+def rank_with_frecency(
+    scored: Sequence[Tuple[float, Path]], frecency: FrecencyStore, limit: int
+) -> List[Path]:
+    """
+    The best `limit` paths of `scored` ((match score, path) pairs, best
+    first) after multiplying each score by the path's frecency boost. Equal
+    boosted scores keep their order; duplicate paths count once.
+    """
+    now = time.time()
+    seen = set()
+    boosted = []
+    for position, (score, path) in enumerate(scored):
+        if path in seen:
+            continue
+        seen.add(path)
+        boosted.append((-score * frecency.boost(path, now), position, path))
+    boosted.sort(key=lambda item: (item[0], item[1]))
+    return [path for _, _, path in boosted[:limit]]
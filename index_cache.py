@@ -0,0 +1,217 @@
+# textual_file_search/index_cache.py
+"""
+Persistent on-disk snapshot of the home directory index.
+
+The snapshot stores one row per indexed directory: its mtime and the names of
+its children (after the built-in name exclusions). The root and .gitignore
+rules of index_rules.py are applied on top of it during every walk, so
+editing them never requires throwing the snapshot away. On startup the snapshot is loaded and then
+refreshed incrementally: every known directory is `stat`-ed, and only the
+directories whose mtime changed since the snapshot are listed again. A
+directory's mtime changes whenever a direct child is created, removed or
+renamed, so this is enough to keep the set of names up to date without a full
+tree walk.
+"""
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from index_rules import IndexFilter, index_filters, load_roots, roots_key
+from path_store import PathStore
+from search import (
+    ALWAYS_EXCLUDED_DIR_NAMES, DEFAULT_BATCH_SIZE, DEFAULT_WALK_WORKERS, ScanFunction, WalkStats,
+    scan_directory, walk_directory_tree,
+)
+
+# Bump this whenever the schema or the exclusion rules change so stale
+# snapshots are discarded instead of being trusted.
+INDEX_FORMAT_VERSION = 2
+
+# Names are joined with NUL inside a single TEXT column; NUL can never appear
+# in a file name on any platform we support.
+_NAME_SEPARATOR = "\0"
+
+
+def default_index_path() -> Path:
+    """Returns the location of the snapshot file (under $XDG_CACHE_HOME)."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(cache_home) / "fuzzy_file_search" / "index.sqlite"
+
+
+class DirectoryRecord(NamedTuple):
+    """Snapshot of one directory: its mtime and its children."""
+    mtime_ns: int
+    subdirs: List[str]    # Child directories
+    leaves: List[str]     # Files, symlinked directories, etc.
+    rule_files: List[str] # RULE_FILE_NAMES present (.gitignore, .git, ...)
+
+
+# Maps an absolute directory path (as a string) to its record.
+DirectoryIndex = Dict[str, DirectoryRecord]
+
+
+def _refreshing_scan(
+    records: DirectoryIndex,
+    refreshed: DirectoryIndex,
+    rescanned: List[str],
+    index_filter: IndexFilter,
+) -> ScanFunction:
+    """
+    Builds a `scan` function for `walk_directory_tree` that reuses the records
+    of unchanged directories, fills `refreshed` as it goes and prunes the
+    listings with `index_filter`.
+    """
+    def scan(directory: str) -> Tuple[List[str], List[str]]:
+        # Stat *before* listing so a change racing with the scan still
+        # bumps the mtime past the one we store.
+        mtime_ns = os.stat(directory).st_mtime_ns
+        record = records.get(directory)
+        if record is None or record.mtime_ns != mtime_ns:
+            rule_files: List[str] = []
+            subdirs, leaves = scan_directory(directory, rule_files)
+            record = DirectoryRecord(mtime_ns, subdirs, leaves, rule_files)
+            rescanned.append(directory)
+        # Removed directories raise OSError above, so their subtree disappears with them.
+        refreshed[directory] = record
+        return index_filter.filter(directory, record.subdirs, record.leaves, record.rule_files)
+    return scan
+
+
+def _connect(index_path: Path) -> sqlite3.Connection:
+    return sqlite3.connect(str(index_path))
+
+
+def load_index(root: str, index_path: Optional[Path] = None) -> DirectoryIndex:
+    """
+    Loads a snapshot from disk. Returns an empty index if the file is missing,
+    unreadable, from another format version or for a different root (or set
+    of roots, see `roots_key`).
+    """
+    index_path = index_path or default_index_path()
+    if not index_path.exists():
+        return {}
+
+    try:
+        with _connect(index_path) as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if meta.get("version") != str(INDEX_FORMAT_VERSION) or meta.get("root") != root:
+                return {}
+            records: DirectoryIndex = {}
+            for path, mtime_ns, subdirs, leaves, rule_files in conn.execute(
+                "SELECT path, mtime_ns, subdirs, leaves, rule_files FROM dirs"
+            ):
+                records[path] = DirectoryRecord(
+                    mtime_ns,
+                    subdirs.split(_NAME_SEPARATOR) if subdirs else [],
+                    leaves.split(_NAME_SEPARATOR) if leaves else [],
+                    rule_files.split(_NAME_SEPARATOR) if rule_files else [],
+                )
+            return records
+    except sqlite3.Error as e:
+        print(f"Warning: ignoring unreadable index snapshot {index_path}: {e}")
+        return {}
+
+
+def save_index(records: DirectoryIndex, root: str, index_path: Optional[Path] = None) -> None:
+    """
+    Writes a snapshot to disk. The file is written next to its final location
+    and atomically renamed into place, so a crash never leaves a torn snapshot.
+    """
+    index_path = index_path or default_index_path()
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_name(index_path.name + f".{os.getpid()}.tmp")
+
+    try:
+        conn = _connect(tmp_path)
+        try:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute(
+                "CREATE TABLE dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER, subdirs TEXT, leaves TEXT, "
+                "rule_files TEXT)"
+            )
+            conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [("version", str(INDEX_FORMAT_VERSION)), ("root", root)],
+            )
+            conn.executemany(
+                "INSERT INTO dirs VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        path,
+                        record.mtime_ns,
+                        _NAME_SEPARATOR.join(record.subdirs),
+                        _NAME_SEPARATOR.join(record.leaves),
+                        _NAME_SEPARATOR.join(record.rule_files),
+                    )
+                    for path, record in records.items()
+                ),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, index_path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: could not write index snapshot {index_path}: {e}")
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def iter_home_index(
+    index_path: Optional[Path] = None,
+    max_workers: int = DEFAULT_WALK_WORKERS,
+    stats: Optional[WalkStats] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    filters: Optional[Sequence[IndexFilter]] = None,
+) -> Iterator[List[str]]:
+    """
+    Yields the index of the roots in `filters` (by default the configured
+    ones, normally just the home directory) as batches of path strings while
+    it is being refreshed (or built from scratch), so callers can start
+    searching before the walk finishes. The snapshot is rewritten once the
+    walk completes, and only if something changed.
+    """
+    filters = filters if filters is not None else index_filters(load_roots())
+    key = roots_key(filters)
+    records = load_index(key, index_path)
+    refreshed: DirectoryIndex = {}
+    rescanned: List[str] = []
+
+    batch: List[str] = []
+    for index_filter in filters:
+        root = index_filter.path
+        if os.path.basename(root) not in ALWAYS_EXCLUDED_DIR_NAMES:
+            batch.append(root)
+
+        scan = _refreshing_scan(records, refreshed, rescanned, index_filter)
+        for directory, subdirs, leaves in walk_directory_tree(root, max_workers, stats, scan=scan):
+            batch.extend(os.path.join(directory, name) for name in subdirs)
+            batch.extend(os.path.join(directory, name) for name in leaves)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+    if rescanned or len(refreshed) != len(records):
+        save_index(refreshed, key, index_path)
+
+
+def load_home_index(
+    index_path: Optional[Path] = None,
+    max_workers: int = DEFAULT_WALK_WORKERS,
+    stats: Optional[WalkStats] = None,
+    filters: Optional[Sequence[IndexFilter]] = None,
+) -> PathStore:
+    """
+    Returns the index of the configured roots, using the on-disk snapshot when
+    one is available and refreshing it incrementally.
+    """
+    store = PathStore()
+    for batch in iter_home_index(index_path, max_workers, stats, filters=filters):
+        store.extend(batch)
+    return store
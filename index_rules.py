@@ -0,0 +1,372 @@
+# textual_file_search/index_rules.py
+"""
+Which directories are indexed, and which paths inside them are skipped.
+
+The roots come from `roots.json` under $XDG_CONFIG_HOME/fuzzy_file_search.
+Without that file, only the home directory is indexed:
+
+    {"roots": [
+        {"path": "~", "exclude": ["target/", "dist/", "build/", "*.iso"]},
+        {"path": "/srv/projects", "include": ["*.py", "*.md"], "ignore_files": false}
+    ]}
+
+`exclude` and `include` use .gitignore syntax and are relative to the root.
+`include` limits which files are indexed; directories are still walked.
+With `ignore_files` (the default), `.ignore` files apply everywhere and
+`.gitignore` files apply inside git repositories, as in ripgrep and fd. The
+built-in name exclusions of `search.is_excluded_name` always apply.
+
+A directory's rules are compiled once, when the walker lists it. Literal
+names go into a set, and the other patterns are joined into one regex per
+kind. Excluded directories are dropped from the listing, so their subtrees
+are never listed at all.
+"""
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from search import RULE_FILE_NAMES, is_excluded_name, scan_directory
+
+# Ignore files read in each directory. Later files take precedence.
+IGNORE_FILE_NAMES = (".gitignore", ".ignore")
+
+_GLOB_CHARS = frozenset("*?[\\")
+
+
+class IndexRoot(NamedTuple):
+    """One indexed directory tree and its rules."""
+    path: str
+    include: Tuple[str, ...] = ()  # .gitignore-style globs of files to index (empty: all)
+    exclude: Tuple[str, ...] = ()  # .gitignore-style globs to skip
+    ignore_files: bool = True      # Honour .gitignore / .ignore files
+
+
+def default_config_path() -> Path:
+    """Returns the location of the roots config (under $XDG_CONFIG_HOME)."""
+    config_home = os.environ.get("XDG_CONFIG_HOME") or str(Path.home() / ".config")
+    return Path(config_home) / "fuzzy_file_search" / "roots.json"
+
+
+def _normalize(path: str) -> str:
+    return os.path.abspath(os.path.expanduser(path))
+
+
+def load_roots(config_path: Optional[Path] = None) -> List[IndexRoot]:
+    """
+    Reads the configured roots. Falls back to the home directory if the config
+    is missing, unreadable or lists no roots.
+    """
+    config_path = config_path or default_config_path()
+    default = [IndexRoot(str(Path.home()))]
+    try:
+        config = json.loads(config_path.read_text())
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring unreadable roots config {config_path}: {e}")
+        return default
+
+    roots: List[IndexRoot] = []
+    try:
+        for entry in config.get("roots", []):
+            if isinstance(entry, str):
+                entry = {"path": entry}
+            roots.append(IndexRoot(
+                _normalize(entry["path"]),
+                tuple(entry.get("include", ())),
+                tuple(entry.get("exclude", ())),
+                bool(entry.get("ignore_files", True)),
+            ))
+    except (AttributeError, KeyError, TypeError) as e:
+        print(f"Warning: ignoring invalid roots config {config_path}: {e!r}")
+        return default
+    return roots or default
+
+
+def _glob_to_regex(glob: str) -> str:
+    """Translates one .gitignore glob (without its leading '!' or '/') to a regex."""
+    out: List[str] = []
+    i, n = 0, len(glob)
+    while i < n:
+        char = glob[i]
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?") # Zero or more directories
+            i += 3
+            continue
+        if glob.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "\\" and i + 1 < n:
+            out.append(re.escape(glob[i + 1]))
+            i += 2
+            continue
+        elif char == "[":
+            j = i + 1
+            if j < n and glob[j] in "!^":
+                j += 1
+            if j < n and glob[j] == "]":
+                j += 1 # A leading ']' is part of the set
+            end = glob.find("]", j)
+            if end != -1:
+                body = glob[i + 1:end]
+                negate = body[:1] in ("!", "^")
+                if negate:
+                    body = body[1:]
+                escaped = "".join(c if c == "-" else re.escape(c) for c in body)
+                out.append(("[^" if negate else "[") + escaped + "]")
+                i = end + 1
+                continue
+            out.append(re.escape(char))
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return "".join(out)
+
+
+class Pattern(NamedTuple):
+    glob: str
+    negated: bool   # "!pattern": re-includes what an earlier pattern excluded
+    dir_only: bool  # "pattern/": only matches directories
+    anchored: bool  # Contains a '/': matched against the path relative to the rule's base
+
+
+def parse_pattern(line: str) -> Optional[Pattern]:
+    """Parses one .gitignore line. Returns None for blank lines and comments."""
+    line = line.rstrip("\r\n")
+    if not line.strip() or line.startswith("#"):
+        return None
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " " # Escaped trailing space
+    line = stripped
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith(("\\!", "\\#")):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    anchored = "/" in line
+    return Pattern(line.lstrip("/"), negated, dir_only, anchored)
+
+
+def _join(patterns: List[Pattern]) -> Optional["re.Pattern[str]"]:
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{_glob_to_regex(pattern.glob)})" for pattern in patterns))
+
+
+class RuleSet:
+    """
+    The patterns of one ignore file (or of a root's `exclude` list), relative
+    to the directory `base`.
+
+    Unanchored patterns match a name at any depth below `base`. The walker
+    checks every path component on its way down, so it is enough to match
+    them against the last component alone.
+    """
+
+    def __init__(self, base: str, patterns: List[Pattern], git: bool = False) -> None:
+        self.base = base
+        self.git = git # From a .gitignore (only applies inside a repository)
+        self._has_negations = any(pattern.negated for pattern in patterns)
+        self._has_anchored = any(pattern.anchored for pattern in patterns)
+        if self._has_negations:
+            # The last matching pattern decides, so they are checked one by one.
+            self._ordered = [
+                (re.compile(_glob_to_regex(pattern.glob)), pattern) for pattern in reversed(patterns)
+            ]
+            return
+        literal = [p for p in patterns if not p.anchored and not _GLOB_CHARS.intersection(p.glob)]
+        other = [p for p in patterns if p not in literal]
+        self._names = {p.glob for p in literal if not p.dir_only}
+        self._dir_names = {p.glob for p in literal if p.dir_only}
+        self._name_regex = _join([p for p in other if not p.anchored and not p.dir_only])
+        self._dir_name_regex = _join([p for p in other if not p.anchored and p.dir_only])
+        self._path_regex = _join([p for p in other if p.anchored and not p.dir_only])
+        self._dir_path_regex = _join([p for p in other if p.anchored and p.dir_only])
+
+    @classmethod
+    def from_lines(cls, base: str, lines: Iterable[str], git: bool = False) -> Optional["RuleSet"]:
+        patterns = [pattern for pattern in map(parse_pattern, lines) if pattern is not None]
+        return cls(base, patterns, git) if patterns else None
+
+    def _relative(self, path: str) -> str:
+        relative = path[len(self.base) + 1:]
+        return relative if os.sep == "/" else relative.replace(os.sep, "/")
+
+    def match(self, path: str, name: str, is_dir: bool) -> Optional[bool]:
+        """
+        True if `path` (whose last component is `name`) matches, False if a
+        negated pattern re-includes it, None if no pattern applies.
+        """
+        relative = self._relative(path) if self._has_anchored else name
+        if self._has_negations:
+            for regex, pattern in self._ordered:
+                if pattern.dir_only and not is_dir:
+                    continue
+                if regex.fullmatch(relative if pattern.anchored else name):
+                    return not pattern.negated
+            return None
+
+        if name in self._names or (is_dir and name in self._dir_names):
+            return True
+        for regex, applies in (
+            (self._name_regex, True),
+            (self._dir_name_regex, is_dir),
+        ):
+            if applies and regex is not None and regex.fullmatch(name):
+                return True
+        for regex, applies in (
+            (self._path_regex, True),
+            (self._dir_path_regex, is_dir),
+        ):
+            if applies and regex is not None and regex.fullmatch(relative):
+                return True
+        return None
+
+
+def _read_rule_set(directory: str, file_name: str) -> Optional[RuleSet]:
+    try:
+        with open(os.path.join(directory, file_name), encoding="utf-8", errors="replace") as f:
+            return RuleSet.from_lines(directory, f, git=file_name == ".gitignore")
+    except OSError:
+        return None
+
+
+class _DirectoryRules(NamedTuple):
+    rule_sets: Tuple[RuleSet, ...] # Shallowest first
+    in_repo: bool
+
+
+class IndexFilter:
+    """
+    The compiled rules of one root. `scan` is a drop-in `ScanFunction` for
+    `walk_directory_tree`; `filter` applies the rules to a listing that was
+    made (or cached) elsewhere.
+
+    Each directory's rules are kept once it has been listed, so that its
+    children (and watcher events inside it) are matched without re-reading
+    any ignore file. Walker threads only add entries for distinct directories.
+    """
+
+    def __init__(self, root: IndexRoot, pruned: Iterable[str] = ()) -> None:
+        self.root = root
+        self.path = root.path
+        # Other roots nested inside this one; they are walked with their own rules.
+        self._pruned = frozenset(pruned)
+        self._include = RuleSet.from_lines(root.path, root.include)
+        exclude = RuleSet.from_lines(root.path, root.exclude)
+        self._root_rules = _DirectoryRules((exclude,) if exclude else (), False)
+        self._rules: Dict[str, _DirectoryRules] = {}
+
+    def _directory_rules(self, directory: str, rule_files: Sequence[str]) -> _DirectoryRules:
+        if directory == self.path:
+            rules = self._root_rules
+        else:
+            rules = self._rules_for(os.path.dirname(directory))
+        if not self.root.ignore_files or not rule_files:
+            return rules
+
+        rule_sets, in_repo = rules
+        if ".git" in rule_files:
+            # A repository (possibly nested) starts over with its own .gitignore files.
+            rule_sets = tuple(rule_set for rule_set in rule_sets if not rule_set.git)
+            in_repo = True
+        for file_name in IGNORE_FILE_NAMES:
+            if file_name in rule_files and (in_repo or file_name != ".gitignore"):
+                rule_set = _read_rule_set(directory, file_name)
+                if rule_set is not None:
+                    rule_sets += (rule_set,)
+        return _DirectoryRules(rule_sets, in_repo)
+
+    def _rules_for(self, directory: str) -> _DirectoryRules:
+        """The rules of `directory`, loading those of unlisted directories on demand."""
+        rules = self._rules.get(directory)
+        if rules is None:
+            rule_files = [name for name in RULE_FILE_NAMES if os.path.lexists(os.path.join(directory, name))]
+            rules = self._rules[directory] = self._directory_rules(directory, rule_files)
+        return rules
+
+    def _excluded(self, rules: _DirectoryRules, directory: str, name: str, is_dir: bool) -> bool:
+        path = os.path.join(directory, name)
+        if is_dir and path in self._pruned:
+            return True
+        # Deeper rule files override shallower ones.
+        for rule_set in reversed(rules.rule_sets):
+            matched = rule_set.match(path, name, is_dir)
+            if matched:
+                return True
+            if matched is not None:
+                break # Re-included by a negated pattern
+        if not is_dir and self._include is not None:
+            return self._include.match(path, name, False) is not True
+        return False
+
+    def filter(
+        self, directory: str, subdirs: List[str], leaves: List[str], rule_files: Sequence[str] = ()
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Applies the rules to the listing of `directory`. `rule_files` are the
+        `RULE_FILE_NAMES` present in it, as collected by `scan_directory`.
+        """
+        rules = self._rules[directory] = self._directory_rules(directory, rule_files)
+        if not rules.rule_sets and self._include is None and not self._pruned:
+            return subdirs, leaves
+        return (
+            [name for name in subdirs if not self._excluded(rules, directory, name, True)],
+            [name for name in leaves if not self._excluded(rules, directory, name, False)],
+        )
+
+    def scan(self, directory: str) -> Tuple[List[str], List[str]]:
+        rule_files: List[str] = []
+        subdirs, leaves = scan_directory(directory, rule_files)
+        return self.filter(directory, subdirs, leaves, rule_files)
+
+    def is_excluded(self, directory: str, name: str, is_dir: bool) -> bool:
+        """True if the entry `name` of the indexed `directory` is skipped."""
+        return is_excluded_name(name) or self._excluded(self._rules_for(directory), directory, name, is_dir)
+
+    def is_indexed(self, path: str, is_dir: bool) -> bool:
+        """True if `path` lies under the root and no rule excludes it or a parent."""
+        relative = os.path.relpath(path, self.path)
+        if relative == os.curdir:
+            return True
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return False
+        parts = relative.split(os.sep)
+        directory = self.path
+        for position, name in enumerate(parts):
+            if self.is_excluded(directory, name, is_dir or position < len(parts) - 1):
+                return False
+            directory = os.path.join(directory, name)
+        return True
+
+
+def index_filters(roots: Sequence[IndexRoot]) -> List[IndexFilter]:
+    """
+    One filter per distinct root. A root nested inside another one is pruned
+    from the outer walk, so it is listed once, with its own rules.
+    """
+    unique: Dict[str, IndexRoot] = {}
+    for root in roots:
+        path = _normalize(root.path)
+        unique.setdefault(path, root._replace(path=path))
+    return [
+        IndexFilter(root, [other for other in unique if other.startswith(path.rstrip(os.sep) + os.sep)])
+        for path, root in unique.items()
+    ]
+
+
+def roots_key(filters: Sequence[IndexFilter]) -> str:
+    """Identifies the set of roots, e.g. to tell whether a snapshot belongs to it."""
+    return os.pathsep.join(index_filter.path for index_filter in filters)
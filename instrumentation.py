@@ -0,0 +1,203 @@
+# textual_file_search/instrumentation.py
+"""
+Lightweight latency instrumentation for the search pipeline.
+
+Code paths are wrapped in named stages (`with metrics.stage("score"): ...`
+or the `@timed("walk")` decorator). Each stage keeps a bounded window of
+recent durations, from which p50/p95/p99 are computed on demand, and every
+timed span is also kept as a Chrome trace event, so a session can be exported
+and opened in chrome://tracing or Perfetto.
+
+`SlowQueryProfiler` is an opt-in cProfile hook: armed once, it profiles
+queries until one of them takes longer than its threshold and saves that
+profile (and only that one) to disk.
+"""
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+# Durations kept per stage for percentiles, and trace events kept overall.
+HISTORY_SIZE = 2048
+TRACE_SIZE = 20000
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class StageStats:
+    """Running totals plus a window of recent durations (in seconds) for one stage."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=HISTORY_SIZE)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """Milliseconds; percentiles cover the last `HISTORY_SIZE` samples."""
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": percentile(recent, 0.50) * 1000,
+            "p95_ms": percentile(recent, 0.95) * 1000,
+            "p99_ms": percentile(recent, 0.99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class Metrics:
+    """Thread-safe registry of stage timings and trace events."""
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages: Dict[str, StageStats] = {}
+        self._trace: Deque[Dict[str, Any]] = deque(maxlen=TRACE_SIZE)
+        self._origin = time.perf_counter()
+
+    def record(self, name: str, seconds: float, start: Optional[float] = None, **args: Any) -> None:
+        """Adds one duration to stage `name`. `start` is its `perf_counter` start time."""
+        if not self.enabled:
+            return
+        if start is None:
+            start = time.perf_counter() - seconds
+        event = {
+            "name": name,
+            "ph": "X", # Complete event: start plus duration
+            "ts": (start - self._origin) * 1e6,
+            "dur": seconds * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = StageStats()
+            stats.add(seconds)
+            self._trace.append(event)
+
+    @contextmanager
+    def stage(self, name: str, **args: Any) -> Iterator[None]:
+        """Times the body of the `with` block as stage `name`."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, start, **args)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._trace.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: stats.summary() for name, stats in sorted(self._stages.items())}
+
+    def export_json(self, path: Path) -> None:
+        """Writes the per-stage summary as JSON."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"stages": self.summary()}, indent=2))
+
+    def export_trace(self, path: Path) -> None:
+        """Writes the recorded spans in Chrome trace-event format."""
+        with self._lock:
+            events = list(self._trace)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+
+# The process-wide registry used by the instrumented functions.
+metrics = Metrics()
+
+
+def timed(name: str) -> Callable:
+    """Decorator that records every call of the function as stage `name`."""
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            with metrics.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SlowQueryProfiler:
+    """
+    Opt-in cProfile hook. Once `arm()`ed, `profile(query)` runs each query
+    under cProfile; the first one slower than `threshold_ms` is dumped to
+    `output_dir` (load it with `pstats` or snakeviz) and the profiler disarms.
+    The outcome is passed to `report` (default: print), from the thread that
+    ran the query.
+    """
+
+    def __init__(
+        self, output_dir: Path, threshold_ms: float = 50.0, report: Optional[Callable[[str, bool], None]] = None
+    ) -> None:
+        self.output_dir = output_dir
+        self.threshold_ms = threshold_ms
+        # Called with a message and whether it reports a failure.
+        self.report = report or (lambda message, failed: print(message))
+        self.armed = False
+        self.last_profile: Optional[Path] = None
+        # cProfile can only profile one thread at a time.
+        self._lock = threading.Lock()
+
+    def arm(self, threshold_ms: Optional[float] = None) -> None:
+        if threshold_ms is not None:
+            self.threshold_ms = threshold_ms
+        self.armed = True
+
+    @contextmanager
+    def profile(self, query: str) -> Iterator[None]:
+        if not self.armed or not self._lock.acquire(blocking=False):
+            yield
+            return
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if self.armed and elapsed_ms >= self.threshold_ms:
+                self.armed = False
+                path = self.output_dir / f"slow-query-{time.strftime('%Y%m%d-%H%M%S')}.prof"
+                try:
+                    self.output_dir.mkdir(parents=True, exist_ok=True)
+                    profiler.dump_stats(str(path))
+                except OSError as e:
+                    self.report(f"Could not write the profile of a {elapsed_ms:.1f} ms search: {e}", True)
+                else:
+                    self.last_profile = path
+                    self.report(f"Profiled a {elapsed_ms:.1f} ms search for {query!r}: {path}", False)
+        finally:
+            self._lock.release()
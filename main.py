@@ -1,7 +1,17 @@
 # textual_file_search/main.py
 
-from apps.fuzzy_file_search import FileSearchApp
+import argparse
 
 if __name__ == "__main__":
-    app = FileSearchApp()
-    app.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fuzzy file search for the home directory.")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print the import time of each module on the startup path and exit")
+    args = parser.parse_args()
+
+    if args.startup_report:
+        from startup_timing import print_startup_report
+        print_startup_report()
+    else:
+        from apps.fuzzy_file_search import FileSearchApp
+        app = FileSearchApp()
+        app.run()
@@ -0,0 +1,261 @@
+# textual_file_search/path_store.py
+"""
+Compact in-memory storage for the path index.
+
+Instead of one `Path` object per entry, a `PathStore` keeps:
+
+- an interned table of parent directories (each stored once, with a
+  trailing separator, in original and lowercase form),
+- one basename per entry (the lowercase form shares the same object when the
+  name is already lowercase),
+- an `array` of parent-directory ids and a bytearray of live flags.
+
+Searching reads the precomputed lowercase strings directly; `Path` objects are
+only created for the handful of results that are actually displayed/opened.
+
+Every entry also gets a 64-bit character-presence mask of its lowercase path,
+and entries are grouped by mask. `search.fuzzy_search` uses the groups to skip
+paths that cannot contain all query characters without scoring them.
+"""
+import os
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+PathLike = Union[str, Path]
+
+# Bit assignments for `char_mask`: a-z -> 0..25, 0-9 -> 26..35, anything else
+# is hashed into 36..63. Collisions only make the prefilter less selective.
+_CHAR_BITS: Dict[str, int] = {}
+
+
+def char_bit(char: str) -> int:
+    bit = _CHAR_BITS.get(char)
+    if bit is None:
+        code = ord(char)
+        if 97 <= code <= 122:
+            bit = 1 << (code - 97)
+        elif 48 <= code <= 57:
+            bit = 1 << (26 + code - 48)
+        else:
+            bit = 1 << (36 + code % 28)
+        _CHAR_BITS[char] = bit
+    return bit
+
+
+def char_mask(text: str) -> int:
+    """Returns the character-presence bitmask of `text` (which should be lowercase)."""
+    mask = 0
+    for char in set(text):
+        mask |= char_bit(char)
+    return mask
+
+
+class MaskGroup:
+    """All entries sharing one character mask, plus their shortest path length."""
+    __slots__ = ("ids", "min_length")
+
+    def __init__(self, length: int) -> None:
+        self.ids = array("I")
+        self.min_length = length
+
+
+class PathStore:
+    """An append-mostly, array-backed set of paths with O(1) lookup by id."""
+
+    def __init__(self, paths: Iterable[PathLike] = ()) -> None:
+        self._dirs: List[str] = []          # Parent directories, with trailing separator
+        self._dirs_lower: List[str] = []
+        self._dir_ids: Dict[str, int] = {}
+        self._dir_masks: List[int] = []
+        self._children: List[List[int]] = [] # Entry ids per parent directory
+        self._parents = array("I")           # Parent directory id per entry
+        self._names: List[str] = []
+        self._names_lower: List[str] = []
+        self._alive = bytearray()            # 1 for live entries, 0 for removed ones
+        self._removed = 0
+        self._masks = array("Q")             # Character mask per entry
+        self._mask_groups: Dict[int, MaskGroup] = {}
+        self.generation = 0                  # Bumped whenever ids are invalidated
+        self.extend(paths)
+
+    # --- Building --------------------------------------------------------
+
+    def _dir_id(self, directory: str) -> int:
+        if not directory.endswith(os.sep):
+            directory += os.sep
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = len(self._dirs)
+            self._dir_ids[directory] = dir_id
+            self._dirs.append(directory)
+            lowered = directory.lower()
+            self._dirs_lower.append(directory if lowered == directory else lowered)
+            self._dir_masks.append(char_mask(lowered))
+            self._children.append([])
+        return dir_id
+
+    def add(self, path: PathLike) -> int:
+        """Adds a path and returns its id."""
+        directory, _, name = str(path).rpartition(os.sep)
+        return self._add(self._dir_id(directory), name)
+
+    def _add(self, dir_id: int, name: str) -> int:
+        entry_id = len(self._names)
+        self._parents.append(dir_id)
+        self._names.append(name)
+        lowered = name.lower()
+        self._names_lower.append(name if lowered == name else lowered)
+        self._alive.append(1)
+        self._children[dir_id].append(entry_id)
+
+        mask = self._dir_masks[dir_id] | char_mask(lowered)
+        length = len(self._dirs_lower[dir_id]) + len(lowered)
+        self._masks.append(mask)
+        group = self._mask_groups.get(mask)
+        if group is None:
+            group = self._mask_groups[mask] = MaskGroup(length)
+        elif length < group.min_length:
+            group.min_length = length
+        group.ids.append(entry_id)
+        return entry_id
+
+    def extend(self, paths: Iterable[PathLike]) -> range:
+        """Adds several paths and returns the range of their ids."""
+        start = len(self._names)
+        for path in paths:
+            self.add(path)
+        return range(start, len(self._names))
+
+    # --- Removal ---------------------------------------------------------
+
+    def _kill(self, entry_id: int) -> None:
+        if self._alive[entry_id]:
+            self._alive[entry_id] = 0
+            self._removed += 1
+
+    def remove(self, path: PathLike) -> None:
+        """Removes a path (all copies of it) if present."""
+        directory, _, name = str(path).rpartition(os.sep)
+        dir_id = self._dir_ids.get(directory + os.sep)
+        if dir_id is None:
+            return
+        for entry_id in self._children[dir_id]:
+            if self._names[entry_id] == name:
+                self._kill(entry_id)
+
+    def remove_trees(self, directories: Iterable[PathLike]) -> None:
+        """
+        Removes everything below each of `directories` (but not the directories
+        themselves), in one pass over the parent directories however many
+        there are. Compacts the store if enough of it is dead space.
+        """
+        prefixes = {str(directory).rstrip(os.sep) + os.sep for directory in directories}
+        if prefixes:
+            sep = os.sep
+            for dir_id, parent in enumerate(self._dirs):
+                # Look up the parent and each of its ancestors (cost: depth, not len(prefixes))
+                end = len(parent)
+                while end > 0:
+                    if parent[:end] in prefixes:
+                        for entry_id in self._children[dir_id]:
+                            self._kill(entry_id)
+                        break
+                    end = parent.rfind(sep, 0, end - 1) + 1
+        self._maybe_compact()
+
+    def clear(self) -> None:
+        generation = self.generation
+        self.__init__()
+        self.generation = generation + 1
+
+    def _maybe_compact(self) -> None:
+        # Ids are only stable between compactions; compact once half the
+        # store is dead space.
+        if self._removed > 1024 and self._removed * 2 > len(self._names):
+            self.compact()
+
+    def compact(self) -> None:
+        """Drops removed entries and unused directories. Invalidates entry ids."""
+        live = [(self._dirs[self._parents[i]], self._names[i]) for i in self.ids()]
+        self.clear()
+        for directory, name in live:
+            self._add(self._dir_id(directory), name)
+
+    # --- Access ----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._names) - self._removed
+
+    @property
+    def next_id(self) -> int:
+        """The id the next added entry will get; ids below it are assigned."""
+        return len(self._names)
+
+    def __contains__(self, path: PathLike) -> bool:
+        directory, _, name = str(path).rpartition(os.sep)
+        dir_id = self._dir_ids.get(directory + os.sep)
+        return dir_id is not None and any(
+            self._alive[i] and self._names[i] == name for i in self._children[dir_id]
+        )
+
+    def __iter__(self) -> Iterator[Path]:
+        """Iterates over live entries as `Path` objects (slow)."""
+        for entry_id in self.ids():
+            yield self.path(entry_id)
+
+    def ids(self) -> Iterator[int]:
+        alive = self._alive
+        return (i for i in range(len(alive)) if alive[i])
+
+    def path_str(self, entry_id: int) -> str:
+        return self._dirs[self._parents[entry_id]] + self._names[entry_id]
+
+    def lower_str(self, entry_id: int) -> str:
+        return self._dirs_lower[self._parents[entry_id]] + self._names_lower[entry_id]
+
+    def path(self, entry_id: int) -> Path:
+        return Path(self.path_str(entry_id))
+
+    def is_alive(self, entry_id: int) -> bool:
+        return bool(self._alive[entry_id])
+
+    def alive_flags(self, start: int, stop: int) -> bytes:
+        """Live flags (1/0 bytes) for the ids `start .. stop - 1`."""
+        return bytes(self._alive[start:stop])
+
+    def mask(self, entry_id: int) -> int:
+        return self._masks[entry_id]
+
+    def mask_group(self, mask: int) -> MaskGroup:
+        return self._mask_groups[mask]
+
+    def mask_groups(self) -> Iterator[Tuple[int, MaskGroup]]:
+        """Yields `(mask, group)` pairs. Groups may contain removed ids."""
+        return iter(self._mask_groups.items())
+
+    def view(self, ids: Sequence[int]) -> "PathStoreView":
+        """Returns a view restricted to `ids` that can be searched like the store."""
+        return PathStoreView(self, ids)
+
+
+class PathStoreView:
+    """A subset of a `PathStore`, identified by entry ids."""
+
+    def __init__(self, store: PathStore, ids: Sequence[int]) -> None:
+        self.store = store
+        self.ids = ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[Path]:
+        for entry_id in self._live_ids():
+            yield self.path(entry_id)
+
+    def _live_ids(self) -> Iterator[int]:
+        alive = self.store._alive
+        return (i for i in self.ids if alive[i])
+
+    def path(self, entry_id: int) -> Path:
+        return self.store.path(entry_id)
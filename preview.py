@@ -0,0 +1,143 @@
+# textual_file_search/preview.py
+"""
+Previews of search results for the preview pane.
+
+Only a bounded head of a file is read (memory-mapped, so a huge file costs
+no more than a small one), files with a NUL byte near the start are reported
+as binary instead of being shown, and only the first entries of a directory
+are listed (no full listing, no sorting of huge directories).
+
+`PreviewCache` keeps recent previews in an LRU, validated against the
+path's mtime and size, so moving the cursor back over results is instant.
+"""
+import mmap
+import os
+import stat
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import NamedTuple, Optional, Tuple
+
+from content_search import BINARY_SNIFF_BYTES
+from search import is_excluded_name
+
+# Bytes read from the start of a file, and lines kept from them.
+PREVIEW_BYTES = 64 * 1024
+PREVIEW_LINES = 200
+
+# Directory entries listed; the rest of the directory is not read at all.
+DIRECTORY_ENTRIES = 200
+
+# Previews kept by `PreviewCache`.
+DEFAULT_CACHE_SIZE = 256
+
+TEXT = "text"
+BINARY = "binary"
+DIRECTORY = "directory"
+ERROR = "error"
+
+
+class Preview(NamedTuple):
+    kind: str  # TEXT, BINARY, DIRECTORY or ERROR
+    title: str # e.g. "12.3 KiB" or "42 entries"
+    body: str
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def _read_head(path: str, size: int, max_bytes: int) -> bytes:
+    with open(path, "rb") as f:
+        # mmap needs a non-empty length; map only the head of the file.
+        with mmap.mmap(f.fileno(), min(size, max_bytes), access=mmap.ACCESS_READ) as mapped:
+            return mapped[:]
+
+
+def preview_file(path: str, info: os.stat_result, max_bytes: int = PREVIEW_BYTES) -> Preview:
+    if not stat.S_ISREG(info.st_mode):
+        return Preview(ERROR, "special file", "Not a regular file.") # Reading a FIFO could block
+    size = format_size(info.st_size)
+    if info.st_size == 0:
+        return Preview(TEXT, size, "")
+    head = _read_head(path, info.st_size, max_bytes)
+    if b"\0" in head[:BINARY_SNIFF_BYTES]:
+        return Preview(BINARY, f"binary, {size}", "Binary file, not shown.")
+    truncated = info.st_size > max_bytes
+    if truncated:
+        head = head[:head.rfind(b"\n") + 1] or head # Don't end on a partial line (or character)
+    lines = head.decode("utf-8", errors="replace").expandtabs(4).splitlines()
+    if len(lines) > PREVIEW_LINES:
+        lines, truncated = lines[:PREVIEW_LINES], True
+    if truncated:
+        lines.append("…")
+    return Preview(TEXT, size, "\n".join(lines))
+
+
+def preview_directory(path: str, max_entries: int = DIRECTORY_ENTRIES) -> Preview:
+    with os.scandir(path) as it:
+        entries = list(islice((entry for entry in it if not is_excluded_name(entry.name)), max_entries + 1))
+    more = len(entries) > max_entries
+    names = []
+    for entry in entries[:max_entries]:
+        try:
+            names.append(entry.name + os.sep if entry.is_dir() else entry.name)
+        except OSError:
+            continue
+    names.sort(key=lambda name: (not name.endswith(os.sep), name.lower())) # Directories first
+    if more:
+        names.append("…")
+    title = f"{max_entries}+ entries" if more else f"{len(names)} entries"
+    return Preview(DIRECTORY, title, "\n".join(names) if names else "(empty)")
+
+
+def build_preview(path: str, info: os.stat_result) -> Preview:
+    try:
+        if stat.S_ISDIR(info.st_mode):
+            return preview_directory(path)
+        return preview_file(path, info)
+    except (OSError, ValueError) as e:
+        return Preview(ERROR, "unreadable", str(e))
+
+
+class PreviewCache:
+    """LRU of previews keyed by path, checked against each path's mtime and size. Thread-safe."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], Preview]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def peek(self, path: str) -> Optional[Preview]:
+        """The cached preview, without touching the filesystem (it may be stale)."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            self._entries.move_to_end(path)
+            return entry[1]
+
+    def get(self, path: str) -> Preview:
+        """The preview of `path`, rebuilt if the path changed since it was cached."""
+        try:
+            info = os.stat(path)
+        except OSError as e:
+            return Preview(ERROR, "unavailable", str(e))
+        signature = (info.st_mtime_ns, info.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(path)
+                return entry[1]
+
+        preview = build_preview(path, info)
+        with self._lock:
+            self._entries[path] = (signature, preview)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return preview
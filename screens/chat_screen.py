@@ -1,5 +1,8 @@
 # textual_file_search/screens/chat_screen.py
 
+import asyncio
+import time
+
 from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.widgets import Header, Footer, Input, Button, Static, Markdown
@@ -9,7 +12,7 @@ from textual.message import Message
 
 from services.gemini_api import GeminiAPI
 
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
 
 # Define a type for chat messages (sender, content)
 ChatMessage = Tuple[str, str] # "user" or "ai", message_content
@@ -19,12 +22,33 @@ class ChatScreen(Screen):
 
     CSS_PATH = "../tcss/chat_screen.tcss" # Link to its own CSS
 
+    BINDINGS = [
+        ("escape", "stop_reply", "Stop"),
+        ("ctrl+t", "show_stats", "Cache Stats"),
+    ]
+
+    # Streamed replies are re-rendered at most this often (seconds); chunks
+    # arriving in between are appended together.
+    RENDER_INTERVAL = 0.05
+
     # Reactive list to hold chat history (user message, AI response)
     chat_history: reactive[List[ChatMessage]] = reactive(list)
     
-    def __init__(self, name: str | None = None, id: str | None = None, classes: str | None = None):
+    def __init__(
+        self,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+        api_factory: Callable[[], GeminiAPI] = GeminiAPI,
+    ):
         super().__init__(name=name, id=id, classes=classes)
-        self.gemini_api = GeminiAPI() # Initialize Gemini API client
+        # The Gemini client (and its SDK import) is created off the event loop
+        # once the screen is shown; see `_get_gemini_api`. Tests pass an
+        # `api_factory` that builds one around `services.fake_gemini.FakeBackend`.
+        self.gemini_api: Optional[GeminiAPI] = None
+        self._api_factory = api_factory
+        self._gemini_api_worker = None
+        self._reply_worker = None # Streams the reply being generated
         self.scroll_container = VerticalScroll(id="chat-display")
         self.chat_input = Input(placeholder="Ask Gemini...", id="chat-input")
 
@@ -39,8 +63,17 @@ class ChatScreen(Screen):
 
     def on_mount(self) -> None:
         """Called when the screen is mounted."""
+        self._gemini_api_worker = self.run_worker(
+            self._api_factory, name="gemini_client", group="gemini_client", thread=True, exit_on_error=False
+        )
         self.chat_input.focus()
 
+    async def _get_gemini_api(self) -> GeminiAPI:
+        """Waits for the client created in `on_mount`. Raises if it could not be created."""
+        if self.gemini_api is None:
+            self.gemini_api = await self._gemini_api_worker.wait()
+        return self.gemini_api
+
     async def on_input_submitted(self, event: Input.Submitted) -> None:
         """Handles when the user submits input (presses Enter)."""
         user_message = event.value.strip()
@@ -54,37 +87,90 @@ class ChatScreen(Screen):
         self._add_message_to_display("user", user_message)
         self.scroll_container.scroll_end() # Scroll to bottom
 
-        # Show a loading indicator
+        # Show a loading indicator; the Send button becomes Stop until the reply is complete
         self.chat_input.placeholder = "Gemini is thinking..."
         self.chat_input.disabled = True
-        self.query_one("#send-button", Button).disabled = True
+        send_button = self.query_one("#send-button", Button)
+        send_button.label = "Stop"
+        send_button.variant = "error"
         self.query_one("#reset-button", Button).disabled = True # Also disable reset while thinking
 
-        # Send message to Gemini API (in a worker to keep UI responsive)
-        # Corrected: Pass the coroutine object, not the awaited result of the coroutine.
-        # Then, await the worker object itself.
+        # The reply is streamed into its message widget by a worker, so the UI
+        # stays responsive and the generation can be stopped.
+        message_widget = self._add_message_to_display("ai", "")
+        self._reply_worker = self.run_worker(
+            self._stream_reply(user_message, message_widget), name="gemini_reply", group="gemini_reply",
+            exclusive=True, exit_on_error=False,
+        )
+
+    async def _stream_reply(self, user_message: str, message_widget: Markdown) -> None:
+        """Appends the reply to `message_widget` chunk by chunk as it arrives."""
+        stream = Markdown.get_stream(message_widget)
+        reply: List[str] = []
+        pending: List[str] = [] # Received but not rendered yet
+        last_render = 0.0
         try:
-            worker = self.run_worker(self.gemini_api.send_message(user_message), exclusive=True)
-            ai_response = await worker.wait() # Await the worker to get its result
+            gemini_api = await self._get_gemini_api()
+            async for chunk in gemini_api.stream_message(user_message):
+                reply.append(chunk)
+                pending.append(chunk)
+                now = time.monotonic()
+                if now - last_render >= self.RENDER_INTERVAL:
+                    last_render = now
+                    await stream.write("".join(pending))
+                    pending.clear()
+                    self.scroll_container.scroll_end(animate=False)
+        except asyncio.CancelledError:
+            pending.append(("\n\n" if reply else "") + "*Stopped.*")
+            raise
         except Exception as e:
-            ai_response = f"Error: Failed to get AI response: {e}"
+            pending.append(("\n\n" if reply else "") + f"**Error:** Failed to get AI response: {e}")
             self.log(f"Worker error: {e}") # Log the error for debugging
-
-        # Add AI response to history
-        self.chat_history.append(("ai", ai_response))
-        self._add_message_to_display("ai", ai_response)
+        finally:
+            await stream.write("".join(pending))
+            await stream.stop()
+            # Add AI response to history
+            self.chat_history.append(("ai", "".join(reply)))
+            self._finish_reply()
+
+    def _finish_reply(self) -> None:
+        """Resets the input state once a reply is complete (or stopped)."""
+        self._reply_worker = None
         self.scroll_container.scroll_end() # Scroll to bottom again after AI response
-
-        # Reset input state
         self.chat_input.placeholder = "Ask Gemini..."
         self.chat_input.disabled = False
-        self.query_one("#send-button", Button).disabled = False
+        send_button = self.query_one("#send-button", Button)
+        send_button.label = "Send"
+        send_button.variant = "primary"
         self.query_one("#reset-button", Button).disabled = False # Re-enable reset
         self.chat_input.focus()
 
+    def action_stop_reply(self) -> None:
+        """Stops the reply being generated, keeping what has arrived so far."""
+        if self._reply_worker is not None:
+            self._reply_worker.cancel()
+
+    def action_show_stats(self) -> None:
+        """Shows the response cache hit rate and reply latencies."""
+        if self.gemini_api is None:
+            self.notify("No requests yet.")
+            return
+        stats = self.gemini_api.stats()
+        self.notify(
+            f"{stats['hits']} cache hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+            f"{stats['coalesced']} coalesced, {stats['errors']} errors\n"
+            f"First chunk p50 {stats['first_chunk']['p50_ms']:.0f} ms, "
+            f"p95 {stats['first_chunk']['p95_ms']:.0f} ms\n"
+            f"Full reply p50 {stats['reply']['p50_ms']:.0f} ms, p95 {stats['reply']['p95_ms']:.0f} ms",
+            title="Gemini",
+        )
+
     def on_button_pressed(self, event: Button.Pressed) -> None:
         """Handles button presses."""
         if event.button.id == "send-button":
+            if self._reply_worker is not None:
+                self.action_stop_reply()
+                return
             # Manually trigger input submission when send button is pressed
             self.post_message(Input.Submitted(self.chat_input, self.chat_input.value))
         elif event.button.id == "reset-button":
@@ -94,16 +180,18 @@ class ChatScreen(Screen):
         """Watcher method for chat_history reactive variable."""
         pass
 
-    def _add_message_to_display(self, sender: str, content: str) -> None:
+    def _add_message_to_display(self, sender: str, content: str) -> Markdown:
         """Helper to add a message to the chat display."""
         # Use Markdown widget for richer text display of AI responses
         message_widget = Markdown(content, classes=f"message {sender}-message")
         self.scroll_container.mount(message_widget)
         self.scroll_container.scroll_end() # Auto-scroll to latest message
+        return message_widget
 
     def action_reset_chat(self) -> None:
         """Action to reset the chat session."""
-        self.gemini_api.reset_chat()
+        if self.gemini_api is not None:
+            self.gemini_api.reset_chat()
         self.chat_history.clear()
         # Remove all existing message widgets from the display
         for child in list(self.scroll_container.children):
@@ -1,9 +1,18 @@
 # textual_file_search/search.py
 from pathlib import Path
 import os
-from typing import List, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import heapq
 import math
 
+from instrumentation import timed
+from path_store import PathStore, PathStoreView, char_bit, char_mask
+
+if TYPE_CHECKING:
+    from index_rules import IndexFilter
+
 # Define a set of directory names that should *always* be excluded.
 # This list now implicitly covers hidden directories that are commonly
 # undesirable in a search, such as .git, .venv, .cache, etc.
@@ -36,57 +45,193 @@ ALWAYS_EXCLUDED_FILE_NAMES = {
     'thumbs.db' # Windows thumbnails
 }
 
-def get_home_directory_files(include_hidden: bool = False) -> List[Path]:
+# Hidden names that carry indexing rules (see index_rules.py). They are never
+# indexed themselves, but `scan_directory` reports which of them it saw.
+RULE_FILE_NAMES = {'.gitignore', '.ignore', '.git'}
+
+def is_excluded_name(name: str) -> bool:
     """
-    Recursively gets all files and directories within the user's home directory.
-    This version **always excludes** hidden folders and files (those starting with '.')
-    and other specific system/library folders.
-    The `include_hidden` parameter is effectively ignored in this version,
-    as all hidden items are permanently excluded.
+    Returns True if a file or directory name should never appear in the index.
+    Hidden names (starting with '.') are always excluded, as are the names in
+    ALWAYS_EXCLUDED_DIR_NAMES and ALWAYS_EXCLUDED_FILE_NAMES.
+    """
+    return (
+        name.startswith('.') or
+        name in ALWAYS_EXCLUDED_DIR_NAMES or
+        name in ALWAYS_EXCLUDED_FILE_NAMES
+    )
+
+def scan_directory(directory: str, rule_files: Optional[List[str]] = None) -> Tuple[List[str], List[str]]:
+    """
+    Lists a single directory with `os.scandir`, applying the exclusion rules.
+    If `rule_files` is given, the `RULE_FILE_NAMES` found are appended to it.
 
     Returns:
-        List[Path]: A list of Path objects representing files and directories.
+        Tuple[List[str], List[str]]: (subdirectories to descend into, other entries).
+        Symlinked directories are reported as entries but never descended into,
+        matching `os.walk(..., followlinks=False)`. Broken symlinks are dropped.
     """
-    home_dir = Path.home()
-    all_paths: List[Path] = []
-    
-    # Add home_dir itself if it's not in the ALWAYS_EXCLUDED_DIR_NAMES
-    if home_dir.name not in ALWAYS_EXCLUDED_DIR_NAMES:
-        all_paths.append(home_dir)
+    subdirs: List[str] = []
+    leaves: List[str] = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            name = entry.name
+            if is_excluded_name(name):
+                if rule_files is not None and name in RULE_FILE_NAMES:
+                    rule_files.append(name)
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(name)
+                elif entry.is_symlink() and not os.path.exists(entry.path):
+                    continue # Dangling symlink
+                else:
+                    leaves.append(name)
+            except OSError:
+                continue # Entry vanished while we were looking at it
+    return subdirs, leaves
 
-    for root, dirs, files in os.walk(home_dir, followlinks=False):
-        current_path = Path(root)
+class WalkStats:
+    """
+    Throughput counters filled in by `walk_directory_tree`.
+    """
+    def __init__(self) -> None:
+        self.directories = 0
+        self.entries = 0
+        self.elapsed = 0.0 # Seconds
 
-        # Skip adding the current root if it's an always excluded directory (and not home_dir itself)
-        if current_path != home_dir and current_path.name in ALWAYS_EXCLUDED_DIR_NAMES:
-            continue
-        
-        # Filter 'dirs' in-place for os.walk to avoid traversing unwanted subdirectories.
-        # This is the most efficient way to exclude large trees.
-        # Directories starting with '.' are now explicitly excluded here.
-        dirs[:] = [
-            d_name for d_name in dirs
-            if d_name not in ALWAYS_EXCLUDED_DIR_NAMES and not d_name.startswith('.')
-        ]
+    @property
+    def entries_per_second(self) -> float:
+        return self.entries / self.elapsed if self.elapsed > 0 else 0.0
 
-        # Process files and directories in the current `root` (after `dirs` has been filtered)
-        for entry_name in files + dirs: # Iterate over both files and the now filtered directories
-            entry_path = current_path / entry_name
+    def __str__(self) -> str:
+        return (f"{self.entries} entries in {self.directories} directories "
+                f"in {self.elapsed:.2f}s ({self.entries_per_second:,.0f} entries/sec)")
 
-            # Apply general exclusion rules: always exclude names in predefined sets
-            if entry_path.name in ALWAYS_EXCLUDED_DIR_NAMES or \
-               entry_path.name in ALWAYS_EXCLUDED_FILE_NAMES:
-                continue
-            
-            # Now, explicitly exclude any file or directory whose name starts with '.'
-            # (unless it's the home directory itself, which might be named something like `~/.config`)
-            if entry_path.name.startswith('.') and entry_path != home_dir:
+# Directory listing is I/O bound (especially on NFS), so use more threads than cores.
+DEFAULT_WALK_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+ScanFunction = Callable[[str], Tuple[List[str], List[str]]]
+
+def walk_directory_tree(
+    root: str,
+    max_workers: int = DEFAULT_WALK_WORKERS,
+    stats: Optional[WalkStats] = None,
+    scan: ScanFunction = scan_directory,
+) -> Iterator[Tuple[str, List[str], List[str]]]:
+    """
+    Walks `root` and yields `(directory, subdirs, leaves)` for every directory,
+    in no particular order. Each directory is one work item on a thread pool,
+    so sibling subtrees are listed concurrently. Directories that cannot be
+    listed (permission denied, removed mid-walk) are silently skipped.
+
+    `scan` lists one directory and decides which children to descend into; it
+    defaults to `scan_directory`, which applies the exclusion rules.
+    """
+    stats = stats if stats is not None else WalkStats()
+    # Stats shared by several walks (one per root) add up.
+    started = time.perf_counter() - stats.elapsed
+
+    def record(directory: str, subdirs: List[str], leaves: List[str]):
+        stats.directories += 1
+        stats.entries += len(subdirs) + len(leaves)
+        stats.elapsed = time.perf_counter() - started
+        return directory, subdirs, leaves
+
+    if max_workers <= 1:
+        # Plain depth-first walk on the calling thread.
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                subdirs, leaves = scan(directory)
+            except OSError:
                 continue
-            
-            # Add to list if it exists and is a file or a directory
-            if entry_path.exists():
-                all_paths.append(entry_path)
-            
+            stack.extend(os.path.join(directory, name) for name in subdirs)
+            yield record(directory, subdirs, leaves)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="walker")
+    try:
+        pending = {pool.submit(scan, root): root}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                directory = pending.pop(future)
+                try:
+                    subdirs, leaves = future.result()
+                except OSError:
+                    continue
+                for name in subdirs:
+                    child = os.path.join(directory, name)
+                    pending[pool.submit(scan, child)] = child
+                yield record(directory, subdirs, leaves)
+    finally:
+        # If the consumer stops early, don't keep listing directories nobody wants.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# How many paths `iter_home_directory_files` collects before yielding them.
+DEFAULT_BATCH_SIZE = 5000
+
+def iter_home_directory_files(
+    max_workers: int = DEFAULT_WALK_WORKERS,
+    stats: Optional[WalkStats] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    filters: Optional[Sequence["IndexFilter"]] = None,
+) -> Iterator[List[Path]]:
+    """
+    Walks the index roots (`filters`, by default the configured ones; see
+    index_rules.py) and yields the indexed paths in batches of roughly
+    `batch_size`, as soon as they are found. The same exclusion rules as
+    `get_home_directory_files` apply.
+    """
+    from index_rules import index_filters, load_roots # index_rules builds on this module
+
+    batch: List[Path] = []
+    for index_filter in filters if filters is not None else index_filters(load_roots()):
+        root = Path(index_filter.path)
+        # Add the root itself if it's not in the ALWAYS_EXCLUDED_DIR_NAMES
+        if root.name not in ALWAYS_EXCLUDED_DIR_NAMES:
+            batch.append(root)
+
+        # Entry types come from the DirEntry objects, so there is no extra stat per entry.
+        for directory, subdirs, leaves in walk_directory_tree(str(root), max_workers, stats, index_filter.scan):
+            for entry_name in subdirs:
+                batch.append(Path(directory, entry_name))
+            for entry_name in leaves:
+                batch.append(Path(directory, entry_name))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+@timed("walk")
+def get_home_directory_files(
+    include_hidden: bool = False,
+    max_workers: int = DEFAULT_WALK_WORKERS,
+    stats: Optional[WalkStats] = None,
+    filters: Optional[Sequence["IndexFilter"]] = None,
+) -> List[Path]:
+    """
+    Recursively gets all files and directories within the index roots (the
+    user's home directory unless configured otherwise, see index_rules.py).
+    This version **always excludes** hidden folders and files (those starting with '.')
+    and other specific system/library folders. Each root's exclude globs and
+    .gitignore/.ignore files prune the walk as well.
+    The `include_hidden` parameter is effectively ignored in this version,
+    as all hidden items are permanently excluded.
+
+    The tree is listed with `walk_directory_tree` using `max_workers` threads.
+    Pass a `WalkStats` to get the throughput of the walk.
+
+    Returns:
+        List[Path]: A list of Path objects representing files and directories.
+    """
+    all_paths: List[Path] = []
+    for batch in iter_home_directory_files(max_workers, stats, filters=filters):
+        all_paths.extend(batch)
     return all_paths
 
 
@@ -99,9 +244,12 @@ def fuzzy_match_score(query: str, text: str) -> float:
     - Characters in order
     - Matches at the beginning of words/path components
     """
-    query = query.lower()
-    text = text.lower()
+    return _fuzzy_match_score_lower(query.lower(), text.lower())
 
+def _fuzzy_match_score_lower(query: str, text: str) -> float:
+    """
+    `fuzzy_match_score` for a query and text that are already lowercase.
+    """
     if not query:
         return 1.0 # Empty query matches everything perfectly
 
@@ -145,24 +293,522 @@ def fuzzy_match_score(query: str, text: str) -> float:
 
     return max(0.0, score) # Ensure score is not negative
 
-def fuzzy_search(query: str, items: List[Path], limit: int = 10) -> List[Path]:
+@timed("fuzzy_search")
+def fuzzy_search(
+    query: str,
+    items: Union[Iterable[Path], PathStore, PathStoreView],
+    limit: int = 10,
+    with_scores: bool = False,
+    scorer: Optional[str] = None,
+) -> Union[List[Path], List[Tuple[float, Path]]]:
     """
     Performs a fuzzy search on a list of Path objects and returns the top N matches.
+    `items` may also be a `PathStore` (or a view of one), in which case the
+    precomputed lowercase strings are scored and only the top N entries are
+    turned into Path objects.
+    With `with_scores=True`, (score, path) pairs are returned instead.
+    `scorer` names the scorer to rank with (see `SCORERS`; default `DEFAULT_SCORER`).
     """
     if not query:
         # If query is empty, return an empty list.
         return [] 
 
-    scored_results: List[Tuple[float, Path]] = []
+    if isinstance(items, (PathStore, PathStoreView)):
+        return _fuzzy_search_store(query.lower(), items, limit, with_scores, scorer)
+
+    selected = get_scorer(scorer)
+    score_text, upper_bound = selected.score, selected.upper_bound
+    query = query.lower()
+    query_length = len(query)
+    # Min-heap of the best `limit` matches so far as (score, -position, path):
+    # its root is the match that drops out next (lowest score, latest on ties).
+    top: List[Tuple[float, int, Path]] = []
     
-    for item_path in items:
+    for position, item_path in enumerate(items):
         # Use the string representation of the path for scoring
-        score = fuzzy_match_score(query, str(item_path))
-        if score > 0: # Only add if there's any match
-            scored_results.append((score, item_path))
+        text = str(item_path).lower()
+        if len(top) >= limit and (limit <= 0 or
+                upper_bound(query_length, len(text)) < top[0][0] - _BOUND_EPSILON):
+            continue # Cannot beat the current N-th best match
+        score = score_text(query, text)
+        if score <= 0: # Only keep paths with any match
+            continue
+        if len(top) < limit:
+            heapq.heappush(top, (score, -position, item_path))
+        elif score > top[0][0]: # Ties keep the earlier path
+            heapq.heapreplace(top, (score, -position, item_path))
+
+    # Best score first; equal scores keep their input order
+    top.sort(key=lambda match: (-match[0], -match[1]))
+    if with_scores:
+        return [(score, path) for score, _, path in top]
+    return [path for _, _, path in top]
+
+# Score PathStore searches with the NumPy batch scorer (batch_scorer.py) when
+# NumPy is installed. The pure-Python scorer below remains the reference.
+# NumPy takes a while to import, so batch_scorer is only imported by the
+# first store search, not at startup.
+USE_BATCH_SCORER = True
+
+# The largest amount one matched character can add to the raw in-order score
+# (base 1.0 + consecutive 0.5 + path-component start 0.75), and the penalty
+# for each query character that was not found. Used for score upper bounds.
+_MAX_MATCHED_CHAR_SCORE = 2.25
+_MISSING_CHAR_PENALTY = 0.5
+_BOUND_EPSILON = 1e-9
+
+def _partial_match_upper_bound(query_length: int, possible_matches: int, min_text_length: int) -> float:
+    """
+    Upper bound on `fuzzy_match_score` for a text of at least `min_text_length`
+    characters in which at most `possible_matches` query characters can match.
+    """
+    raw = (_MAX_MATCHED_CHAR_SCORE * possible_matches -
+           _MISSING_CHAR_PENALTY * (query_length - possible_matches))
+    return raw / (query_length + min_text_length * 0.1 + 1e-6)
+
+def _score_upper_bound(query_length: int, text_length: int) -> float:
+    """
+    Upper bound on `fuzzy_match_score` for any text of `text_length`
+    characters, from the exact and substring tiers and the length
+    normalization of in-order matches.
+    """
+    if text_length < query_length:
+        # Too short to contain the query; at most `text_length` characters match.
+        return _partial_match_upper_bound(query_length, text_length, text_length)
+    in_order = _partial_match_upper_bound(query_length, query_length, text_length)
+    if text_length == query_length:
+        return max(2.0, in_order)
+    return max(1.5 + query_length / text_length, in_order)
+
+class Scorer:
+    """
+    How a path is scored against a query; both are already lowercase. A
+    score above zero is a match and higher scores rank first. The bounds let
+    `fuzzy_search` and `score_store` skip paths that cannot reach the top N;
+    the defaults never skip anything.
+    """
+    name = "base"
+    # A path matching a query also matches every prefix of it, so
+    # `SearchSession` may rescan only the previous keystroke's survivors.
+    refines_prefixes = True
+
+    def available(self) -> bool:
+        return True
+
+    def score(self, query: str, text: str) -> float:
+        raise NotImplementedError
+
+    def upper_bound(self, query_length: int, text_length: int) -> float:
+        """Upper bound on `score` for any text of `text_length` characters."""
+        return math.inf
+
+    def partial_upper_bound(self, query_length: int, possible_matches: int, min_text_length: int) -> float:
+        """
+        Upper bound on `score` for a text of at least `min_text_length`
+        characters that contains at most `possible_matches` query characters.
+        """
+        return math.inf
+
+
+class GreedyScorer(Scorer):
+    """`fuzzy_match_score`: first-occurrence, in-order matching (the NumPy batch scorer's twin)."""
+    name = "greedy"
+    score = staticmethod(_fuzzy_match_score_lower)
+    upper_bound = staticmethod(_score_upper_bound)
+    partial_upper_bound = staticmethod(_partial_match_upper_bound)
+
+
+# Scores of the optimal alignment, after fzf: every matched character scores
+# SCORE_MATCH plus a bonus for where it sits, gaps between matched characters
+# cost SCORE_GAP_START plus SCORE_GAP_EXTENSION per further skipped character,
+# and a run of consecutive matches keeps the bonus of the character it started at.
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+# As in fzf's "path" scheme, a path component start beats any other word start.
+BONUS_BOUNDARY = SCORE_MATCH // 2                          # After '_', '-', '.', ' ', ...
+BONUS_BOUNDARY_DELIMITER = BONUS_BOUNDARY + 1              # After '/' or '\\' (or at the start)
+BONUS_BOUNDARY_WHITE = BONUS_BOUNDARY                      # After whitespace
+BONUS_NON_WORD = SCORE_MATCH // 2                          # On a non-word character itself
+BONUS_NUMBER = BONUS_BOUNDARY - 1                          # First digit after a letter
+BONUS_CONSECUTIVE = -(SCORE_GAP_START + SCORE_GAP_EXTENSION)
+BONUS_FIRST_CHAR_MULTIPLIER = 2
+_MAX_BONUS = max(BONUS_BOUNDARY_DELIMITER, BONUS_BOUNDARY_WHITE, BONUS_NON_WORD)
+
+# The alignment is searched between the first occurrence of the query's first
+# character and the last occurrence of its last one. Wider windows (very long
+# paths) are scored along a single, locally tightened alignment instead.
+MAX_ALIGNMENT_WINDOW = 512
+
+_WHITE, _NON_WORD, _DELIMITER, _LETTER, _NUMBER = range(5)
+_char_classes: Dict[str, int] = {}
+
+def _char_class(char: str) -> int:
+    char_class = _char_classes.get(char)
+    if char_class is None:
+        if char in ('/', '\\'):
+            char_class = _DELIMITER
+        elif char.isspace():
+            char_class = _WHITE
+        elif char.isdigit():
+            char_class = _NUMBER
+        elif char.isalpha():
+            char_class = _LETTER
+        else:
+            char_class = _NON_WORD
+        _char_classes[char] = char_class
+    return char_class
+
+def _position_bonus(text: str, position: int) -> int:
+    char_class = _char_class(text[position])
+    previous = _char_class(text[position - 1]) if position else _DELIMITER
+    if char_class >= _LETTER:
+        if previous == _WHITE:
+            return BONUS_BOUNDARY_WHITE
+        if previous == _DELIMITER:
+            return BONUS_BOUNDARY_DELIMITER
+        if previous == _NON_WORD:
+            return BONUS_BOUNDARY
+        if previous == _LETTER and char_class == _NUMBER:
+            return BONUS_NUMBER
+        return 0
+    return BONUS_BOUNDARY_WHITE if char_class == _WHITE else BONUS_NON_WORD
+
+def _alignment_score(query: str, text: str, start: int, end: int) -> int:
+    """
+    Best alignment score of `query` within `text[start:end]`, by dynamic
+    programming over the positions where each query character occurs (the
+    only cells that can hold a match). 0 if there is no alignment.
+    """
+    # Per row: (position, score of the best alignment ending there, bonus of its run's first character)
+    previous: List[Tuple[int, int, int]] = []
+    for row, char in enumerate(query):
+        current: List[Tuple[int, int, int]] = []
+        # Best (score - position * SCORE_GAP_EXTENSION) over the previous row's
+        # cells at least one character back: the gap cost is linear in its length.
+        best_gapped = -math.inf
+        cursor = 0
+        position = text.find(char, start, end)
+        while position >= 0:
+            bonus = _position_bonus(text, position)
+            if row == 0:
+                current.append((position, SCORE_MATCH + bonus * BONUS_FIRST_CHAR_MULTIPLIER, bonus))
+            else:
+                while cursor < len(previous) and previous[cursor][0] < position - 1:
+                    best_gapped = max(best_gapped, previous[cursor][1] - previous[cursor][0] * SCORE_GAP_EXTENSION)
+                    cursor += 1
+                best = None
+                if best_gapped > -math.inf:
+                    # A gap of g characters costs SCORE_GAP_START + (g - 1) * SCORE_GAP_EXTENSION,
+                    # and an alignment never scores below zero (fzf's local alignment).
+                    gapped = best_gapped + SCORE_GAP_START + (position - 2) * SCORE_GAP_EXTENSION
+                    best = (max(gapped, 0) + SCORE_MATCH + bonus, bonus)
+                if cursor < len(previous) and previous[cursor][0] == position - 1:
+                    _, run_score, run_bonus = previous[cursor]
+                    if bonus >= BONUS_BOUNDARY and bonus > run_bonus:
+                        run_bonus = bonus # A new word starts within the run
+                    consecutive = run_score + SCORE_MATCH + max(bonus, run_bonus, BONUS_CONSECUTIVE)
+                    if best is None or consecutive >= best[0]:
+                        best = (consecutive, run_bonus)
+                if best is not None:
+                    current.append((position, best[0], best[1]))
+            position = text.find(char, position + 1, end)
+        if not current:
+            return 0
+        previous = current
+    return max(score for _, score, _ in previous)
+
+def _tightened_alignment_score(query: str, text: str, end: int) -> int:
+    """
+    Score of one alignment: the last occurrence of the query's last character
+    before `end`, then each earlier character as late as possible (so the
+    match is as compact as a backward scan can make it).
+    """
+    positions = []
+    position = end
+    for char in reversed(query):
+        position = text.rfind(char, 0, position)
+        positions.append(position)
+    positions.reverse()
+
+    score = 0
+    run_bonus = 0
+    for index, position in enumerate(positions):
+        bonus = _position_bonus(text, position)
+        if index == 0:
+            score += SCORE_MATCH + bonus * BONUS_FIRST_CHAR_MULTIPLIER
+            run_bonus = bonus
+        elif position == positions[index - 1] + 1:
+            if bonus >= BONUS_BOUNDARY and bonus > run_bonus:
+                run_bonus = bonus
+            score += SCORE_MATCH + max(bonus, run_bonus, BONUS_CONSECUTIVE)
+        else:
+            gap = position - positions[index - 1] - 1
+            score = max(score + SCORE_GAP_START + (gap - 1) * SCORE_GAP_EXTENSION, 0) + SCORE_MATCH + bonus
+            run_bonus = bonus
+    return score
+
+
+class OptimalScorer(Scorer):
+    """
+    fzf-style scoring of the best alignment of the query in the path: every
+    query character must occur, in order, and among all the ways they do the
+    one that scores highest counts, so a contiguous match in the file name
+    beats scattered hits earlier in the path. Ties go to shorter paths.
+    """
+    name = "optimal"
+
+    def score(self, query: str, text: str) -> float:
+        start = text.find(query[0])
+        if start < 0:
+            return 0.0
+        position = start
+        for char in query[1:]:
+            position = text.find(char, position + 1)
+            if position < 0:
+                return 0.0 # Not a subsequence
+        end = text.rfind(query[-1]) + 1
+        if end - start > MAX_ALIGNMENT_WINDOW:
+            raw = _tightened_alignment_score(query, text, end)
+        else:
+            raw = _alignment_score(query, text, start, end)
+        return raw + 1.0 / (1 + len(text))
+
+    def _max_raw(self, query_length: int) -> int:
+        # Every character on a component start (or continuing a run from one)
+        return query_length * (SCORE_MATCH + _MAX_BONUS) + _MAX_BONUS * (BONUS_FIRST_CHAR_MULTIPLIER - 1)
+
+    def upper_bound(self, query_length: int, text_length: int) -> float:
+        if text_length < query_length:
+            return 0.0
+        return self._max_raw(query_length) + 1.0 / (1 + text_length)
+
+    def partial_upper_bound(self, query_length: int, possible_matches: int, min_text_length: int) -> float:
+        if possible_matches < query_length:
+            return 0.0 # Some query character never occurs
+        return self.upper_bound(query_length, max(query_length, min_text_length))
+
+
+class LevenshteinScorer(Scorer):
+    """
+    Typo-tolerant similarity: the best edit-distance ratio of the query
+    against any window of the path's tail (the file name, or as many trailing
+    components as the query has), from fuzzywuzzy's `partial_ratio` running
+    on python-Levenshtein's C matcher. Paths below MIN_SIMILARITY don't match;
+    among the others, tails closer to the query as a whole rank first.
+    Since a typo can be fixed by the next keystroke, a longer query may match
+    paths its prefix did not, so every keystroke rescans the whole index.
+    """
+    name = "levenshtein"
+    refines_prefixes = False
+    MIN_SIMILARITY = 0.6
+
+    # Weight of the whole-tail ratio against the best-window one.
+    TAIL_WEIGHT = 0.3
+
+    def __init__(self) -> None:
+        self._partial_ratio: Optional[Callable[[str, str], int]] = None
+        self._ratio: Optional[Callable[[str, str], float]] = None
+
+    def available(self) -> bool:
+        if self._partial_ratio is None:
+            try:
+                import Levenshtein # Without it fuzzywuzzy falls back to difflib
+                from fuzzywuzzy import fuzz
+            except ImportError:
+                return False
+            self._partial_ratio = fuzz.partial_ratio
+            self._ratio = Levenshtein.ratio
+        return True
+
+    def score(self, query: str, text: str) -> float:
+        components = query.count('/') + query.count('\\') + 1
+        tail_start = len(text)
+        for _ in range(components):
+            tail_start = max(text.rfind('/', 0, tail_start), text.rfind('\\', 0, tail_start))
+            if tail_start < 0:
+                break
+        tail = text[tail_start + 1:]
+        if len(tail) < len(query):
+            # partial_ratio would look for the tail inside the query instead
+            similarity = self._ratio(query, tail)
+        else:
+            similarity = self._partial_ratio(query, tail) / 100
+        if similarity < self.MIN_SIMILARITY:
+            return 0.0
+        similarity += self.TAIL_WEIGHT * self._ratio(query, tail)
+        return similarity + 0.01 / (1 + len(text)) # Ties go to shorter paths
+
+    def upper_bound(self, query_length: int, text_length: int) -> float:
+        return 1.0 + self.TAIL_WEIGHT + 0.01 / (1 + text_length)
+
+    def partial_upper_bound(self, query_length: int, possible_matches: int, min_text_length: int) -> float:
+        # At most `possible_matches` (p) characters agree: a window as long as the
+        # query scores at most p / q, a shorter tail's ratio at most 2p / (q + p).
+        if 2 * possible_matches < self.MIN_SIMILARITY * (query_length + possible_matches):
+            return 0.0
+        return self.upper_bound(query_length, min_text_length)
+
+
+SCORERS: Dict[str, Scorer] = {scorer.name: scorer for scorer in (GreedyScorer(), OptimalScorer(), LevenshteinScorer())}
+
+# Used when no scorer is named. "greedy" is the only one the NumPy batch
+# scorer and the sharded workers' fast path implement.
+DEFAULT_SCORER = "greedy"
+
+def get_scorer(name: Optional[str] = None) -> Scorer:
+    """
+    Returns the scorer called `name` (default `DEFAULT_SCORER`). Raises
+    ValueError if there is none, or if its libraries are not installed.
+    """
+    scorer = SCORERS.get(name or DEFAULT_SCORER)
+    if scorer is None:
+        raise ValueError(f"Unknown scorer {name!r} (expected one of: {', '.join(SCORERS)}).")
+    if not scorer.available():
+        raise ValueError(f"The {scorer.name!r} scorer needs packages that are not installed.")
+    return scorer
+
+
+def _fuzzy_search_store(
+    query: str,
+    items: Union[PathStore, PathStoreView],
+    limit: int,
+    with_scores: bool = False,
+    scorer: Optional[str] = None,
+) -> Union[List[Path], List[Tuple[float, Path]]]:
+    store = items.store if isinstance(items, PathStoreView) else items
+    results = score_store(query, items, limit, scorer=scorer)
+    if with_scores:
+        return [(score, store.path(entry_id)) for score, entry_id in results]
+    return [store.path(entry_id) for score, entry_id in results]
+
+@timed("score")
+def score_store(
+    query: str,
+    items: Union[PathStore, PathStoreView],
+    limit: Optional[int] = None,
+    survivors: Optional[List[int]] = None,
+    scorer: Optional[str] = None,
+) -> List[Tuple[float, int]]:
+    """
+    Scores a `PathStore` (or a view of one) for an already-lowercased query
+    using the character-mask prefilter. Returns the best `limit` (score, id)
+    pairs in ranking order, or every positive-scoring pair (unordered) when
+    `limit` is None.
+
+    Entries whose mask contains every query character are always scored. The
+    others can only be partial matches; each mask group gets an upper bound on
+    its score and is skipped if that bound cannot reach the current N-th best
+    score. Within the scored groups, entries whose length alone bounds their
+    score below the current N-th best are skipped too. Ties are broken by
+    entry id, i.e. insertion order, exactly like the list-based search.
+
+    If `survivors` is given, the ids of every entry that may still score above
+    zero (scored positive, or skipped without being scored) are appended to it.
+
+    `scorer` names the scorer (see `SCORERS`); its bounds drive the pruning.
+    """
+    selected = get_scorer(scorer)
+    if selected.name == "greedy" and USE_BATCH_SCORER:
+        import batch_scorer
+        if batch_scorer.available():
+            return batch_scorer.score_store(query, items, limit, survivors)
+    score_text, upper_bound = selected.score, selected.upper_bound
+
+    store = items.store if isinstance(items, PathStoreView) else items
+    query_length = len(query)
+    query_mask = char_mask(query)
+    query_bits: Dict[int, int] = {}
+    for char in query:
+        bit = char_bit(char)
+        query_bits[bit] = query_bits.get(bit, 0) + 1
+
+    # Split the entries into full candidates and partial-match groups.
+    candidates: List[Sequence[int]] = []
+    partial_groups: List[Tuple[int, int, Sequence[int]]] = [] # (mask, min length, ids)
+    if isinstance(items, PathStoreView):
+        full_ids: List[int] = []
+        partial_ids: Dict[int, List[int]] = {}
+        mask_of = store.mask
+        for entry_id in items.ids:
+            mask = mask_of(entry_id)
+            if mask & query_mask == query_mask:
+                full_ids.append(entry_id)
+            else:
+                ids_for_mask = partial_ids.get(mask)
+                if ids_for_mask is None:
+                    ids_for_mask = partial_ids[mask] = []
+                ids_for_mask.append(entry_id)
+        candidates.append(full_ids)
+        # The store-wide group's minimum length is a valid bound for any subset.
+        partial_groups = [
+            (mask, store.mask_group(mask).min_length, ids) for mask, ids in partial_ids.items()
+        ]
+    else:
+        for mask, group in store.mask_groups():
+            if mask & query_mask == query_mask:
+                candidates.append(group.ids)
+            else:
+                partial_groups.append((mask, group.min_length, group.ids))
+
+    partial: List[Tuple[float, Sequence[int]]] = []
+    for mask, min_length, ids in partial_groups:
+        possible_matches = sum(count for bit, count in query_bits.items() if mask & bit)
+        bound = selected.partial_upper_bound(query_length, possible_matches, min_length)
+        if bound > 0:
+            partial.append((bound, ids))
+
+    if limit is not None and limit <= 0:
+        return []
+
+    # With a limit, a min-heap of the best `limit` results as (score, -id):
+    # its root is the result that drops out next (lowest score, highest id).
+    # Without one, every positive result.
+    top: List[Tuple[float, int]] = []
+    scored_results: List[Tuple[float, int]] = []
+    is_alive, lower_str = store.is_alive, store.lower_str
+
+    def score_ids(ids: Sequence[int]) -> None:
+        for entry_id in ids:
+            if not is_alive(entry_id):
+                continue
+            text = lower_str(entry_id)
+            if (limit is not None and len(top) >= limit and
+                    upper_bound(query_length, len(text)) < top[0][0] - _BOUND_EPSILON):
+                # Cannot reach the top N, but may still match a longer query.
+                if survivors is not None:
+                    survivors.append(entry_id)
+                continue
+            score = score_text(query, text)
+            if score <= 0:
+                continue
+            if survivors is not None:
+                survivors.append(entry_id)
+            if limit is None:
+                scored_results.append((score, entry_id))
+            elif len(top) < limit:
+                heapq.heappush(top, (score, -entry_id))
+            elif (score, -entry_id) > top[0]:
+                heapq.heapreplace(top, (score, -entry_id))
+
+    for ids in candidates:
+        score_ids(ids)
+
+    # Most promising partial groups first, so the threshold rises quickly.
+    partial.sort(key=lambda item: item[0], reverse=True)
+    for position, (bound, ids) in enumerate(partial):
+        if limit is not None and len(top) >= limit and bound < top[0][0] - _BOUND_EPSILON:
+            # No remaining group can reach the top N.
+            if survivors is not None:
+                for _, skipped_ids in partial[position:]:
+                    survivors.extend(entry_id for entry_id in skipped_ids if is_alive(entry_id))
+            break
+        score_ids(ids)
 
-    # Sort by score in descending order
-    scored_results.sort(key=lambda x: x[0], reverse=True)
+    if limit is None:
+        return scored_results
+    return sorted(((score, -negated_id) for score, negated_id in top), key=ranking_key)
 
-    # Return only the Path objects, limited to the top N
-    return [path for score, path in scored_results[:limit]]
\ No newline at end of file
+def ranking_key(result: Tuple[float, int]) -> Tuple[float, int]:
+    """Sort key for (score, id) pairs: best score first, then insertion order."""
+    return (-result[0], result[1])
@@ -0,0 +1,358 @@
+# textual_file_search/search_daemon.py
+"""
+Headless search daemon that owns one warm home directory index.
+
+The daemon loads (and refreshes) the on-disk snapshot, keeps it up to date
+with a filesystem watcher and answers queries over a Unix domain socket, so
+any number of `FileSearchApp` instances, editor integrations and scripts can
+share it instead of each building their own copy.
+
+Protocol: one JSON object per line in each direction. Every request has an
+"op" field; every response has "ok" and, when "ok" is false, "error".
+
+    {"op": "ping"}                              -> {"ok": true, "version": 1}
+    {"op": "search", "query": "rep", "limit": 10}
+                                                -> {"ok": true, "results": [[score, path], ...]}
+        (optionally with "scorer": "greedy" / "optimal" / "levenshtein", see search.py)
+    {"op": "status"}                            -> {"ok": true, "entries": N, "changes": C, ...}
+    {"op": "shutdown"}                          -> {"ok": true}
+
+`content_search` streams: one {"ok": true, "matches": [[path, line, preview], ...]}
+line per batch as files are searched, then {"ok": true, "done": true}. A
+client cancels it by closing the connection.
+
+Each connection gets its own `SearchSession`, so a client typing a query
+letter by letter gets the same incremental speed-up as the in-process search.
+"""
+import json
+import os
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from content_search import ContentMatch, ContentSearcher
+from index_cache import default_index_path, iter_home_index
+from index_rules import index_filters, load_roots
+from path_store import PathStore
+from search import WalkStats
+from search_session import SearchSession
+from watcher import RESCAN, BaseWatcher, IndexEvent, apply_index_events, create_watcher
+
+PROTOCOL_VERSION = 1
+
+# Upper bound on the number of results a client may ask for.
+MAX_LIMIT = 1000
+
+
+def default_socket_path() -> Path:
+    """Returns the daemon socket location (under $XDG_RUNTIME_DIR if set)."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "fuzzy_file_search.sock"
+    return default_index_path().parent / "daemon.sock"
+
+
+class DaemonError(Exception):
+    """Raised by `DaemonClient` when the daemon rejects a request."""
+
+
+class DaemonTimeout(DaemonError):
+    """
+    Raised by `DaemonClient` when the daemon did not answer in time (a slow
+    query, or a daemon still busy indexing). The client reconnects, so it
+    stays usable; the daemon itself is not known to be gone.
+    """
+
+
+class LiveIndex:
+    """
+    The index of the configured roots (see index_rules.py), loaded in a
+    background thread and kept in sync by one watcher per root. All access to
+    `store` must hold `lock`.
+    """
+
+    def __init__(self, watcher_backend: str = "auto") -> None:
+        self.store = PathStore()
+        self.lock = threading.Lock()
+        self.watcher_backend = watcher_backend
+        self.indexing = False
+        # Bumped whenever the index changes, so clients can tell when their
+        # displayed results may be stale.
+        self.changes = 0
+        self.roots: List[str] = []
+        self._watchers: List[BaseWatcher] = []
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        self.indexing = True
+        threading.Thread(target=self._load, name="index-loader", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._stop_watchers()
+
+    def _stop_watchers(self) -> None:
+        for watcher in self._watchers:
+            watcher.stop()
+        self._watchers = []
+
+    def _load(self) -> None:
+        stats = WalkStats()
+        filters = index_filters(load_roots())
+        self.roots = [index_filter.path for index_filter in filters]
+        try:
+            for batch in iter_home_index(stats=stats, filters=filters):
+                if self._stopped.is_set():
+                    return
+                with self.lock:
+                    self.store.extend(batch)
+                    self.changes += 1
+        finally:
+            self.indexing = False
+        print(f"Indexed {len(self.store)} files and directories. Walk: {stats}")
+        if not self._stopped.is_set():
+            for index_filter in filters:
+                watcher = create_watcher(
+                    index_filter.path, self._apply_events, backend=self.watcher_backend, index_filter=index_filter
+                )
+                watcher.start()
+                self._watchers.append(watcher)
+
+    def _apply_events(self, events: List[IndexEvent]) -> None:
+        if any(event.kind == RESCAN for event in events):
+            print("Watcher queue overflowed, reloading the index.")
+            self._stop_watchers()
+            with self.lock:
+                self.store.clear()
+                self.changes += 1
+            self.start()
+            return
+        with self.lock:
+            apply_index_events(self.store, events)
+            self.changes += 1
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.store),
+            "indexing": self.indexing,
+            "changes": self.changes,
+            "watcher": self._watchers[0].backend_name if self._watchers else None,
+            "roots": self.roots,
+            "pid": os.getpid(),
+        }
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Serves one client connection until it disconnects."""
+
+    def handle(self) -> None:
+        daemon: "SearchDaemon" = self.server.search_daemon
+        session = SearchSession(daemon.index.store)
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("op") == "content_search":
+                    daemon.stream_content_search(request, self._send)
+                    continue
+                response = daemon.handle_request(request, session)
+            except Exception as error: # Malformed requests must not kill the daemon
+                response = {"ok": False, "error": f"{type(error).__name__}: {error}"}
+            try:
+                self._send(response)
+            except (BrokenPipeError, ConnectionResetError):
+                return # The client gave up waiting (see `DaemonTimeout`)
+
+    def _send(self, response: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class SearchDaemon:
+    """Owns a `LiveIndex` and serves it on a Unix domain socket."""
+
+    def __init__(self, socket_path: Optional[Path] = None, watcher_backend: str = "auto") -> None:
+        self.socket_path = Path(socket_path or default_socket_path())
+        self.index = LiveIndex(watcher_backend)
+        self.content_searcher = ContentSearcher()
+        self._server: Optional[_UnixServer] = None
+
+    def handle_request(self, request: Dict[str, Any], session: SearchSession) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "search":
+            query = str(request.get("query", ""))
+            limit = max(0, min(int(request.get("limit", 10)), MAX_LIMIT))
+            scorer = request.get("scorer")
+            with self.index.lock:
+                scored = session.search_scored(query, limit, str(scorer) if scorer else None)
+                results = [(score, self.index.store.path_str(entry_id)) for score, entry_id in scored]
+            return {"ok": True, "results": results}
+        if op == "status":
+            return {"ok": True, **self.index.status()}
+        if op == "ping":
+            return {"ok": True, "version": PROTOCOL_VERSION}
+        if op == "shutdown":
+            # shutdown() waits for serve_forever() to return, so not from this thread.
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"Unknown op: {op!r}"}
+
+    def stream_content_search(self, request: Dict[str, Any], send) -> None:
+        """
+        Answers a `content_search` request with a stream of match batches.
+        Writing to a client that hung up raises, which ends the search.
+        """
+        query = str(request.get("query", ""))
+        limit = max(0, min(int(request.get("limit", 200)), MAX_LIMIT))
+        with self.index.lock:
+            store = self.index.store
+            paths = [store.path_str(entry_id) for entry_id in store.ids()]
+        try:
+            self.content_searcher.search(
+                query, paths, lambda matches: send({"ok": True, "matches": matches}), limit=limit
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            return # Cancelled by the client
+        send({"ok": True, "done": True})
+
+    def _claim_socket_path(self) -> None:
+        """Removes a stale socket file, refusing if another daemon answers on it."""
+        if not self.socket_path.exists():
+            self.socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(self.socket_path))
+        except OSError:
+            self.socket_path.unlink() # Left behind by a daemon that died
+        else:
+            raise RuntimeError(f"A search daemon is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+    def serve_forever(self) -> None:
+        """Starts indexing and serves requests until `shutdown()` is called."""
+        self._claim_socket_path()
+        self._server = _UnixServer(str(self.socket_path), _RequestHandler)
+        self._server.search_daemon = self
+        os.chmod(self.socket_path, 0o600) # Other users may not query our home directory
+        self.index.start()
+        print(f"Search daemon listening on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self.index.stop()
+            self.content_searcher.close()
+            self._server.server_close()
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class DaemonClient:
+    """
+    Connection to a running `SearchDaemon`. Safe to share between threads;
+    requests are sent one at a time.
+    """
+
+    def __init__(self, socket_path: Optional[Path] = None, timeout: Optional[float] = 5.0) -> None:
+        self.socket_path = Path(socket_path or default_socket_path())
+        self.timeout = timeout
+        self._connect()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(str(self.socket_path))
+        except OSError:
+            sock.close()
+            raise
+        self._socket = sock
+        self._reader = sock.makefile("rb")
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._reader.close()
+        self._socket.close()
+
+    def request(self, op: str, **fields: Any) -> Dict[str, Any]:
+        """
+        Sends one request and returns the response. Raises `DaemonError` if it
+        failed, `DaemonTimeout` if no answer came within `timeout` seconds.
+        """
+        payload = json.dumps({"op": op, **fields}).encode("utf-8") + b"\n"
+        with self._lock:
+            try:
+                self._socket.sendall(payload)
+                line = self._reader.readline()
+            except socket.timeout as error:
+                # The late answer would be read as the next request's; start afresh.
+                self.close()
+                self._connect()
+                raise DaemonTimeout(f"The search daemon did not answer {op!r} within {self.timeout:g} s") from error
+        if not line:
+            raise ConnectionResetError("The search daemon closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "Unknown error"))
+        return response
+
+    def search_scored(self, query: str, limit: int = 10, scorer: Optional[str] = None) -> List[Tuple[float, str]]:
+        """Returns the best `limit` (score, path string) pairs for `query`, ranked by `scorer`."""
+        fields: Dict[str, Any] = {"query": query, "limit": limit}
+        if scorer:
+            fields["scorer"] = scorer
+        return [(score, path) for score, path in self.request("search", **fields)["results"]]
+
+    def search(self, query: str, limit: int = 10, scorer: Optional[str] = None) -> List[Path]:
+        """Same results as `search.fuzzy_search` over the daemon's index."""
+        return [Path(path) for _, path in self.search_scored(query, limit, scorer)]
+
+    def status(self) -> Dict[str, Any]:
+        return self.request("status")
+
+    def content_search(self, query: str, limit: int = 200) -> Iterator[List[ContentMatch]]:
+        """
+        Yields batches of content matches as the daemon finds them. Runs on a
+        connection of its own; stopping the iteration cancels the search.
+        """
+        with DaemonClient(self.socket_path, timeout=None) as stream:
+            payload = json.dumps({"op": "content_search", "query": query, "limit": limit})
+            stream._socket.sendall(payload.encode("utf-8") + b"\n")
+            for line in stream._reader:
+                response = json.loads(line)
+                if not response.get("ok"):
+                    raise DaemonError(response.get("error", "Unknown error"))
+                if response.get("done"):
+                    return
+                yield [ContentMatch(*match) for match in response["matches"]]
+            raise ConnectionResetError("The search daemon closed the connection")
+
+    def shutdown(self) -> None:
+        self.request("shutdown")
+
+
+def connect_to_daemon(socket_path: Optional[Path] = None) -> Optional[DaemonClient]:
+    """Returns a client for the running daemon, or None if none is listening."""
+    try:
+        client = DaemonClient(socket_path)
+        client.request("ping")
+        return client
+    except (OSError, ValueError, DaemonError):
+        return None
@@ -0,0 +1,95 @@
+# textual_file_search/search_session.py
+"""
+Incremental query refinement for the interactive search box.
+
+If a path scores above zero for "repo", it also scores above zero for "rep":
+the greedy matcher consumes the query left to right, so a longer query can
+only add matched characters or penalties on top of its prefix. A
+`SearchSession` therefore remembers, for each query typed so far, the entries
+that may still score above zero (its "survivors"). When the new query extends
+the previous one, only those survivors are rescanned. Backspacing pops back
+to an earlier, cached result set.
+
+This holds for the scorers whose `refines_prefixes` is set (see search.py).
+For the others each new query scans the whole store, and only repeating a
+query that is still cached is answered without scoring.
+"""
+from array import array
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from path_store import PathStore, PathStoreView
+from search import get_scorer, score_store
+
+
+class _CachedQuery(NamedTuple):
+    query: str                      # Lowercased query
+    limit: int
+    results: List[Tuple[float, int]] # Top `limit` (score, id) pairs
+    survivors: array                # Ids that may still score above zero
+    next_id: int                    # `PathStore.next_id` when this was computed
+
+
+class SearchSession:
+    """
+    Answers a sequence of related queries against one `PathStore`, reusing the
+    candidate set of the longest cached prefix of each new query.
+    """
+    # Cached result sets kept for backspacing. The oldest (largest) are
+    # dropped first when the stack grows past this.
+    MAX_DEPTH = 32
+
+    def __init__(self, store: PathStore) -> None:
+        self.store = store
+        self._stack: List[_CachedQuery] = []
+        self._generation = store.generation
+        self._scorer = get_scorer().name # Scorer of the cached queries
+
+    def reset(self) -> None:
+        self._stack.clear()
+        self._generation = self.store.generation
+
+    def search_scored(self, query: str, limit: int = 10, scorer: Optional[str] = None) -> List[Tuple[float, int]]:
+        """Returns the best `limit` (score, entry id) pairs for `query`, ranked by `scorer`."""
+        query = query.lower()
+        if not query:
+            self._stack.clear()
+            return []
+        selected = get_scorer(scorer)
+        if self.store.generation != self._generation or selected.name != self._scorer:
+            self.reset() # Ids were renumbered (compaction or clear), or scores changed meaning
+            self._scorer = selected.name
+
+        # Drop cached queries that are not a prefix of the new one (backspace,
+        # or an edit in the middle of the query).
+        while self._stack and not query.startswith(self._stack[-1].query):
+            self._stack.pop()
+
+        items: Union[PathStore, PathStoreView] = self.store
+        if self._stack:
+            cached = self._stack[-1]
+            is_alive = self.store.is_alive
+            if (cached.query == query and cached.limit == limit and
+                    cached.next_id == self.store.next_id and
+                    all(is_alive(entry_id) for _, entry_id in cached.results)):
+                return cached.results # Backspaced onto a query we already answered
+            if cached.query == query:
+                self._stack.pop()
+            if selected.refines_prefixes:
+                # Entries added to the index since the prefix was cached were never
+                # scored against it, so they are rescanned too.
+                candidates = array("I", cached.survivors)
+                candidates.extend(range(cached.next_id, self.store.next_id))
+                items = self.store.view(candidates)
+
+        survivors: List[int] = []
+        next_id = self.store.next_id
+        results = score_store(query, items, limit, survivors, selected.name)
+        self._stack.append(_CachedQuery(query, limit, results, array("I", survivors), next_id))
+        if len(self._stack) > self.MAX_DEPTH:
+            del self._stack[0]
+        return results
+
+    def search(self, query: str, limit: int = 10, scorer: Optional[str] = None) -> List[Path]:
+        """Same as `search.fuzzy_search(query, store, limit, scorer=scorer)`, but incremental."""
+        return [self.store.path(entry_id) for _, entry_id in self.search_scored(query, limit, scorer)]
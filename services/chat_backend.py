@@ -0,0 +1,23 @@
+# textual_file_search/services/chat_backend.py
+"""
+The interface between `GeminiAPI` and whatever generates the replies.
+
+A backend is stateless: every call gets the whole conversation so far, so
+replies can be cached by conversation (see response_cache.py), and the real
+service can be swapped for a local stand-in (see fake_gemini.py).
+"""
+from typing import AsyncIterator, List, Tuple
+
+# (role, text) pairs, oldest first. Roles are "user" and "model", as in the Gemini API.
+History = List[Tuple[str, str]]
+
+
+class ChatBackend:
+    """Base class for reply generators."""
+
+    model_name = "unknown"
+
+    async def stream(self, history: History, message: str) -> AsyncIterator[str]:
+        """Yields the reply to `message`, given the earlier `history`, in chunks."""
+        raise NotImplementedError
+        yield # Makes this an async generator, like the implementations
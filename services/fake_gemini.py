@@ -0,0 +1,68 @@
+# textual_file_search/services/fake_gemini.py
+"""
+A local, deterministic stand-in for the Gemini service, for tests, offline
+work and latency experiments:
+
+    GeminiAPI(FakeBackend())           # or GEMINI_BACKEND=fake python main.py
+
+Replies arrive after `latency` seconds and are streamed a few words at a time
+with a delay between chunks, like the real service. The same conversation
+always gets the same reply.
+"""
+import asyncio
+from typing import AsyncIterator, Callable, List, Optional
+
+from services.chat_backend import ChatBackend, History
+
+# The default reply echoes the message inside some Markdown, so incremental
+# rendering of lists and code blocks is exercised.
+DEFAULT_REPLY = (
+    "You said: **{message}** (turn {turn})\n\n- first point\n- second point\n\n"
+    "```python\nprint({message!r})\n```\n"
+)
+
+
+class FakeBackend(ChatBackend):
+    """
+    Streams `reply(history, message)` (by default `DEFAULT_REPLY`) in chunks of
+    `words_per_chunk` words. If `fail_after` is set, the stream raises after
+    that many chunks. `calls` counts the requests that reached the backend.
+    """
+
+    model_name = "fake"
+
+    def __init__(
+        self,
+        reply: Optional[Callable[[History, str], str]] = None,
+        latency: float = 0.2,
+        chunk_delay: float = 0.02,
+        words_per_chunk: int = 3,
+        fail_after: Optional[int] = None,
+    ) -> None:
+        self.reply = reply or (
+            lambda history, message: DEFAULT_REPLY.format(message=message, turn=len(history) // 2 + 1)
+        )
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.words_per_chunk = words_per_chunk
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def _chunks(self, text: str) -> List[str]:
+        words = text.split(" ")
+        chunks = [
+            " ".join(words[start:start + self.words_per_chunk]) + " "
+            for start in range(0, len(words), self.words_per_chunk)
+        ]
+        chunks[-1] = chunks[-1][:-1]
+        return chunks
+
+    async def stream(self, history: History, message: str) -> AsyncIterator[str]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        for position, chunk in enumerate(self._chunks(self.reply(history, message))):
+            if self.fail_after is not None and position >= self.fail_after:
+                raise ConnectionError("fake stream interrupted")
+            if position:
+                await asyncio.sleep(self.chunk_delay)
+            yield chunk
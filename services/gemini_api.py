@@ -1,35 +1,107 @@
 # textual_file_search/services/gemini_api.py
 
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+from typing import AsyncIterator, Optional
 
-load_dotenv() # Load environment variables from .env file
+from services.chat_backend import ChatBackend, History
+from services.response_cache import CachingBackend, ResponseCache
 
-class GeminiAPI:
-    def __init__(self):
+# The Gemini SDK takes most of a second to import, so it is only loaded when
+# a client is first created (or pre-warmed with `import_sdk()`).
+genai = None
+
+def import_sdk():
+    """Imports the Gemini SDK and loads `.env` once; returns the SDK module."""
+    global genai
+    if genai is None:
+        from dotenv import load_dotenv
+        load_dotenv() # Load environment variables from .env file
+        import google.generativeai
+        genai = google.generativeai
+    return genai
+
+class GeminiBackend(ChatBackend):
+    """Replies from the Gemini service through `google.generativeai`."""
+
+    def __init__(self, model_name: str = "gemini-2.0-flash"):
+        import_sdk()
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables. Please set it in a .env file.")
-        
+
         genai.configure(api_key=api_key)
-        
-        # Initialize the model with chat capabilities
+
         # Using a model that supports multi-turn conversations
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
-        self.chat_session = self.model.start_chat(history=[])
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    async def stream(self, history: History, message: str) -> AsyncIterator[str]:
+        contents = [{"role": role, "parts": [text]} for role, text in history]
+        contents.append({"role": "user", "parts": [message]})
+        response = await self.model.generate_content_async(contents, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+def create_backend(name: Optional[str] = None) -> ChatBackend:
+    """
+    Creates the backend called `name` ("gemini" or "fake"), by default the
+    one named by $GEMINI_BACKEND, else "gemini".
+    """
+    name = name or os.getenv("GEMINI_BACKEND") or "gemini"
+    if name == "fake":
+        from services.fake_gemini import FakeBackend
+        return FakeBackend()
+    if name == "gemini":
+        return GeminiBackend()
+    raise ValueError(f"Unknown chat backend {name!r} (expected 'gemini' or 'fake').")
+
+class GeminiAPI:
+    def __init__(
+        self,
+        backend: Optional[ChatBackend] = None,
+        cache: Optional[ResponseCache] = None,
+        use_cache: bool = True,
+    ):
+        """
+        Chats through `backend` (default: `create_backend()`). Replies go
+        through the on-disk response cache (`cache`, or the default one unless
+        `use_cache` is False), and identical in-flight requests are coalesced.
+        """
+        if cache is None and use_cache:
+            cache = ResponseCache()
+        self.backend = CachingBackend(backend or create_backend(), cache)
+        # The conversation so far; the backends themselves are stateless.
+        self.history: History = []
 
     async def send_message(self, message: str) -> str:
         """Sends a message to the Gemini API and returns the response."""
         try:
-            response = await self.chat_session.send_message_async(message)
-            return response.text
+            return "".join([chunk async for chunk in self.stream_message(message)])
         except Exception as e:
             return f"Error: Could not get response from Gemini API. {e}"
 
+    async def stream_message(self, message: str) -> AsyncIterator[str]:
+        """
+        Sends a message and yields the response text in chunks as they arrive.
+        Errors are raised to the caller. If the caller stops early (closes the
+        generator or its task is cancelled), the generation is abandoned and
+        the unfinished exchange is not added to the chat history.
+        """
+        history = list(self.history)
+        reply = []
+        async for chunk in self.backend.stream(history, message):
+            reply.append(chunk)
+            yield chunk
+        self.history = history + [("user", message), ("model", "".join(reply))]
+
+    def stats(self) -> dict:
+        """Cache hit/miss counts and reply latencies, see `CachingBackend.stats`."""
+        return self.backend.stats()
+
     def reset_chat(self):
         """Resets the current chat session history."""
-        self.chat_session = self.model.start_chat(history=[])
+        self.history = []
 
 # Example usage (for testing, not part of the app flow directly)
 async def main():
@@ -39,9 +111,14 @@ async def main():
         user_message = input("You: ")
         if user_message.lower() == 'quit':
             break
-        response = await gemini.send_message(user_message)
-        print(f"Gemini: {response}")
+        print("Gemini: ", end="", flush=True)
+        try:
+            async for chunk in gemini.stream_message(user_message):
+                print(chunk, end="", flush=True)
+        except Exception as e:
+            print(f"Error: Could not get response from Gemini API. {e}", end="")
+        print()
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,278 @@
+# textual_file_search/services/response_cache.py
+"""
+On-disk cache of chat replies, and a backend wrapper that uses it.
+
+Replies are keyed by the model name plus the normalized conversation (the
+history and the new message, with whitespace collapsed), so asking the same
+question in the same context is answered from disk. Entries expire after a
+TTL, and the least recently used ones are evicted beyond `max_entries`.
+
+`CachingBackend` also coalesces identical requests: while one is being
+generated, an identical request follows the same stream instead of starting
+a second generation. The cache is only touched from worker threads, so a
+slow or locked database never stalls the event loop. Hits, misses, coalesced requests and the latencies to
+the first chunk and to the full reply are counted per backend.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from instrumentation import StageStats, metrics
+from services.chat_backend import ChatBackend, History
+
+DEFAULT_TTL = 7 * 24 * 3600 # Seconds
+DEFAULT_MAX_ENTRIES = 500
+
+
+def default_cache_path() -> Path:
+    """Returns the location of the cache file (under $XDG_CACHE_HOME)."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(cache_home) / "fuzzy_file_search" / "gemini_responses.sqlite"
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def cache_key(model_name: str, history: History, message: str) -> str:
+    conversation = [[role, _normalize(text)] for role, text in history] + [["user", _normalize(message)]]
+    payload = json.dumps({"model": model_name, "conversation": conversation}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed reply cache with TTL expiry and LRU eviction. Thread-safe."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.path = path or default_cache_path()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # Used from whichever worker thread runs the query (see `get_async`).
+                conn = sqlite3.connect(str(self.path), check_same_thread=False)
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses "
+                    "(key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL, last_used REAL)"
+                )
+                self._conn = conn
+            except (OSError, sqlite3.Error) as e:
+                print(f"Warning: response cache {self.path} is unavailable: {e}")
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                if now - row[1] > self.ttl:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                conn.commit()
+                return row[0]
+            except sqlite3.Error as e:
+                print(f"Warning: could not read response cache {self.path}: {e}")
+                return None
+
+    def put(self, key: str, model_name: str, response: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            now = time.time()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (key, model_name, response, now, now)
+                )
+                conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: could not write response cache {self.path}: {e}")
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """`get` in a worker thread."""
+        return await asyncio.to_thread(self.get, key)
+
+    async def put_async(self, key: str, model_name: str, response: str) -> None:
+        """`put` in a worker thread."""
+        await asyncio.to_thread(self.put, key, model_name, response)
+
+    def __len__(self) -> int:
+        with self._lock:
+            conn = self._connect()
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if conn is not None else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("DELETE FROM responses")
+                conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class _Flight:
+    """
+    One backend request, shared by every identical request made while it
+    runs. It is cancelled once no request follows it any more.
+    """
+
+    def __init__(self, chunks: AsyncIterator[str], on_complete: Callable[[str], Awaitable[None]]) -> None:
+        self.chunks: List[str] = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.abandoned = False # Cancelled for lack of followers; not to be joined
+        self._followers = 0
+        self._changed = asyncio.Event()
+        self._on_complete = on_complete
+        self.task = asyncio.ensure_future(self._run(chunks))
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _run(self, chunks: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in chunks:
+                self.chunks.append(chunk)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+        if self.error is None:
+            # Followers already have the whole reply; identical requests keep
+            # joining this flight until it is stored.
+            await self._on_complete("".join(self.chunks))
+
+    async def follow(self) -> AsyncIterator[str]:
+        self._followers += 1
+        position = 0
+        try:
+            while True:
+                while position < len(self.chunks):
+                    yield self.chunks[position]
+                    position += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self._followers -= 1
+            if self._followers == 0 and not self.done:
+                self.abandoned = True
+                self.task.cancel() # Nobody is listening any more
+
+
+class CachingBackend(ChatBackend):
+    """
+    Wraps a backend with the reply cache (if `cache` is given) and
+    coalescing of identical in-flight requests.
+    """
+
+    def __init__(self, backend: ChatBackend, cache: Optional[ResponseCache] = None) -> None:
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.cache = cache
+        self._in_flight: Dict[str, _Flight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.first_chunk = StageStats() # Seconds to the first chunk
+        self.reply = StageStats()       # Seconds to the whole reply
+
+    async def _store(self, key: str, response: str) -> None:
+        if self.cache is not None:
+            await self.cache.put_async(key, self.model_name, response)
+
+    def _record(self, stats: StageStats, name: str, seconds: float, source: str) -> None:
+        stats.add(seconds)
+        metrics.record(name, seconds, source=source)
+
+    async def stream(self, history: History, message: str) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        key = cache_key(self.model_name, history, message)
+        cached = await self.cache.get_async(key) if self.cache is not None else None
+        if cached is not None:
+            self.hits += 1
+            elapsed = time.perf_counter() - started
+            self._record(self.first_chunk, "gemini_first_chunk", elapsed, "cache")
+            self._record(self.reply, "gemini_reply", elapsed, "cache")
+            yield cached
+            return
+
+        flight = self._in_flight.get(key)
+        if flight is None or flight.abandoned:
+            self.misses += 1
+            flight = self._in_flight[key] = _Flight(
+                self.backend.stream(history, message), lambda response: self._store(key, response)
+            )
+            flight.task.add_done_callback(
+                lambda _, flight=flight: self._in_flight.pop(key) if self._in_flight.get(key) is flight else None
+            )
+            source = "backend"
+        else:
+            self.coalesced += 1
+            source = "coalesced"
+
+        first = True
+        try:
+            async for chunk in flight.follow():
+                if first:
+                    first = False
+                    self._record(self.first_chunk, "gemini_first_chunk", time.perf_counter() - started, source)
+                yield chunk
+        except Exception:
+            self.errors += 1
+            raise
+        self._record(self.reply, "gemini_reply", time.perf_counter() - started, source)
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            "requests": requests,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "cached_entries": len(self.cache) if self.cache is not None else 0,
+            "first_chunk": self.first_chunk.summary(),
+            "reply": self.reply.summary(),
+        }
@@ -0,0 +1,358 @@
+# textual_file_search/sharded_search.py
+"""
+Multi-process sharded search for very large indexes.
+
+The lowercase paths of a `PathStore` are published once into shared memory
+(a flat code-point buffer, an offsets array and a live-flags array). A pool of
+persistent worker processes attaches to those segments, each owning a
+contiguous shard of entry ids, so a query is just a short message per worker
+instead of a pickled copy of the index. Every shard returns its local top-k
+and the parent merges them.
+
+Entries added after the last publish are scored in the parent until enough
+of them accumulate to justify re-publishing. A newer query cancels the one
+in flight: workers check a shared query counter between sub-chunks and give
+up early, and the superseded call raises `SearchCancelled`.
+
+Workers score with the NumPy batch scorer when the query uses the default
+"greedy" scorer; any other scorer (see search.py) runs in pure Python over
+the shard's decoded paths.
+"""
+import heapq
+import multiprocessing
+import os
+import threading
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional; workers fall back to the Python scorer
+    np = None
+
+import batch_scorer
+from path_store import PathStore
+from search import get_scorer, ranking_key, score_store
+from utils import real_stderr
+
+DEFAULT_SHARD_WORKERS = max(1, min(16, (os.cpu_count() or 1) - 1))
+
+# Entries scored between two cancellation checks inside a worker.
+SUB_CHUNK_SIZE = 32768
+
+# Entries added since the last publish are scored in the parent; once there
+# are more than this many (or the ids were renumbered) the index is re-published.
+MAX_UNPUBLISHED_ENTRIES = 50000
+
+
+class SearchCancelled(Exception):
+    """Raised by `ShardedSearchEngine.search` when a newer query superseded it."""
+
+
+class _Shard:
+    """A worker's view of its slice of the published index."""
+
+    def __init__(
+        self,
+        names: Tuple[str, str, str],
+        code_size: int,
+        total_units: int,
+        entry_count: int,
+        first_id: int,
+        stop_id: int,
+    ) -> None:
+        # Workers share the parent's resource tracker (spawn), so attaching does
+        # not make them owners; the parent unlinks the segments.
+        self._segments = [SharedMemory(name=name) for name in names]
+        buf_segment, offsets_segment, alive_segment = self._segments
+        self.first_id = first_id
+        self.stop_id = stop_id
+        self.alive = alive_segment.buf
+        self.offsets = memoryview(offsets_segment.buf).cast("q")[:entry_count + 1]
+        self._code_size = code_size
+        self._chunks: List[batch_scorer.EncodedChunk] = []
+        self._texts: Optional[List[str]] = None # Decoded on first use
+
+        if np is not None:
+            dtype = np.uint8 if code_size == 1 else np.uint32
+            buf = np.ndarray((total_units,), dtype=dtype, buffer=buf_segment.buf)
+            offsets = np.ndarray((entry_count + 1,), dtype=np.int64, buffer=offsets_segment.buf)
+            for start in range(first_id, stop_id, SUB_CHUNK_SIZE):
+                stop = min(start + SUB_CHUNK_SIZE, stop_id)
+                base = offsets[start]
+                self._chunks.append(batch_scorer.EncodedChunk(
+                    start,
+                    buf[base:offsets[stop]],
+                    offsets[start:stop] - base,
+                    np.diff(offsets[start:stop + 1]),
+                ))
+
+    def _decoded_texts(self) -> List[str]:
+        if self._texts is None:
+            code_size, first_id, stop_id = self._code_size, self.first_id, self.stop_id
+            encoding = "latin-1" if code_size == 1 else "utf-32-le"
+            raw = bytes(self._segments[0].buf[self.offsets[first_id] * code_size:self.offsets[stop_id] * code_size])
+            text = raw.decode(encoding)
+            base = self.offsets[first_id]
+            self._texts = [
+                text[self.offsets[i] - base:self.offsets[i + 1] - base] for i in range(first_id, stop_id)
+            ]
+        return self._texts
+
+    def close(self) -> None:
+        self._chunks = []
+        self._texts = None
+        self.offsets.release()
+        self.alive = None
+        for segment in self._segments:
+            segment.close()
+
+    def search(self, query: str, limit: int, scorer: str, cancelled) -> Optional[List[Tuple[float, int]]]:
+        """Top `limit` (score, id) pairs of this shard, or None if cancelled."""
+        results: List[Tuple[float, int]] = []
+        selected = get_scorer(scorer)
+        if self._chunks and selected.name == "greedy":
+            for chunk in self._chunks:
+                if cancelled():
+                    return None
+                scores = chunk.score(query)
+                ids = np.arange(chunk.first_id, chunk.first_id + chunk.count, dtype=np.int64)
+                alive = np.frombuffer(self.alive, dtype=np.uint8)[chunk.first_id:chunk.first_id + chunk.count]
+                keep = (scores > 0) & (alive == 1)
+                results.extend(batch_scorer.top_results(scores[keep], ids[keep], limit))
+        else:
+            alive, score_text = self.alive, selected.score
+            for position, text in enumerate(self._decoded_texts()):
+                if position % SUB_CHUNK_SIZE == 0 and cancelled():
+                    return None
+                entry_id = self.first_id + position
+                if alive[entry_id]:
+                    score = score_text(query, text)
+                    if score > 0:
+                        results.append((score, entry_id))
+        return heapq.nsmallest(limit, results, key=ranking_key)
+
+
+def _worker_main(conn, latest_query) -> None:
+    """Entry point of a worker process: answers messages until told to stop."""
+    shard: Optional[_Shard] = None
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        kind = message[0]
+        if kind == "stop":
+            break
+        if kind == "attach":
+            if shard is not None:
+                shard.close()
+            shard = _Shard(*message[1:])
+        elif kind == "query":
+            _, query_id, query, limit, scorer = message
+            results: Optional[List[Tuple[float, int]]] = []
+            if shard is not None:
+                results = shard.search(query, limit, scorer, lambda: latest_query.value != query_id)
+            conn.send((query_id, results))
+    if shard is not None:
+        shard.close()
+
+
+class _PublishedIndex:
+    """Shared memory segments holding one snapshot of a `PathStore`."""
+
+    def __init__(self, store: PathStore) -> None:
+        self.generation = store.generation
+        self.entry_count = store.next_id
+        texts = [store.lower_str(entry_id) for entry_id in range(self.entry_count)]
+
+        offsets = array("q", [0])
+        total = 0
+        for text in texts:
+            total += len(text)
+            offsets.append(total)
+        joined = "".join(texts)
+        try:
+            encoded, self.code_size = joined.encode("latin-1"), 1
+        except UnicodeEncodeError:
+            encoded, self.code_size = joined.encode("utf-32-le"), 4
+        self.total_units = total
+
+        # SharedMemory refuses zero-sized segments.
+        self.buf = SharedMemory(create=True, size=max(1, len(encoded)))
+        self.buf.buf[:len(encoded)] = encoded
+        self.offsets = SharedMemory(create=True, size=len(offsets) * offsets.itemsize)
+        self.offsets.buf[:len(offsets) * offsets.itemsize] = offsets.tobytes()
+        self.alive = SharedMemory(create=True, size=max(1, self.entry_count))
+        self.update_alive(store)
+
+    @property
+    def names(self) -> Tuple[str, str, str]:
+        return (self.buf.name, self.offsets.name, self.alive.name)
+
+    def update_alive(self, store: PathStore) -> None:
+        self.alive.buf[:self.entry_count] = store.alive_flags(0, self.entry_count)
+
+    def release(self) -> None:
+        for segment in (self.buf, self.offsets, self.alive):
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ShardedSearchEngine:
+    """
+    Searches a `PathStore` with a pool of persistent worker processes.
+    Call `close()` (or use it as a context manager) to stop the workers.
+    If a worker dies (killed, out of memory), the query is answered in the
+    calling process and a fresh pool is started; `restarts` counts these.
+    """
+
+    def __init__(self, store: PathStore, workers: int = DEFAULT_SHARD_WORKERS) -> None:
+        self.store = store
+        self.workers = max(1, workers)
+        self._context = multiprocessing.get_context("spawn") # Never fork a threaded TUI
+        self._latest_query = self._context.Value("q", 0, lock=False)
+        self._query_counter = 0
+        self._counter_lock = threading.Lock()
+        self._lock = threading.Lock() # One query on the pipes at a time
+        self._published: Optional[_PublishedIndex] = None
+        self._connections = []
+        self._processes = []
+        self.restarts = 0
+        self._start_workers()
+
+    def _start_workers(self) -> None:
+        with real_stderr():
+            for _ in range(self.workers):
+                parent_conn, child_conn = self._context.Pipe()
+                process = self._context.Process(
+                    target=_worker_main, args=(child_conn, self._latest_query), daemon=True
+                )
+                process.start()
+                child_conn.close()
+                self._connections.append(parent_conn)
+                self._processes.append(process)
+
+    def _restart_workers(self) -> None:
+        """Replaces the pool after a worker failed; the survivors are terminated."""
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join(timeout=2)
+        for conn in self._connections:
+            conn.close()
+        self._connections = []
+        self._processes = []
+        if self._published is not None:
+            self._published.release()
+            self._published = None # The new workers attach on the next query
+        self.restarts += 1
+        self._start_workers()
+
+    def __enter__(self) -> "ShardedSearchEngine":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for conn in self._connections:
+            try:
+                conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        self._connections = []
+        self._processes = []
+        if self._published is not None:
+            self._published.release()
+            self._published = None
+
+    def _publish(self) -> None:
+        published = _PublishedIndex(self.store)
+        count = published.entry_count
+        bounds = [count * i // self.workers for i in range(self.workers + 1)]
+        for conn, first_id, stop_id in zip(self._connections, bounds, bounds[1:]):
+            conn.send(("attach", published.names, published.code_size, published.total_units,
+                       count, first_id, stop_id))
+        if self._published is not None:
+            # Workers keep their mappings until they re-attach; unlinking only drops the names.
+            self._published.release()
+        self._published = published
+
+    def _sync_index(self) -> None:
+        published = self._published
+        if (published is None or published.generation != self.store.generation or
+                self.store.next_id - published.entry_count > MAX_UNPUBLISHED_ENTRIES):
+            self._publish()
+        else:
+            published.update_alive(self.store)
+
+    def cancel(self) -> None:
+        """Cancels the query in flight, if any, without starting a new one."""
+        with self._counter_lock:
+            self._query_counter += 1
+            self._latest_query.value = self._query_counter
+
+    def search_scored(self, query: str, limit: int = 10, scorer: Optional[str] = None) -> List[Tuple[float, int]]:
+        """
+        Returns the best `limit` (score, entry id) pairs for `query`, ranked by
+        `scorer`. Raises `SearchCancelled` if a newer query was started while
+        this one ran.
+        """
+        query = query.lower()
+        if not query:
+            return []
+        scorer = get_scorer(scorer).name # Fail here, not in the workers
+        with self._counter_lock:
+            self._query_counter += 1
+            query_id = self._query_counter
+            self._latest_query.value = query_id
+
+        with self._lock:
+            if self._latest_query.value != query_id:
+                raise SearchCancelled(query)
+            try:
+                results, cancelled = self._query_workers(query_id, query, limit, scorer)
+            except (EOFError, OSError) as error: # A worker died; its pipe is closed
+                print(f"Warning: a search worker failed ({error!r}), restarting the worker pool.")
+                self._restart_workers()
+                results, cancelled = score_store(query, self.store, limit, scorer=scorer), False
+            if cancelled or self._latest_query.value != query_id:
+                raise SearchCancelled(query)
+
+        return heapq.nsmallest(limit, results, key=ranking_key)
+
+    def _query_workers(
+        self, query_id: int, query: str, limit: int, scorer: str
+    ) -> Tuple[List[Tuple[float, int]], bool]:
+        """Runs a query on the pool. Returns the candidates and whether it was cancelled."""
+        with real_stderr(): # Publishing may start the resource tracker
+            self._sync_index()
+        for conn in self._connections:
+            conn.send(("query", query_id, query, limit, scorer))
+
+        # Score entries added since the last publish while the workers run.
+        unpublished = range(self._published.entry_count, self.store.next_id)
+        results = score_store(query, self.store.view(unpublished), limit, scorer=scorer) if unpublished else []
+
+        cancelled = False
+        for conn in self._connections:
+            _, shard_results = conn.recv()
+            if shard_results is None:
+                cancelled = True
+            else:
+                results.extend(shard_results)
+        return results, cancelled
+
+    def search(self, query: str, limit: int = 10, scorer: Optional[str] = None) -> List[Path]:
+        """Same results as `search.fuzzy_search(query, store, limit, scorer=scorer)`."""
+        return [self.store.path(entry_id) for _, entry_id in self.search_scored(query, limit, scorer)]
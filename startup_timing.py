@@ -0,0 +1,59 @@
+# textual_file_search/startup_timing.py
+"""
+Startup import-time report.
+
+Imports the app module in a fresh interpreter with `python -X importtime` and
+lists the modules that cost the most, so regressions in time-to-first-frame
+(a heavy import sneaking back onto the startup path) are easy to spot:
+
+    python main.py --startup-report
+"""
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, NamedTuple
+
+REPO_ROOT = Path(__file__).resolve().parent
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int        # Time spent in the module itself
+    cumulative_us: int  # Including everything it imported
+    depth: int          # Nesting level in the import tree (0 = imported directly)
+
+
+def measure_import_times(module: str = "apps.fuzzy_file_search") -> List[ImportTime]:
+    """Imports `module` in a fresh interpreter and returns every import's timing."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+
+    times = []
+    for line in completed.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # One space after the separator, then two more per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append(ImportTime(name.strip(), int(self_us), int(cumulative_us), depth))
+    return times
+
+
+def format_report(times: List[ImportTime], top: int = 25) -> str:
+    top_level = [timing for timing in times if timing.depth == 0]
+    total_us = sum(timing.cumulative_us for timing in top_level)
+    lines = [f"Total import time: {total_us / 1000:.1f} ms ({len(times)} modules)", ""]
+    lines.append(f"{'cumulative':>12} {'self':>10}  module")
+    for timing in sorted(times, key=lambda timing: timing.cumulative_us, reverse=True)[:top]:
+        lines.append(f"{timing.cumulative_us / 1000:10.1f}ms {timing.self_us / 1000:8.1f}ms  "
+                     f"{'  ' * timing.depth}{timing.module}")
+    return "\n".join(lines)
+
+
+def print_startup_report(module: str = "apps.fuzzy_file_search", top: int = 25) -> None:
+    print(format_report(measure_import_times(module), top))
@@ -0,0 +1,168 @@
+# textual_file_search/tests/test_batch_scorer.py
+"""
+The NumPy batch scorer must give exactly the scores and ranking of the
+pure-Python reference, `search.fuzzy_match_score`.
+"""
+import random
+import threading
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import batch_scorer
+import search
+from path_store import PathStore
+
+# Few distinct characters, so random queries hit substring, in-order and
+# partial matches alike; plus separators and non-Latin-1 characters.
+ALPHABET = "aab_.-/\\ÉéßİΣς日本"
+
+ADVERSARIAL_PATHS = [
+    "/", "/a", "/a/a", "/aa/aaa", "/aaaa", "/\\a\\b", "/ab/ab/ab",
+    "/x/same1", "/x/same2", "/x/same3", "/y/same1", # Ties of equal length
+    "/ß/straße", "/İstanbul/İ", "/ΑΣ/ΟΔΟΣ", "/日本/日本語.txt", "/ÉÉ/é.txt",
+]
+
+ADVERSARIAL_QUERIES = [
+    "a", "aa", "aaa", "aaaaa", "/", "//", "/a/", "b", "ab", "ba", "same", "same1", "x/s",
+    "ß", "ss", "straße", "i̇", "σ", "ς", "ος", "日本", "語", "é", "\\a", "/aa/aaa", "zz", "a\\",
+]
+
+
+def random_paths(rng: random.Random, count: int):
+    """Absolute paths of non-empty components, as the index holds them."""
+    characters = ALPHABET.replace("/", "")
+    paths = []
+    for _ in range(count):
+        components = ["".join(rng.choice(characters) for _ in range(rng.randint(1, 6)))
+                      for _ in range(rng.randint(1, 3))]
+        paths.append("/" + "/".join(component for component in components if component != "."))
+    return paths
+
+
+def random_queries(rng: random.Random, paths, count: int):
+    queries = []
+    for _ in range(count):
+        if rng.random() < 0.3:
+            path = rng.choice(paths).lower() # Substring (or the whole path: exact)
+            start = rng.randrange(len(path))
+            queries.append(path[start:rng.randint(start + 1, len(path))])
+        else:
+            queries.append("".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 5))).lower())
+    return queries
+
+
+def reference_scores(query: str, store: PathStore, ids=None):
+    """id -> score of every live entry scoring above zero, by the reference scorer."""
+    ids = store.ids() if ids is None else (i for i in ids if store.is_alive(i))
+    scores = {i: search.fuzzy_match_score(query, store.lower_str(i)) for i in ids}
+    return {i: score for i, score in scores.items() if score > 0}
+
+
+def ranked(scores, limit: int):
+    return sorted(((score, i) for i, score in scores.items()), key=lambda item: (-item[0], item[1]))[:limit]
+
+
+def make_store(rng: random.Random, count: int) -> PathStore:
+    paths = ADVERSARIAL_PATHS + random_paths(rng, count)
+    paths += rng.sample(paths, 20) # Duplicates
+    return PathStore(paths)
+
+
+@pytest.fixture(params=[batch_scorer.CHUNK_SIZE, 64], ids=["one-chunk", "small-chunks"])
+def chunk_size(request, monkeypatch):
+    monkeypatch.setattr(batch_scorer, "CHUNK_SIZE", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_scores_match_reference(seed, chunk_size):
+    rng = random.Random(seed)
+    store = make_store(rng, 300)
+    for path in rng.sample(ADVERSARIAL_PATHS, 3):
+        store.remove(path)
+    for query in ADVERSARIAL_QUERIES + random_queries(rng, ADVERSARIAL_PATHS, 60):
+        query = query.lower()
+        expected = reference_scores(query, store)
+        survivors = []
+        results = batch_scorer.score_store(query, store, None, survivors)
+        assert dict((i, score) for score, i in results) == expected, query
+        assert sorted(survivors) == sorted(expected), query
+        for limit in (1, 3, 10, 1000):
+            assert batch_scorer.score_store(query, store, limit) == ranked(expected, limit), (query, limit)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_views_match_reference(seed, chunk_size):
+    rng = random.Random(100 + seed)
+    store = make_store(rng, 200)
+    for fraction in (0.1, 0.9):
+        ids = rng.sample(range(store.next_id), int(store.next_id * fraction))
+        view = store.view(ids)
+        for query in random_queries(rng, ADVERSARIAL_PATHS, 30):
+            expected = reference_scores(query, store, ids)
+            assert batch_scorer.score_store(query, view, 10) == ranked(expected, 10), query
+
+
+def test_appends_are_encoded(chunk_size):
+    rng = random.Random(7)
+    store = PathStore(random_paths(rng, 50))
+    batch_scorer.score_store("ab", store, 10)
+    store.extend(ADVERSARIAL_PATHS)
+    for query in ADVERSARIAL_QUERIES:
+        assert batch_scorer.score_store(query, store, 10) == ranked(reference_scores(query, store), 10), query
+
+
+def test_concurrent_refreshes_keep_every_entry_once(monkeypatch):
+    # The app scores new entries on the event loop while a worker searches the same store.
+    monkeypatch.setattr(batch_scorer, "CHUNK_SIZE", 16)
+    rng = random.Random(300)
+    store = PathStore(random_paths(rng, 100))
+    for _ in range(10):
+        store.extend(random_paths(rng, 150))
+        expected = ranked(reference_scores("ab", store), 1000)
+        barrier = threading.Barrier(8)
+        results = []
+
+        def search():
+            barrier.wait()
+            results.append(batch_scorer.score_store("ab", store, 1000))
+
+        threads = [threading.Thread(target=search) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [expected] * 8
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_fuzzy_search_ranking_is_identical(seed, monkeypatch):
+    rng = random.Random(200 + seed)
+    paths = ADVERSARIAL_PATHS + random_paths(rng, 300)
+    store = PathStore(paths)
+    path_objects = [Path(path) for path in paths]
+    for query in ADVERSARIAL_QUERIES + random_queries(rng, paths, 40):
+        monkeypatch.setattr(search, "USE_BATCH_SCORER", True)
+        batch = search.fuzzy_search(query, store, limit=15, with_scores=True)
+        monkeypatch.setattr(search, "USE_BATCH_SCORER", False)
+        python = search.fuzzy_search(query, store, limit=15, with_scores=True)
+        listed = search.fuzzy_search(query, path_objects, limit=15, with_scores=True)
+        assert batch == python == listed, query
+
+
+def test_ties_keep_insertion_order():
+    paths = [f"/dir/file{i}" for i in range(10)] + ["/dir/other"]
+    store = PathStore(paths)
+    results = batch_scorer.score_store("file", store, 5)
+    assert [i for _, i in results] == [0, 1, 2, 3, 4]
+    assert len({score for score, _ in results}) == 1
+    assert search.fuzzy_search("file", store, limit=3) == [Path(p) for p in paths[:3]]
+
+
+def test_empty_query_matches_nothing():
+    store = PathStore(ADVERSARIAL_PATHS)
+    assert search.fuzzy_search("", store) == []
+    assert search.fuzzy_search("", [Path(path) for path in ADVERSARIAL_PATHS]) == []
@@ -0,0 +1,158 @@
+# textual_file_search/tests/test_chat.py
+"""Streaming chat replies, stopping them and errors, against the local fake backend."""
+import asyncio
+
+import pytest
+
+from textual.app import App
+from textual.widgets import Input, Markdown
+
+from screens.chat_screen import ChatScreen
+from services.fake_gemini import DEFAULT_REPLY, FakeBackend
+from services.gemini_api import GeminiAPI
+
+
+def fast_backend(**options) -> FakeBackend:
+    options.setdefault("latency", 0.0)
+    options.setdefault("chunk_delay", 0.0)
+    return FakeBackend(**options)
+
+
+def reply_to(message: str, turn: int = 1) -> str:
+    return DEFAULT_REPLY.format(message=message, turn=turn)
+
+
+def test_stream_message_yields_chunks_and_records_history():
+    api = GeminiAPI(fast_backend(), use_cache=False)
+
+    async def chat():
+        first = [chunk async for chunk in api.stream_message("hello")]
+        second = await api.send_message("again")
+        return first, second
+
+    chunks, second = asyncio.run(chat())
+    assert len(chunks) > 1
+    assert "".join(chunks) == reply_to("hello")
+    assert second == reply_to("again", turn=2)
+    assert api.history == [
+        ("user", "hello"), ("model", reply_to("hello")), ("user", "again"), ("model", second)
+    ]
+
+
+def test_stopped_stream_is_not_added_to_history():
+    api = GeminiAPI(fast_backend(), use_cache=False)
+
+    async def stop_early():
+        stream = api.stream_message("hello")
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(stop_early())
+    assert api.history == []
+
+
+def test_cancelled_stream_is_not_added_to_history():
+    api = GeminiAPI(fast_backend(chunk_delay=0.05), use_cache=False)
+    received = []
+
+    async def consume():
+        async for chunk in api.stream_message("hello"):
+            received.append(chunk)
+
+    async def cancel_midway():
+        task = asyncio.ensure_future(consume())
+        while not received:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_midway())
+    assert 0 < len(received) < len(FakeBackend()._chunks(reply_to("hello")))
+    assert api.history == []
+
+
+def test_stream_errors_reach_the_caller():
+    api = GeminiAPI(fast_backend(fail_after=2), use_cache=False)
+
+    async def chat():
+        received = []
+        with pytest.raises(ConnectionError):
+            async for chunk in api.stream_message("hello"):
+                received.append(chunk)
+        return received, await api.send_message("hello")
+
+    received, reply = asyncio.run(chat())
+    assert len(received) == 2
+    assert reply.startswith("Error: Could not get response from Gemini API.")
+    assert api.history == []
+
+
+class ChatApp(App):
+    def __init__(self, backend: FakeBackend) -> None:
+        super().__init__()
+        self.backend = backend
+
+    def on_mount(self) -> None:
+        self.push_screen(ChatScreen(api_factory=lambda: GeminiAPI(self.backend, use_cache=False)))
+
+
+async def _submit(pilot, message: str) -> ChatScreen:
+    screen = pilot.app.screen
+    await pilot.pause()
+    screen.query_one("#chat-input", Input).value = message
+    await pilot.press("enter")
+    return screen
+
+
+def _ai_messages(screen: ChatScreen):
+    return [widget.source for widget in screen.query(Markdown) if widget.has_class("ai-message")]
+
+
+def test_chat_screen_streams_the_reply():
+    async def run():
+        async with ChatApp(fast_backend(chunk_delay=0.01)).run_test() as pilot:
+            screen = await _submit(pilot, "hello")
+            while screen._reply_worker is not None:
+                await pilot.pause(0.05)
+            await pilot.pause()
+            return _ai_messages(screen), screen.chat_input.disabled, screen.chat_history
+
+    messages, disabled, history = asyncio.run(run())
+    assert messages == [reply_to("hello")]
+    assert not disabled
+    assert history == [("user", "hello"), ("ai", reply_to("hello"))]
+
+
+def test_chat_screen_stops_the_reply():
+    async def run():
+        async with ChatApp(fast_backend(chunk_delay=0.2)).run_test() as pilot:
+            screen = await _submit(pilot, "hello")
+            while not any(_ai_messages(screen)): # Wait for the first chunk
+                await pilot.pause(0.05)
+            await pilot.press("escape")
+            while screen._reply_worker is not None:
+                await pilot.pause(0.05)
+            await pilot.pause()
+            return _ai_messages(screen), screen.chat_input.disabled, screen.gemini_api.history
+
+    messages, disabled, history = asyncio.run(run())
+    assert messages[0].endswith("*Stopped.*")
+    assert messages[0] != "*Stopped.*" # The chunks received so far are kept
+    assert not disabled
+    assert history == []
+
+
+def test_chat_screen_shows_errors():
+    async def run():
+        async with ChatApp(fast_backend(fail_after=1)).run_test() as pilot:
+            screen = await _submit(pilot, "hello")
+            while screen._reply_worker is not None:
+                await pilot.pause(0.05)
+            await pilot.pause()
+            return _ai_messages(screen), screen.chat_input.disabled
+
+    messages, disabled = asyncio.run(run())
+    assert "**Error:** Failed to get AI response: fake stream interrupted" in messages[0]
+    assert not disabled
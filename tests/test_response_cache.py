@@ -0,0 +1,111 @@
+# textual_file_search/tests/test_response_cache.py
+"""The on-disk reply cache (TTL, LRU eviction) and request coalescing in `CachingBackend`."""
+import asyncio
+import time
+
+from services.fake_gemini import FakeBackend
+from services.response_cache import CachingBackend, ResponseCache, cache_key
+
+
+def collect(backend, history, message):
+    async def run():
+        return "".join([chunk async for chunk in backend.stream(history, message)])
+    return run()
+
+
+def test_cache_hit_skips_the_backend(tmp_path):
+    fake = FakeBackend(latency=0.0, chunk_delay=0.0)
+    backend = CachingBackend(fake, ResponseCache(tmp_path / "cache.sqlite"))
+
+    first = asyncio.run(collect(backend, [], "hello world"))
+    second = asyncio.run(collect(backend, [], "  hello \n world ")) # Same after normalizing whitespace
+    other = asyncio.run(collect(backend, [("user", "hi"), ("model", "hey")], "hello world"))
+
+    assert second == first
+    assert other != first
+    assert fake.calls == 2
+    stats = backend.stats()
+    assert (stats["hits"], stats["misses"], stats["cached_entries"]) == (1, 2, 2)
+
+
+def test_cache_persists_on_disk(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = ResponseCache(path)
+    cache.put(cache_key("model", [], "question"), "model", "answer")
+    cache.close()
+    assert ResponseCache(path).get(cache_key("model", [], "question")) == "answer"
+    assert ResponseCache(path).get(cache_key("other model", [], "question")) is None
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", ttl=0.1)
+    cache.put("key", "model", "answer")
+    assert cache.get("key") == "answer"
+    time.sleep(0.15)
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_entries=2)
+    cache.put("a", "model", "A")
+    time.sleep(0.01)
+    cache.put("b", "model", "B")
+    time.sleep(0.01)
+    assert cache.get("a") == "A" # Now more recently used than "b"
+    time.sleep(0.01)
+    cache.put("c", "model", "C")
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+
+
+def test_identical_in_flight_requests_are_coalesced(tmp_path):
+    fake = FakeBackend(latency=0.05, chunk_delay=0.01)
+    backend = CachingBackend(fake, ResponseCache(tmp_path / "cache.sqlite"))
+
+    async def run():
+        return await asyncio.gather(*(collect(backend, [], "hello") for _ in range(3)))
+
+    replies = asyncio.run(run())
+    assert len(set(replies)) == 1
+    assert fake.calls == 1
+    stats = backend.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 2, 0)
+    assert asyncio.run(collect(backend, [], "hello")) == replies[0] # Stored once complete
+    assert fake.calls == 1
+
+
+def test_coalesced_request_survives_the_first_being_cancelled(tmp_path):
+    fake = FakeBackend(latency=0.05, chunk_delay=0.01)
+    backend = CachingBackend(fake, ResponseCache(tmp_path / "cache.sqlite"))
+
+    async def run():
+        first = asyncio.ensure_future(collect(backend, [], "hello"))
+        second = asyncio.ensure_future(collect(backend, [], "hello"))
+        await asyncio.sleep(0.07) # Both are following the stream
+        first.cancel()
+        return await second, first.cancelled()
+
+    reply, cancelled = asyncio.run(run())
+    assert cancelled
+    assert reply == FakeBackend().reply([], "hello")
+    assert fake.calls == 1
+
+
+def test_abandoned_requests_stop_the_backend_and_are_not_cached(tmp_path):
+    fake = FakeBackend(latency=0.0, chunk_delay=0.05)
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    backend = CachingBackend(fake, cache)
+
+    async def stop_early():
+        stream = backend.stream([], "hello")
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.1)
+        return await collect(backend, [], "hello")
+
+    reply = asyncio.run(stop_early())
+    assert reply == FakeBackend().reply([], "hello")
+    assert fake.calls == 2 # The abandoned flight was not joined
+    assert len(cache) == 1
@@ -0,0 +1,51 @@
+# textual_file_search/tests/test_search_daemon.py
+"""`DaemonClient` against a stand-in daemon that answers some queries too late."""
+import json
+import socketserver
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from search_daemon import DaemonClient, DaemonTimeout
+
+
+class _SlowHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            query = json.loads(line)["query"]
+            if query == "slow":
+                time.sleep(0.5)
+            try:
+                self.wfile.write(json.dumps({"ok": True, "results": [[1.0, "/" + query]]}).encode() + b"\n")
+            except BrokenPipeError:
+                return
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    path = tmp_path / "daemon.sock"
+    server = socketserver.ThreadingUnixStreamServer(str(path), _SlowHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def test_timeout_is_reported_and_the_client_stays_usable(socket_path):
+    with DaemonClient(socket_path, timeout=0.2) as client:
+        assert client.search("fast") == [Path("/fast")]
+        with pytest.raises(DaemonTimeout):
+            client.search("slow")
+        # The late answer to "slow" must not be taken for this one.
+        assert client.search("after") == [Path("/after")]
+        time.sleep(0.5)
+        assert client.search("later") == [Path("/later")]
+
+
+def test_a_missing_daemon_is_not_a_timeout(tmp_path):
+    with pytest.raises(OSError):
+        DaemonClient(tmp_path / "nobody.sock", timeout=0.2)
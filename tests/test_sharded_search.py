@@ -0,0 +1,47 @@
+# textual_file_search/tests/test_sharded_search.py
+"""The sharded engine against the in-process search, including a worker dying."""
+import random
+
+import pytest
+
+from path_store import PathStore
+from search import fuzzy_search
+from sharded_search import ShardedSearchEngine
+
+QUERIES = ["ab", "src", "ma", "zz", "fi1"]
+
+
+@pytest.fixture(scope="module")
+def store():
+    rng = random.Random(5)
+    words = ["src", "main", "lib", "file", "data", "abc", "test"]
+    return PathStore(
+        "/h/" + "/".join(rng.choice(words) + str(rng.randrange(20)) for _ in range(rng.randint(1, 4)))
+        for _ in range(3000)
+    )
+
+
+@pytest.fixture
+def engine(store):
+    with ShardedSearchEngine(store, workers=2) as engine:
+        yield engine
+
+
+def test_matches_the_in_process_search(store, engine):
+    for query in QUERIES:
+        assert engine.search(query, limit=15) == fuzzy_search(query, store, limit=15), query
+
+
+def test_a_killed_worker_is_replaced(store, engine, capsys):
+    engine.search("ab")
+    killed = engine._processes[0]
+    killed.kill()
+    killed.join()
+
+    # Answered in-process, then by a fresh pool.
+    for query in QUERIES:
+        assert engine.search(query, limit=15) == fuzzy_search(query, store, limit=15), query
+    assert engine.restarts == 1
+    assert killed not in engine._processes
+    assert all(process.is_alive() for process in engine._processes)
+    assert "restarting the worker pool" in capsys.readouterr().out
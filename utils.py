@@ -1,30 +1,76 @@
 # textual_file_search/utils.py
+import asyncio
 import os
 import sys
+import tempfile
 from pathlib import Path
 import subprocess
+from contextlib import contextmanager
 
-def open_file_or_directory(path: Path):
+from instrumentation import timed
+
+@contextmanager
+def real_stderr():
+    """
+    Textual swaps `sys.stderr` for a capture object without a usable file
+    descriptor, which makes `multiprocessing` fail to start its resource
+    tracker. Start processes with the real stderr restored.
+    """
+    captured = sys.stderr
+    if sys.__stderr__ is not None:
+        sys.stderr = sys.__stderr__
+    try:
+        yield
+    finally:
+        sys.stderr = captured
+
+# Seconds to wait for the opener's exit status. An opener still running after
+# that (some xdg-open handlers exec the application itself) is left running.
+LAUNCH_TIMEOUT = 3.0
+
+class LaunchError(Exception):
+    """Raised when a file or directory could not be opened."""
+
+@timed("open")
+def launch_path(path: Path, timeout: float = LAUNCH_TIMEOUT) -> None:
     """
     Opens a file or directory using the default system application.
-    Uses platform-specific commands.
+    Uses platform-specific commands. The opener runs detached (in its own
+    session, output discarded), so it outlives this process; this returns
+    once it has exited or after `timeout` seconds. Raises `LaunchError`.
     """
     if not path.exists():
-        print(f"Error: Path does not exist: {path}")
-        return
+        raise LaunchError(f"Path does not exist: {path}")
 
-    try:
-        if sys.platform == "win32":
+    if sys.platform == "win32":
+        try:
             os.startfile(str(path))
-        elif sys.platform == "darwin":  # macOS
-            subprocess.run(["open", str(path)], check=True)
-        else:  # Linux and other Unix-like systems
-            subprocess.run(["xdg-open", str(path)], check=True)
-    except FileNotFoundError:
-        print(f"Error: Could not find a suitable command to open {path}. "
-              "Ensure 'xdg-open' (Linux), 'open' (macOS), or 'start' (Windows) is available.")
-    except subprocess.CalledProcessError as e:
-        print(f"Error opening {path}: Command failed with error code {e.returncode}")
-        print(e.stderr.decode() if e.stderr else "No stderr output.")
-    except Exception as e:
-        print(f"An unexpected error occurred while opening {path}: {e}")
\ No newline at end of file
+        except OSError as e:
+            raise LaunchError(f"Could not open {path}: {e}") from e
+        return
+
+    command = ["open" if sys.platform == "darwin" else "xdg-open", str(path)]
+    # A file rather than a pipe: an opener that keeps running must not block
+    # (or get SIGPIPE) writing to stderr once nobody reads it.
+    with tempfile.TemporaryFile() as stderr:
+        try:
+            process = subprocess.Popen(
+                command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=stderr,
+                start_new_session=True,
+            )
+        except OSError as e:
+            raise LaunchError(f"Could not find a suitable command to open {path}. "
+                              "Ensure 'xdg-open' (Linux), 'open' (macOS), or 'start' (Windows) is available.") from e
+        try:
+            returncode = process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            return # Still running, presumably the application itself
+        if returncode != 0:
+            stderr.seek(0)
+            output = stderr.read().decode(errors="replace").strip()
+            raise LaunchError(f"Error opening {path}: Command failed with error code {returncode}"
+                              + (f": {output}" if output else ""))
+
+async def launch_path_async(path: Path, timeout: float = LAUNCH_TIMEOUT) -> None:
+    """`launch_path` in a thread, so waiting for the opener never blocks the event loop."""
+    await asyncio.to_thread(launch_path, path, timeout)
@@ -0,0 +1,416 @@
+# textual_file_search/watcher.py
+"""
+Live maintenance of the in-memory index.
+
+A watcher runs in a background thread and reports batches of `IndexEvent`s
+(created / deleted paths) to a callback. Three backends are available:
+
+- `InotifyWatcher`: Linux inotify through ctypes, one watch per indexed
+  directory. When `fs.inotify.max_user_watches` is exhausted, the directories
+  that could not be watched are polled for mtime changes instead.
+- `WatchdogWatcher`: the optional `watchdog` package, for other platforms.
+- `PollingWatcher`: pure mtime polling, works everywhere.
+
+All backends apply the same exclusion rules as the walker in `search.py`,
+plus the root's `IndexFilter` (exclude globs, .gitignore and .ignore files).
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from index_rules import IndexFilter, IndexRoot
+from path_store import PathStore
+from search import ScanFunction, is_excluded_name, walk_directory_tree
+
+CREATED = "created"
+DELETED = "deleted"
+RESCAN = "rescan" # Events were lost; the whole index must be rebuilt
+
+class IndexEvent(NamedTuple):
+    kind: str # CREATED, DELETED or RESCAN
+    path: str
+    is_dir: bool = False
+
+EventCallback = Callable[[List[IndexEvent]], None]
+
+
+def apply_index_events(store: PathStore, events: List[IndexEvent]) -> None:
+    """
+    Applies `events` to `store` in place. Deleting a directory drops its whole
+    subtree. Applying the same events twice is harmless, so backends may
+    report a path more than once.
+    """
+    removed_dirs = [event.path for event in events if event.kind == DELETED and event.is_dir]
+    removed_prefixes = tuple(directory + os.sep for directory in removed_dirs)
+    for event in events:
+        if event.kind in (CREATED, DELETED):
+            store.remove(event.path)
+    store.remove_trees(removed_dirs) # One pass for the whole batch
+    for event in events:
+        # Skip creations inside a directory that was deleted afterwards.
+        if event.kind == CREATED and not (removed_prefixes and event.path.startswith(removed_prefixes)):
+            store.add(event.path)
+
+
+class _DirectoryPoller:
+    """
+    Tracks the mtime and children of a set of directories and reports the
+    differences whenever a directory's mtime changes. `scan` lists a directory.
+    """
+    def __init__(self, emit: Callable[[str, str, bool], None], scan: ScanFunction) -> None:
+        self._emit = emit
+        self._scan = scan
+        self._dirs: Dict[str, Tuple[int, Set[str], Set[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._dirs)
+
+    def add(self, directory: str) -> Tuple[List[str], List[str]]:
+        mtime_ns = os.stat(directory).st_mtime_ns
+        subdirs, leaves = self._scan(directory)
+        self._dirs[directory] = (mtime_ns, set(subdirs), set(leaves))
+        return subdirs, leaves
+
+    def remove_tree(self, directory: str) -> None:
+        prefix = directory + os.sep
+        for polled in [d for d in self._dirs if d == directory or d.startswith(prefix)]:
+            del self._dirs[polled]
+
+    def poll(self) -> List[str]:
+        """
+        Checks every directory once. Returns the newly created subdirectories,
+        which the caller is expected to start tracking.
+        """
+        new_dirs: List[str] = []
+        for directory, (mtime_ns, old_subdirs, old_leaves) in list(self._dirs.items()):
+            try:
+                current_mtime_ns = os.stat(directory).st_mtime_ns
+                if current_mtime_ns == mtime_ns:
+                    continue
+                subdirs, leaves = self._scan(directory)
+            except OSError:
+                # Gone; its parent reports the deletion.
+                self._dirs.pop(directory, None)
+                continue
+
+            new_subdirs, new_leaves = set(subdirs), set(leaves)
+            for name in old_subdirs - new_subdirs:
+                self._emit(DELETED, os.path.join(directory, name), True)
+                self.remove_tree(os.path.join(directory, name))
+            for name in old_leaves - new_leaves:
+                self._emit(DELETED, os.path.join(directory, name), False)
+            for name in new_leaves - old_leaves:
+                self._emit(CREATED, os.path.join(directory, name), False)
+            for name in new_subdirs - old_subdirs:
+                new_dirs.append(os.path.join(directory, name))
+            self._dirs[directory] = (current_mtime_ns, new_subdirs, new_leaves)
+        return new_dirs
+
+
+class BaseWatcher(threading.Thread):
+    """
+    Common plumbing for the watcher backends: event coalescing, debounced
+    delivery to the callback and registration of newly created subtrees.
+    `index_filter` defaults to the built-in rules plus the ignore files below
+    `root`.
+    """
+    backend_name = "base"
+
+    def __init__(
+        self,
+        root: str,
+        callback: EventCallback,
+        debounce: float = 0.25,
+        poll_interval: float = 5.0,
+        index_filter: Optional[IndexFilter] = None,
+    ) -> None:
+        super().__init__(name=f"{self.backend_name}-watcher", daemon=True)
+        self.root = root
+        self.index_filter = index_filter if index_filter is not None else IndexFilter(IndexRoot(root))
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, IndexEvent] = {}
+        self._pending_since = 0.0
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def emit(self, kind: str, path: str, is_dir: bool = False) -> None:
+        """Queues an event. Later events for the same path replace earlier ones."""
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.pop(path, None)
+            self._pending[path] = IndexEvent(kind, path, is_dir)
+
+    def flush(self, force: bool = False) -> None:
+        """Delivers the queued events once they are `debounce` seconds old."""
+        with self._lock:
+            if not self._pending:
+                return
+            if not force and time.monotonic() - self._pending_since < self.debounce:
+                return
+            events = list(self._pending.values())
+            self._pending.clear()
+        self.callback(events)
+
+    def _register(self, directory: str) -> Tuple[List[str], List[str]]:
+        """
+        Starts tracking `directory` and returns its listing. Backends that need
+        per-directory setup (inotify watches, polling) override this.
+        """
+        return self.index_filter.scan(directory)
+
+    def _add_tree(self, directory: str) -> None:
+        """Registers a newly created directory and reports everything inside it."""
+        self.emit(CREATED, directory, True)
+        for parent, subdirs, leaves in walk_directory_tree(directory, 1, scan=self._register):
+            for name in subdirs:
+                self.emit(CREATED, os.path.join(parent, name), True)
+            for name in leaves:
+                self.emit(CREATED, os.path.join(parent, name), False)
+
+
+class PollingWatcher(BaseWatcher):
+    """Detects changes by re-checking every directory's mtime periodically."""
+    backend_name = "polling"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._poller = _DirectoryPoller(self.emit, self.index_filter.scan)
+
+    def _register(self, directory: str) -> Tuple[List[str], List[str]]:
+        return self._poller.add(directory)
+
+    def run(self) -> None:
+        for _ in walk_directory_tree(self.root, scan=self._register):
+            if self._stop_event.is_set():
+                return
+        while not self._stop_event.wait(self.poll_interval):
+            for directory in self._poller.poll():
+                self._add_tree(directory)
+            self.flush(force=True)
+
+
+# inotify constants from <sys/inotify.h>
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+_WATCH_MASK = (
+    IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO |
+    IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+)
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc() -> ctypes.CDLL:
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        raise OSError("inotify is not available in this C library")
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+def _max_user_watches() -> Optional[int]:
+    try:
+        with open("/proc/sys/fs/inotify/max_user_watches") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+class InotifyWatcher(BaseWatcher):
+    """
+    Watches every indexed directory with inotify. Once the kernel refuses new
+    watches (ENOSPC), remaining directories are polled instead.
+    """
+    backend_name = "inotify"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._libc = _load_libc()
+        self._fd = -1
+        self._watches: Dict[int, str] = {}
+        self._poller = _DirectoryPoller(self.emit, self.index_filter.scan)
+        self.watch_limit_reached = False
+
+    def _register(self, directory: str) -> Tuple[List[str], List[str]]:
+        if not self.watch_limit_reached:
+            # Watch before listing, so nothing created in between is missed.
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = directory
+                return self.index_filter.scan(directory)
+            err = ctypes.get_errno()
+            if err != errno.ENOSPC:
+                raise OSError(err, os.strerror(err), directory)
+            self.watch_limit_reached = True
+            print(f"Warning: inotify watch limit ({_max_user_watches()}) reached; "
+                  f"falling back to polling for the remaining directories.")
+        return self._poller.add(directory)
+
+    def _forget_tree(self, directory: str) -> None:
+        prefix = directory + os.sep
+        for wd, watched in list(self._watches.items()):
+            if watched == directory or watched.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd) # EINVAL if already gone; harmless
+                self._watches.pop(wd, None)
+        self._poller.remove_tree(directory)
+
+    def _read_events(self) -> None:
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.emit(RESCAN, self.root, True)
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            directory = self._watches.get(wd)
+            if directory is None or not name or is_excluded_name(name):
+                continue
+            path = os.path.join(directory, name)
+            is_dir = bool(mask & IN_ISDIR)
+            if self.index_filter.is_excluded(directory, name, is_dir):
+                continue
+
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                if is_dir:
+                    self._add_tree(path)
+                else:
+                    self.emit(CREATED, path, False)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self.emit(DELETED, path, is_dir)
+                if is_dir:
+                    self._forget_tree(path)
+
+    def run(self) -> None:
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            print(f"Error: inotify_init1 failed: {os.strerror(err)}")
+            return
+
+        try:
+            for _ in walk_directory_tree(self.root, scan=self._register):
+                if self._stop_event.is_set():
+                    return
+
+            next_poll = time.monotonic() + self.poll_interval
+            while not self._stop_event.is_set():
+                ready, _, _ = select.select([self._fd], [], [], self.debounce)
+                if ready:
+                    self._read_events()
+                if len(self._poller) and time.monotonic() >= next_poll:
+                    for directory in self._poller.poll():
+                        self._add_tree(directory)
+                    next_poll = time.monotonic() + self.poll_interval
+                self.flush()
+            self.flush(force=True)
+        finally:
+            os.close(self._fd)
+
+
+def watchdog_available() -> bool:
+    try:
+        import watchdog.observers # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class WatchdogWatcher(BaseWatcher):
+    """
+    Uses the optional `watchdog` package. Watchdog watches the whole tree
+    recursively, so excluded paths are filtered out when events arrive.
+    """
+    backend_name = "watchdog"
+
+    def _on_change(self, kind: str, path, is_dir: bool) -> None:
+        path = os.fsdecode(path)
+        if not self.index_filter.is_indexed(path, is_dir):
+            return
+        if kind == CREATED and is_dir:
+            self._add_tree(path)
+        else:
+            self.emit(kind, path, is_dir)
+
+    def run(self) -> None:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_created(self, event):
+                watcher._on_change(CREATED, event.src_path, event.is_directory)
+
+            def on_deleted(self, event):
+                watcher._on_change(DELETED, event.src_path, event.is_directory)
+
+            def on_moved(self, event):
+                watcher._on_change(DELETED, event.src_path, event.is_directory)
+                watcher._on_change(CREATED, event.dest_path, event.is_directory)
+
+        observer = Observer()
+        observer.schedule(_Handler(), self.root, recursive=True)
+        observer.start()
+        try:
+            while not self._stop_event.wait(self.debounce):
+                self.flush()
+            self.flush(force=True)
+        finally:
+            observer.stop()
+            observer.join()
+
+
+def create_watcher(root: str, callback: EventCallback, backend: str = "auto", **kwargs) -> BaseWatcher:
+    """
+    Creates (but does not start) a watcher for `root`.
+
+    `backend` is "auto", "inotify", "watchdog" or "polling". "auto" prefers
+    inotify on Linux, then watchdog if it is installed, then polling.
+    """
+    if backend in ("auto", "inotify") and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, callback, **kwargs)
+        except OSError:
+            if backend == "inotify":
+                raise
+    if backend in ("auto", "watchdog") and watchdog_available():
+        return WatchdogWatcher(root, callback, **kwargs)
+    return PollingWatcher(root, callback, **kwargs)
@@ -1,9 +1,41 @@
 # textual_file_search/widgets.py
 
-from textual.widgets import Input, ListView, ListItem, Label
+from textual.widgets import Input, ListView, ListItem, Label, Static
+from textual.binding import Binding
+from textual.geometry import Region, Size
+from textual.reactive import reactive
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from rich.segment import Segment
+from rich.table import Table
+from rich.text import Text
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 from textual.message import Message
+import os
+
+from preview import Preview, BINARY, DIRECTORY, ERROR
+
+@lru_cache(maxsize=8192)
+def display_path(path: Path, home_dir: Path) -> str:
+    """
+    The string shown for a result: relative to the home directory (with a
+    '~/' prefix) if it is inside it, otherwise the full absolute path.
+    Cached, since the same paths come back keystroke after keystroke.
+    """
+    text, home = str(path), str(home_dir)
+    if text == home:
+        return "~/."
+    if text.startswith(home.rstrip(os.sep) + os.sep):
+        return "~/" + text[len(home.rstrip(os.sep)) + 1:]
+    return text
+
+def result_labels(paths: List[Path], home_dir: Path, details: Optional[List[str]] = None) -> List[str]:
+    """Row texts for `paths`, each followed by its detail (e.g. a line preview) if given."""
+    if details is None:
+        return [display_path(path, home_dir) for path in paths]
+    return [f"{display_path(path, home_dir)}  {detail}" for path, detail in zip(paths, details)]
 
 class SearchInput(Input):
     """
@@ -24,36 +56,58 @@ class SearchResultsList(ListView):
             super().__init__()
             self.path = path
 
+    class ResultHighlighted(Message):
+        """
+        A message sent when the cursor moves to another result (`path` is
+        None when no result is highlighted).
+        """
+        def __init__(self, path: Optional[Path]) -> None:
+            super().__init__()
+            self.path = path
+
     def __init__(self, id: Optional[str] = None) -> None:
         super().__init__(id=id)
         self._current_paths: List[Path] = []
+        self._labels: List[str] = []
+        # Rows currently shown, in order. Tracked here because `remove()`
+        # only takes effect later, so `children` may still hold removed rows.
+        self._rows: List[ListItem] = []
         self.home_dir = Path.home() # Cache home directory for efficiency
 
-    def update_results(self, paths: List[Path]) -> None:
+    def update_results(self, paths: List[Path], details: Optional[List[str]] = None) -> None:
         """
-        Updates the list with new search results.
+        Updates the list with new search results. Existing rows are reused
+        (only their text changes); rows are mounted or removed only when the
+        number of results changes. `details` adds a text per row, such as a
+        matching line. If the new results only append to the current ones
+        (streamed results), the selection is kept.
         """
-        # Clear existing items
-        for child in list(self.children):
-            child.remove()
-        
+        rows = self._rows
+        previous_labels = self._labels
+        labels = result_labels(paths, self.home_dir, details)
+        appended = bool(previous_labels) and labels[:len(previous_labels)] == previous_labels
         self._current_paths = paths
-        
-        # Add new items, displaying paths relative to home directory
-        for path in paths:
-            display_str = str(path)
-            try:
-                # If the path is relative to home_dir, display it as such.
-                # Prepend '~/' to indicate it's within the home directory.
-                display_str = f"~/{path.relative_to(self.home_dir)}"
-            except ValueError:
-                # If the path is not within the home directory (e.g., /usr/bin/python),
-                # display its full absolute path.
-                pass 
-            self.append(ListItem(Label(display_str)))
+        self._labels = labels
+
+        # Relabel the rows that stay, skipping those already showing the right text
+        for position, (row, label) in enumerate(zip(rows, labels)):
+            if position < len(previous_labels) and previous_labels[position] == label:
+                continue
+            row.query_one(Label).update(label)
+
+        if len(labels) > len(rows):
+            new_rows = [ListItem(Label(label)) for label in labels[len(rows):]]
+            rows.extend(new_rows)
+            self.extend(new_rows)
+        else:
+            for row in rows[len(labels):]:
+                row.remove()
+            del rows[len(labels):]
             
         # Select the first item if there are results, otherwise clear selection
-        if self._current_paths:
+        if appended and self.index is not None:
+            pass # Streaming more results; leave the cursor where the user put it
+        elif self._current_paths:
             self.index = 0
         else:
             self.index = None # No item selected
@@ -65,4 +119,157 @@ class SearchResultsList(ListView):
         """
         if self.index is not None and 0 <= self.index < len(self._current_paths):
             selected_path = self._current_paths[self.index]
-            self.post_message(self.ResultSelected(selected_path))
\ No newline at end of file
+            self.post_message(self.ResultSelected(selected_path))
+
+    def on_list_view_highlighted(self, event: ListView.Highlighted) -> None:
+        event.stop()
+        path = None
+        if self.index is not None and 0 <= self.index < len(self._current_paths):
+            path = self._current_paths[self.index]
+        self.post_message(self.ResultHighlighted(path))
+
+
+class VirtualSearchResultsList(ScrollView, can_focus=True):
+    """
+    A drop-in alternative to `SearchResultsList` for long result lists.
+    Rows are not widgets: only the lines currently on screen are rendered,
+    so thousands of ranked results scroll as cheaply as ten.
+    """
+    BINDINGS = [
+        Binding("enter", "select_cursor", "Select", show=False),
+        Binding("up", "cursor_up", "Cursor up", show=False),
+        Binding("down", "cursor_down", "Cursor down", show=False),
+        Binding("pageup", "page_up", "Page up", show=False),
+        Binding("pagedown", "page_down", "Page down", show=False),
+        Binding("home", "first", "First", show=False),
+        Binding("end", "last", "Last", show=False),
+    ]
+
+    COMPONENT_CLASSES = {"virtual-results--cursor"}
+
+    # Same message (and handler name) as the widget-based list
+    ResultSelected = SearchResultsList.ResultSelected
+    ResultHighlighted = SearchResultsList.ResultHighlighted
+
+    index: reactive[Optional[int]] = reactive(None)
+
+    def __init__(self, id: Optional[str] = None) -> None:
+        super().__init__(id=id)
+        self._current_paths: List[Path] = []
+        self._details: Optional[List[str]] = None
+        self.home_dir = Path.home() # Cache home directory for efficiency
+
+    def update_results(self, paths: List[Path], details: Optional[List[str]] = None) -> None:
+        """
+        Updates the list with new search results (see
+        `SearchResultsList.update_results`).
+        """
+        previous_paths, previous_details = self._current_paths, self._details
+        appended = (
+            bool(previous_paths) and paths[:len(previous_paths)] == previous_paths and
+            (details or [])[:len(previous_paths)] == (previous_details or [])
+        )
+        self._current_paths = paths
+        self._details = details
+        self.virtual_size = Size(0, len(paths)) # Long paths are cropped, never scrolled
+        if not (appended and self.index is not None):
+            self.index = 0 if paths else None
+            self.scroll_to(y=0, animate=False)
+        self.refresh()
+
+    def render_line(self, y: int) -> Strip:
+        row = self.scroll_offset.y + y
+        width = self.scrollable_content_region.width
+        if row >= len(self._current_paths):
+            return Strip.blank(width, self.rich_style)
+        style = self.rich_style
+        if row == self.index:
+            style = self.get_component_rich_style("virtual-results--cursor")
+        text = display_path(self._current_paths[row], self.home_dir)
+        if self._details is not None:
+            text = f"{text}  {self._details[row]}"
+        return Strip([Segment(text, style)]).extend_cell_length(width, style).crop(0, width)
+
+    def watch_index(self, old_index: Optional[int], new_index: Optional[int]) -> None:
+        for row in (old_index, new_index):
+            if row is not None:
+                self.refresh(Region(0, row - self.scroll_offset.y, self.size.width, 1))
+        if new_index is not None:
+            self.scroll_to_region(Region(0, new_index, 1, 1), animate=False)
+        path = None
+        if new_index is not None and new_index < len(self._current_paths):
+            path = self._current_paths[new_index]
+        self.post_message(self.ResultHighlighted(path))
+
+    def _move_cursor(self, delta: int) -> None:
+        if not self._current_paths:
+            return
+        current = self.index if self.index is not None else -1
+        self.index = max(0, min(len(self._current_paths) - 1, current + delta))
+
+    def action_cursor_up(self) -> None:
+        self._move_cursor(-1)
+
+    def action_cursor_down(self) -> None:
+        self._move_cursor(1)
+
+    def action_page_up(self) -> None:
+        self._move_cursor(-max(1, self.scrollable_content_region.height))
+
+    def action_page_down(self) -> None:
+        self._move_cursor(max(1, self.scrollable_content_region.height))
+
+    def action_first(self) -> None:
+        self._move_cursor(-len(self._current_paths))
+
+    def action_last(self) -> None:
+        self._move_cursor(len(self._current_paths))
+
+    def action_select_cursor(self) -> None:
+        if self.index is not None and 0 <= self.index < len(self._current_paths):
+            self.post_message(self.ResultSelected(self._current_paths[self.index]))
+
+
+class PreviewPane(Static):
+    """
+    Shows the preview (see preview.py) of the highlighted result next to
+    the result list.
+    """
+    def show_preview(self, path: Optional[Path], preview: Optional[Preview]) -> None:
+        if path is None or preview is None:
+            self.update("")
+            return
+        text = Text(no_wrap=True, overflow="crop")
+        text.append(path.name or str(path), style="bold")
+        text.append(f"  {preview.title}\n\n", style="dim")
+        if preview.kind in (BINARY, ERROR):
+            text.append(preview.body, style="italic dim")
+        elif preview.kind == DIRECTORY:
+            text.append(preview.body, style="#8be9fd") # Dracula Theme cyan
+        else:
+            text.append(preview.body)
+        self.update(text)
+
+
+class StatsPanel(Static):
+    """
+    Shows per-stage latency percentiles from `instrumentation.metrics`.
+    Hidden until toggled on.
+    """
+    def update_stats(self, stages: Dict[str, Dict[str, float]]) -> None:
+        table = Table(box=None, expand=True, header_style="bold")
+        table.add_column("stage")
+        for column in ("count", "p50 ms", "p95 ms", "p99 ms", "max ms"):
+            table.add_column(column, justify="right")
+        for name, stats in stages.items():
+            table.add_row(
+                name,
+                str(stats["count"]),
+                f"{stats['p50_ms']:.2f}",
+                f"{stats['p95_ms']:.2f}",
+                f"{stats['p99_ms']:.2f}",
+                f"{stats['max_ms']:.2f}",
+            )
+        if not stages:
+            table.add_row("(no samples yet)", "", "", "", "", "")
+        self.update(table)